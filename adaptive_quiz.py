@@ -0,0 +1,163 @@
+from concurrent.futures import Future
+
+from difficulty import step_difficulty
+from large_quiz import EXCLUDE_WINDOW, MAX_FAILURES, generate_batch
+from questions import Question
+from retrieval import TOP_K, load_index
+
+
+def new_adaptive_plan(topic, difficulty, target, document=None):
+    """
+    Describe a quiz whose difficulty adapts after every answer (plain data, saved with
+    the quiz progress)
+    """
+    return {
+        "kind": "adaptive", "topic": topic, "difficulty": difficulty, "target": target,
+        "document": document, "difficulties": [difficulty]
+    }
+
+
+def _completed(questions):
+    future = Future()
+    future.set_result(questions)
+    return future
+
+
+class LookaheadQuiz:
+    """
+    Serves the next question of an adaptive quiz at a difficulty set by the last answer
+
+    While question k is on screen, one easier and one harder candidate for question
+    k+1 are generated in the background. A correct answer serves the harder one and a
+    wrong answer the easier one, so adapting adds no wait once the candidates are
+    ready. The candidate that is not served goes to the question pool, where a later
+    lookahead (in any session) takes it instead of calling the LLM. prepare, if set, is
+    run on each candidate in the background job.
+    """
+
+    def __init__(self, plan, pool=None, prepare=None):
+        self.plan = plan
+        self.pool = pool
+        self.prepare = prepare
+        self.candidates = None  # (question index, {difficulty: future})
+        self.failures = 0
+
+    @property
+    def exhausted(self):
+        return self.failures >= MAX_FAILURES
+
+    def candidate_difficulties(self):
+        current = self.plan["difficulty"]
+        return step_difficulty(current, -1), step_difficulty(current, 1)
+
+    def _source(self):
+        return self.plan.get("document")
+
+    def _prefetch(self, executor, llm, questions):
+        index = len(questions)
+        exclude = [q.text for q in questions[-EXCLUDE_WINDOW:]]
+        context_passages = None
+        if self._source():
+            # Slide through the ranked passages so consecutive questions differ
+            context_passages = load_index(self._source()).search(self.plan["topic"], k=TOP_K, offset=index)
+
+        futures = {}
+        for difficulty in self.candidate_difficulties():
+            if difficulty in futures:
+                continue
+            pooled = self.pool.take(self.plan["topic"], difficulty, exclude, self._source()) if self.pool else None
+            if pooled is not None:
+                futures[difficulty] = (
+                    executor.submit(self._prepared, [pooled]) if self.prepare else _completed([pooled])
+                )
+                if hasattr(llm, "record_cache_hit"):
+                    llm.record_cache_hit()
+            else:
+                futures[difficulty] = executor.submit(
+                    generate_batch, self.prepare, llm, self.plan["topic"], difficulty, 1, exclude, context_passages
+                )
+        self.candidates = (index, futures)
+
+    def _prepared(self, questions):
+        self.prepare(questions)
+        return questions
+
+    def _return_to_pool(self, future, difficulty):
+        if self.pool is None or future.cancelled() or future.exception() is not None:
+            return
+        for question in future.result():
+            self.pool.put(self.plan["topic"], difficulty, question, self._source())
+
+    def _release(self, futures):
+        # Unused candidates go to the pool as soon as they finish
+        for difficulty, future in futures.items():
+            future.add_done_callback(lambda f, d=difficulty: self._return_to_pool(f, d))
+
+    def close(self):
+        """
+        Hand any candidates still in flight to the pool when the quiz is abandoned
+        """
+        if self.candidates is not None:
+            self._release(self.candidates[1])
+            self.candidates = None
+
+    @staticmethod
+    def _result(future):
+        try:
+            questions = future.result()
+        except Exception:
+            return None
+        return Question.from_list(questions[0]) if questions else None
+
+    def _choose(self, correct, wait):
+        """
+        Return (difficulty, question) for the last answer, or None if it isn't ready yet
+        """
+        easier, harder = self.candidate_difficulties()
+        wanted = harder if correct else easier
+        _, futures = self.candidates
+        if not (wait or futures[wanted].done()):
+            return None
+
+        self.candidates = None
+        question = self._result(futures.pop(wanted))
+        served = wanted
+        if question is None:
+            # The wanted candidate failed: fall back to the other one if it is usable
+            for difficulty, future in list(futures.items()):
+                if wait or future.done():
+                    question = self._result(futures.pop(difficulty))
+                    served = difficulty
+                    break
+        self._release(futures)
+        if question is None:
+            self.failures += 1
+            return None
+        self.failures = 0
+        return served, question
+
+    def top_up(self, executor, llm, questions, feedback, wait=False):
+        """
+        Return the next question (or nothing) once the current one has been answered,
+        and start generating the candidates for the question after it
+
+        With wait=True, block until the candidate for the last answer has finished.
+        """
+        new_questions = []
+        if self.candidates is not None and self.candidates[0] != len(questions):
+            # Candidates for a question that no longer follows (e.g. restored progress)
+            self.close()
+
+        answered = len(feedback) >= len(questions)
+        if self.candidates is not None and answered and len(questions) < self.plan["target"]:
+            choice = self._choose(feedback[-1], wait)
+            if choice is not None:
+                difficulty, question = choice
+                self.plan["difficulty"] = difficulty
+                self.plan.setdefault("difficulties", []).append(difficulty)
+                new_questions.append(question)
+
+        available = list(questions) + new_questions
+        if self.candidates is None and len(available) < self.plan["target"] and not self.exhausted:
+            self._prefetch(executor, llm, available)
+        return new_questions
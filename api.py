@@ -0,0 +1,368 @@
+"""
+JSON HTTP API for generating and grading quizzes from other applications (e.g. an LMS)
+
+    uvicorn api:app --port 8000
+
+    POST /quizzes                       {"topic", "difficulty", "num_questions", "user_id"}
+    POST /quizzes/{quiz_id}/answers     {"user_id", "answers": ["A", "C", ...]}
+    GET  /questions/search?q=...&difficulty=&topic=&limit=
+    POST /quizzes/search                {"query", "difficulty", "topic", "num_questions"}
+    POST /users/{user_id}/review        {"num_questions"}
+    GET  /users/{user_id}/analytics
+    GET  /users/{user_id}/usage
+    GET  /health
+
+Every endpoint except /health requires the key in MCQ_API_KEY, sent as
+"Authorization: Bearer <key>". Quizzes are kept in the same state backend as the
+Streamlit app and generated questions are shared with it, but API users have their own
+namespace: their results, reviews and usage never mix with an app session's.
+All generation requests share one event loop and use the chat model's async API.
+"""
+import asyncio
+import hmac
+import os
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from difficulty import DIFFICULTY_LEVELS, determine_difficulty
+from generation import LLM_BACKEND, MCQGenerationError, arequest_mcqs, create_llm
+from performance import (
+    adaptive_difficulty, analytics_summary, build_registry, count_correct, performance_record, question_details
+)
+from review import ReviewQueue
+from search_index import SEARCH_TOPIC_PREFIX, QuestionIndex
+from state_backend import (
+    DEFAULT_BACKEND_URL, SESSION_TTL, QuestionCache, QuestionStore, backend_from_url, quiz_id
+)
+from usage_ledger import MeteredLLM, QuotaExceededError, UsageLedger
+
+# Generation requests sent to the LLM at the same time; the rest wait their turn
+MAX_CONCURRENT_GENERATIONS = int(os.getenv("MCQ_API_CONCURRENCY", "16"))
+MAX_QUESTIONS = 20
+MAX_SEARCH_RESULTS = 100
+OPTION_LETTERS = ["A", "B", "C", "D"]
+# Topic of the quizzes made of a user's due review questions
+REVIEW_TOPIC = "Review"
+
+
+class RequestError(Exception):
+    """
+    Raised for an invalid request; reported to the client as a 4xx response
+    """
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _error(message, status_code):
+    return JSONResponse({"error": message}, status_code=status_code)
+
+
+async def _json_body(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise RequestError("Request body must be valid JSON") from None
+    if not isinstance(body, dict):
+        raise RequestError("Request body must be a JSON object")
+    return body
+
+
+def _api_user(user_id):
+    # API users are kept apart from app sessions, so a client can't read or write a
+    # session's history by passing its sid as user_id
+    return f"api:user:{user_id}"
+
+
+def _history_key(user_id):
+    return f"{_api_user(user_id)}:history"
+
+
+def _quiz_key(key):
+    return f"api:quiz:{key}"
+
+
+def _public_question(number, question, include_answers):
+    item = {
+        "number": number,
+        "question": question.text,
+        "options": dict(zip(OPTION_LETTERS, question.options)),
+    }
+    if include_answers:
+        item["answer"] = question.answer
+        item["explanation"] = question.explanation
+    return item
+
+
+def _difficulty(value, default="Medium"):
+    difficulty = str(value or default).capitalize()
+    if difficulty not in DIFFICULTY_LEVELS:
+        raise RequestError(f"'difficulty' must be one of {', '.join(DIFFICULTY_LEVELS)}")
+    return difficulty
+
+
+def _count(value, name, default, maximum):
+    try:
+        count = int(value or default)
+    except (TypeError, ValueError):
+        raise RequestError(f"'{name}' must be a number") from None
+    if not 1 <= count <= maximum:
+        raise RequestError(f"'{name}' must be between 1 and {maximum}")
+    return count
+
+
+async def _save_quiz(state, topic, difficulty, questions):
+    """
+    Store a quiz for grading; returns its id and the questions as Question objects
+    """
+    quiz_key = quiz_id(questions)
+    # The quiz itself only refers to the questions, which are saved once in the question store
+    questions = await asyncio.to_thread(state.question_store.put, questions)
+    quiz = {"topic": topic, "difficulty": difficulty, "question_ids": [q.id for q in questions]}
+    await asyncio.to_thread(state.backend.set, _quiz_key(quiz_key), quiz, SESSION_TTL)
+    return quiz_key, questions
+
+
+async def generate_quiz(request):
+    body = await _json_body(request)
+    state = request.app.state
+
+    topic = str(body.get("topic") or "").strip()
+    if not topic:
+        raise RequestError("'topic' is required")
+    difficulty = _difficulty(body.get("difficulty"))
+    num_questions = _count(body.get("num_questions"), "num_questions", 5, MAX_QUESTIONS)
+    user_id = body.get("user_id")
+
+    if user_id:
+        # Adapt the difficulty to the user's last quiz on this topic, like the app does
+        history = await asyncio.to_thread(state.backend.range, _history_key(user_id))
+        difficulty = adaptive_difficulty(history, build_registry(history), topic, difficulty)
+
+    llm = MeteredLLM(state.llm, state.usage_ledger, _api_user(user_id) if user_id else "api", "api")
+    async with state.generation_slots:
+        try:
+            questions = await arequest_mcqs(llm, topic, difficulty, num_questions)
+        except QuotaExceededError as e:
+            return _error(str(e), 429)
+        except MCQGenerationError as e:
+            return _error(f"The model returned questions in an unexpected format: {e}", 502)
+        except Exception as e:
+            return _error(f"Error generating questions: {e}", 502)
+
+    # Make the quiz available to app sessions asking for the same topic, and searchable
+    await asyncio.to_thread(state.question_cache.add, topic, difficulty, num_questions, questions)
+    await asyncio.to_thread(state.question_index.add, questions, topic, difficulty)
+    quiz_key, questions = await _save_quiz(state, topic, difficulty, questions)
+
+    include_answers = bool(body.get("include_answers"))
+    return JSONResponse({
+        "quiz_id": quiz_key,
+        "topic": topic,
+        "difficulty": difficulty,
+        "questions": [_public_question(i + 1, q, include_answers) for i, q in enumerate(questions)],
+    }, status_code=201)
+
+
+def _search_hit(hit, include_answers):
+    item = _public_question(None, hit["question"], include_answers)
+    del item["number"]
+    return {"id": hit["question"].id, "topic": hit["topic"], "difficulty": hit["difficulty"], **item}
+
+
+async def search_questions(request):
+    params = request.query_params
+    query = params.get("q", "").strip()
+    if not query:
+        raise RequestError("'q' is required")
+    difficulty = _difficulty(params["difficulty"]) if params.get("difficulty") else None
+    limit = _count(params.get("limit"), "limit", 20, MAX_SEARCH_RESULTS)
+    hits = await asyncio.to_thread(
+        request.app.state.question_index.search, query, limit, params.get("topic"), difficulty
+    )
+    include_answers = params.get("include_answers", "").lower() in ("1", "true", "yes")
+    return JSONResponse({"query": query, "results": [_search_hit(hit, include_answers) for hit in hits]})
+
+
+async def search_quiz(request):
+    body = await _json_body(request)
+    state = request.app.state
+
+    query = str(body.get("query") or "").strip()
+    if not query:
+        raise RequestError("'query' is required")
+    difficulty = _difficulty(body["difficulty"]) if body.get("difficulty") else None
+    num_questions = _count(body.get("num_questions"), "num_questions", 5, MAX_QUESTIONS)
+    hits = await asyncio.to_thread(state.question_index.search, query, num_questions, body.get("topic"), difficulty)
+    if not hits:
+        raise RequestError("No questions match the query", 404)
+
+    # Served from the index, without calling the LLM
+    topic = SEARCH_TOPIC_PREFIX + query
+    difficulty = difficulty or "Mixed"
+    quiz_key, questions = await _save_quiz(state, topic, difficulty, [hit["question"] for hit in hits])
+    include_answers = bool(body.get("include_answers"))
+    return JSONResponse({
+        "quiz_id": quiz_key,
+        "topic": topic,
+        "difficulty": difficulty,
+        "questions": [_public_question(i + 1, q, include_answers) for i, q in enumerate(questions)],
+    }, status_code=201)
+
+
+async def submit_answers(request):
+    body = await _json_body(request)
+    state = request.app.state
+
+    quiz = await asyncio.to_thread(state.backend.get, _quiz_key(request.path_params["quiz_id"]))
+    if quiz is None:
+        raise RequestError("Quiz not found or expired", 404)
+    questions = await asyncio.to_thread(state.question_store.get_many, quiz["question_ids"])
+    if None in questions:
+        raise RequestError("Quiz not found or expired", 404)
+    user_id = body.get("user_id")
+    if not user_id:
+        raise RequestError("'user_id' is required")
+    answers = body.get("answers")
+    if not isinstance(answers, list) or len(answers) != len(questions):
+        raise RequestError(f"'answers' must be a list of {len(questions)} letters")
+    answers = [str(answer).strip().upper() if answer is not None else None for answer in answers]
+    if any(answer not in OPTION_LETTERS + [None] for answer in answers):
+        raise RequestError("Each answer must be one of A, B, C, D or null")
+
+    score = count_correct(questions, answers)
+    record = performance_record(quiz["topic"], score, len(questions), quiz["difficulty"], questions, answers)
+    await asyncio.to_thread(state.backend.push, _history_key(user_id), record, None, SESSION_TTL)
+    # Missed questions come back in the user's review quizzes (POST /users/{user_id}/review)
+    await asyncio.to_thread(state.review_queue.record_quiz, _api_user(user_id), questions, answers)
+
+    details = question_details(record, questions)
+    for detail, question in zip(details, questions):
+        detail["explanation"] = question.explanation
+    return JSONResponse({
+        "score": score,
+        "total": record["total"],
+        "accuracy": record["accuracy"],
+        # Quizzes assembled from search results have no single difficulty to adapt
+        "next_difficulty": (
+            determine_difficulty(quiz["difficulty"], score, len(questions))
+            if quiz["difficulty"] in DIFFICULTY_LEVELS else None
+        ),
+        "question_details": details,
+    })
+
+
+async def review_quiz(request):
+    body = await _json_body(request)
+    state = request.app.state
+
+    num_questions = _count(body.get("num_questions"), "num_questions", 5, MAX_QUESTIONS)
+    user = _api_user(request.path_params["user_id"])
+    questions = await asyncio.to_thread(state.review_queue.due_questions, user, num_questions)
+    if not questions:
+        raise RequestError("No questions are due for review", 404)
+
+    # Served from the review queue, without calling the LLM
+    quiz_key, questions = await _save_quiz(state, REVIEW_TOPIC, "Mixed", questions)
+    include_answers = bool(body.get("include_answers"))
+    return JSONResponse({
+        "quiz_id": quiz_key,
+        "topic": REVIEW_TOPIC,
+        "difficulty": "Mixed",
+        "questions": [_public_question(i + 1, q, include_answers) for i, q in enumerate(questions)],
+    }, status_code=201)
+
+
+async def user_analytics(request):
+    history = await asyncio.to_thread(request.app.state.backend.range, _history_key(request.path_params["user_id"]))
+    return JSONResponse(analytics_summary(history))
+
+
+async def user_usage(request):
+    ledger = request.app.state.usage_ledger
+    summary = await asyncio.to_thread(ledger.summary, None, _api_user(request.path_params["user_id"]))
+    return JSONResponse({**summary["totals"], "daily_limit": ledger.user_daily_tokens or None})
+
+
+async def health(request):
+    return JSONResponse({"status": "ok"})
+
+
+def _check_api_key(request):
+    scheme, _, key = request.headers.get("authorization", "").partition(" ")
+    expected = request.app.state.api_key.encode()
+    if scheme.lower() != "bearer" or not hmac.compare_digest(key.strip().encode(), expected):
+        raise RequestError("A valid API key is required (Authorization: Bearer <key>)", 401)
+
+
+def _handle_errors(endpoint):
+    async def wrapper(request):
+        try:
+            _check_api_key(request)
+            return await endpoint(request)
+        except RequestError as e:
+            return _error(str(e), e.status_code)
+    return wrapper
+
+
+def create_app(llm=None, backend=None, usage_ledger=None, review_queue=None, question_index=None,
+               max_concurrent_generations=MAX_CONCURRENT_GENERATIONS, api_key=None):
+    """
+    Build the ASGI application; pass an llm (e.g. generation.FakeLLM), a backend, a
+    usage ledger, a review queue and a question index to run it without an API key or
+    shared state, and api_key to set the clients' key without MCQ_API_KEY
+    """
+    @asynccontextmanager
+    async def lifespan(app):
+        if not app.state.api_key:
+            load_dotenv()
+            app.state.api_key = os.getenv("MCQ_API_KEY")
+            if not app.state.api_key:
+                raise RuntimeError("MCQ_API_KEY is not set (clients must send it as 'Authorization: Bearer <key>')")
+        if app.state.llm is None:
+            load_dotenv()
+            api_key = os.getenv("GROQ_API_KEY")
+            if not api_key and LLM_BACKEND != "fake":
+                raise RuntimeError("GROQ_API_KEY is not set (add it to .env, or set MCQ_LLM_BACKEND=fake)")
+            app.state.llm = create_llm(api_key)
+        if app.state.backend is None:
+            app.state.backend = backend_from_url(os.getenv("MCQ_STATE_BACKEND", DEFAULT_BACKEND_URL))
+        if app.state.usage_ledger is None:
+            app.state.usage_ledger = UsageLedger()
+        if app.state.review_queue is None:
+            app.state.review_queue = ReviewQueue()
+        if app.state.question_index is None:
+            app.state.question_index = QuestionIndex()
+        app.state.question_cache = QuestionCache(app.state.backend)
+        app.state.question_store = QuestionStore(app.state.backend)
+        app.state.generation_slots = asyncio.Semaphore(max_concurrent_generations)
+        yield
+
+    app = Starlette(
+        routes=[
+            Route("/quizzes", _handle_errors(generate_quiz), methods=["POST"]),
+            Route("/quizzes/search", _handle_errors(search_quiz), methods=["POST"]),
+            Route("/questions/search", _handle_errors(search_questions), methods=["GET"]),
+            Route("/quizzes/{quiz_id}/answers", _handle_errors(submit_answers), methods=["POST"]),
+            Route("/users/{user_id}/review", _handle_errors(review_quiz), methods=["POST"]),
+            Route("/users/{user_id}/analytics", _handle_errors(user_analytics), methods=["GET"]),
+            Route("/users/{user_id}/usage", _handle_errors(user_usage), methods=["GET"]),
+            Route("/health", health, methods=["GET"]),
+        ],
+        lifespan=lifespan,
+    )
+    app.state.api_key = api_key
+    app.state.llm = llm
+    app.state.backend = backend
+    app.state.usage_ledger = usage_ledger
+    app.state.review_queue = review_queue
+    app.state.question_index = question_index
+    return app
+
+
+app = create_app()
@@ -1,25 +1,150 @@
 import streamlit as st
+import streamlit.components.v1 as components
 import os
+import hmac
+import time
 import json
-import ast
+import uuid
 from datetime import datetime
-import pandas as pd
-import plotly.express as px
-import matplotlib.pyplot as plt
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
-from langchain.schema import HumanMessage, SystemMessage
-from langchain.memory import ConversationBufferMemory
-from streamlit_extras.colored_header import colored_header
-from streamlit_extras.add_vertical_space import add_vertical_space
+from generation import LazyLLM, MCQFormatError, create_llm, request_mcqs
+from difficulty import DIFFICULTY_LEVELS, determine_difficulty
+from performance import compact_record, expanded_record, performance_record, performance_summary, question_details
+from large_quiz import FIRST_BATCH_SIZE, ProgressiveQuiz, new_plan
+from adaptive_quiz import LookaheadQuiz, new_adaptive_plan
+from retrieval import load_index, load_or_build_index
+from review import ReviewQueue, new_review_plan
+from search_index import QuestionIndex, highlight, new_search_plan
+from classroom import Classroom, class_summary, new_class_plan, normalize_code
+from translation import LANGUAGES, SOURCE_LANGUAGE, TranslationCache, cached_translations, translate_questions
+from theme import (
+    ANSWER_PROMPT_HTML, CARD_NOTE_HTML, EXPLANATION_HTML, FEEDBACK_PANEL_HTML, HEADING_HTML, HELP_TEXT_HTML,
+    INFO_PANEL_HTML, JOIN_CODE_HTML, LATEST_QUIZ_HTML, METRIC_CARD_HTML, MUTED_TEXT_HTML, OPTION_HTML,
+    QUESTION_CARD_HTML, QUIZ_PROGRESS_HTML, REVIEW_ITEM_HTML, REVIEW_NOTES, SCORE_CARD_HTML, SEARCH_HIT_HTML,
+    SECTION_TITLE_HTML, SIDEBAR_TITLE_HTML, SPACER_HTML, TITLE_HTML, TOPIC_STATS_HTML, WEAK_TOPIC_HTML,
+    html_list, theme_html
+)
+from questions import Question
+from item_analysis import AnswerTable
+from topics import TopicRegistry
+from session_history import HistoryBuffer, session_memory_usage
+from usage_ledger import MeteredLLM, QuotaExceededError, UsageLedger
+from profiling import profiled
+from state_backend import (
+    DEFAULT_BACKEND_URL, SESSION_TTL, QuestionCache, QuestionPool, QuestionStore, QuizSnapshots, backend_from_url,
+    quiz_id
+)
+from data_transfer import (
+    FORMATS, SchemaError, checkpoint_path, detect_format, export_to_tempfile, import_records,
+    question_to_record, record_to_question
+)
+
+# Server time spent on this script run, recorded at the end of main()
+script_started = time.perf_counter()
 
 # Load environment variables
 load_dotenv()
 
+# Shared state backend so that any worker process can serve any session
+@st.cache_resource
+def get_state_backend():
+    return backend_from_url(os.getenv("MCQ_STATE_BACKEND", DEFAULT_BACKEND_URL))
+
+# Questions by id, with an in-memory copy shared by all sessions of this process
+@st.cache_resource
+def get_question_store():
+    return QuestionStore(get_state_backend())
+
+state_backend = get_state_backend()
+question_cache = QuestionCache(state_backend)
+question_pool = QuestionPool(state_backend)
+question_store = get_question_store()
+quiz_snapshots = QuizSnapshots(state_backend)
+classroom = Classroom(state_backend, question_store)
+translation_cache = TranslationCache(state_backend)
+
+# Stable session id kept in the URL so a reconnect to another worker finds the same state;
+# ids in the HTTP API's namespace (api:...) belong to API users and get a new session
+if not st.query_params.get("sid") or st.query_params["sid"].startswith("api:"):
+    st.query_params["sid"] = uuid.uuid4().hex
+session_id = st.query_params["sid"]
+
+# Admin tools (profiler) are shown when the URL has ?admin=<MCQ_ADMIN_TOKEN>
+ADMIN_TOKEN = os.getenv("MCQ_ADMIN_TOKEN", "")
+
+def is_admin():
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(st.query_params.get("admin", ""), ADMIN_TOKEN)
+
+# Quiz settings saved with the snapshot of a quiz in progress; answers are saved one at a
+# time and the score, feedback and position are derived from them when it is resumed
+SNAPSHOT_FIELDS = ["total", "topic", "difficulty_level", "num_questions", "quiz_plan", "document", "language"]
+# Cached quizzes remembered per session so that they are not served to it again
+MAX_SEEN_QUIZZES = 500
+# Quizzes whose questions are all known up front; their plan has the topic and difficulty
+FIXED_PLAN_KINDS = ("review", "search", "class")
+# Results shown on the search page
+SEARCH_RESULTS = 20
+# Seconds between refreshes of an instructor's live class results
+CLASS_REFRESH_SECONDS = 5
+NAV_PAGES = ["🧠 Generate MCQs", "🔎 Search", "👩‍🏫 Class", "📊 Analytics"]
+
+# Fixed HTML of the pages, built once per process rather than on every rerun
+PAGE_TITLES = {
+    "generate": TITLE_HTML.format(
+        title="🧠 Intelligent MCQ Generator", subtitle="Create adaptive assessment questions on any educational topic"
+    ),
+    "search": TITLE_HTML.format(
+        title="🔎 Search Questions", subtitle="Find any question generated so far and practice with the ones you pick"
+    ),
+    "class": TITLE_HTML.format(
+        title="👩‍🏫 Class Quizzes", subtitle="Generate one quiz for a whole class and follow the results live"
+    ),
+    "analytics": TITLE_HTML.format(
+        title="📊 Performance Analytics", subtitle="Track your progress and identify areas for improvement"
+    ),
+}
+GENERATE_HELP_HTML = HELP_TEXT_HTML.format(
+    text="The system will generate questions and adapt to your performance over time."
+)
+CLASS_NOTE_HTML = MUTED_TEXT_HTML.format(
+    text="The quiz is generated once and every student gets the same questions, so a class of any size costs "
+         "a single LLM call."
+)
+ANALYTICS_PREVIEW_HTML = INFO_PANEL_HTML.format(
+    title="Analytics Preview",
+    body="<p>After completing quizzes, you'll see detailed analytics including:</p>" + html_list([
+        "Performance trends over time", "Topic strengths and weaknesses", "Difficulty progression",
+        "Question-level analysis",
+    ]) + "<p>Take a quiz to start building your personalized learning profile!</p>"
+)
+TOPIC_CHART_NOTE_HTML = CARD_NOTE_HTML.format(
+    text="This chart shows your average accuracy for each topic you've studied. "
+         "Higher bars indicate better understanding of those topics."
+)
+PROGRESSION_CHART_NOTE_HTML = CARD_NOTE_HTML.format(
+    text="This chart shows how your performance has changed over time. "
+         "Upward trends indicate improvement in your understanding."
+)
+ITEM_STATISTICS_NOTE_HTML = CARD_NOTE_HTML.format(
+    text="The p-value is the share of attempts answered correctly (lower means harder). "
+         "Discrimination shows how well a question separates strong from weak attempts, "
+         "and the option columns show how often each answer was picked."
+)
+STRENGTHS_HTML = FEEDBACK_PANEL_HTML.format(kind="strengths", title="💪 Strengths")
+AREAS_TO_IMPROVE_HTML = FEEDBACK_PANEL_HTML.format(kind="improve", title="🎯 Areas to Improve")
+
+# Browser-side quiz player: grades locally and submits all answers once
+quiz_player = components.declare_component(
+    "quiz_player",
+    path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "components", "quiz_player")
+)
+
 # Initialize session state variables
 if "initialized" not in st.session_state:
     st.session_state.initialized = True
-    st.session_state.memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
     st.session_state.questions = []
     st.session_state.current_question = 0
     st.session_state.score = 0
@@ -30,21 +155,62 @@ if "initialized" not in st.session_state:
     st.session_state.topic = ""
     st.session_state.difficulty_level = "Medium"
     st.session_state.num_questions = 5
-    st.session_state.user_data = []
-    st.session_state.explanations = []
+    st.session_state.user_data = HistoryBuffer()
+    st.session_state.answer_table = AnswerTable()
+    st.session_state.topic_registry = TopicRegistry()
     st.session_state.feedback = []
+    st.session_state.seen_quizzes = []
+    st.session_state.quiz_token = None
+    st.session_state.quiz_plan = None
+    st.session_state.document = None
+    st.session_state.language = SOURCE_LANGUAGE
+    st.session_state.restored = False
+    st.session_state.interaction_times = deque(maxlen=50)
+    st.session_state.profile_runs_left = 0
+    st.session_state.profiles = deque(maxlen=10)
 
 # Initialize Groq AI model
 groq_api_key = os.getenv("GROQ_API_KEY")
 if not groq_api_key:
     groq_api_key = st.secrets["GROQ_API_KEY"] if "GROQ_API_KEY" in st.secrets else None
 
+# Worker threads for background question generation, shared by all sessions
+@st.cache_resource
+def get_executor():
+    return ThreadPoolExecutor(max_workers=int(os.getenv("MCQ_BACKGROUND_WORKERS", "4")))
+
+# The client is shared by all sessions instead of being rebuilt on every rerun
+@st.cache_resource
+def get_llm(api_key):
+    # The client library is only imported when the first questions are generated
+    return LazyLLM(lambda: create_llm(api_key))
+
+# Token ledger and quotas, shared by all sessions and worker processes on this host
+@st.cache_resource
+def get_usage_ledger():
+    return UsageLedger()
+
+usage_ledger = get_usage_ledger()
+
+# Spaced repetition cards of missed questions, shared by all sessions on this host
+@st.cache_resource
+def get_review_queue():
+    return ReviewQueue()
+
+review_queue = get_review_queue()
+
+# Full-text index of every generated question, shared by all sessions on this host
+@st.cache_resource
+def get_question_index():
+    return QuestionIndex()
+
+question_index = get_question_index()
+
 if groq_api_key:
-    llm = ChatGroq(
-        model_name="llama-3.1-8b-instant",
-        temperature=0.5,
-        groq_api_key=groq_api_key
-    )
+    # Every call made for this session is checked against the quotas and recorded. The
+    # per-user quota is per session (a visitor can start a new one); the global quota is
+    # what bounds the total cost
+    llm = MeteredLLM(get_llm(groq_api_key), usage_ledger, session_id)
 else:
     st.error("Groq API key not found. Please set it in the .env file or Streamlit secrets.")
     st.stop()
@@ -57,333 +223,258 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Apply custom styling for a more attractive UI
-st.markdown("""
-<style>
-    /* Main page styling */
-    .main {
-        background-color: #f8f9fa;
-        color: #333333;
-        font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-    }
-    
-    /* App container */
-    .stApp {
-        max-width: 1200px;
-        margin: 0 auto;
-    }
-    
-    p,ul,li{
-    color: mediumvioletred;
-    }
-    
-    /* Question card styling */
-    .question-card {
-        background-color: white;
-        padding: 25px;
-        border-radius: 15px;
-        box-shadow: 0 6px 12px rgba(0, 0, 0, 0.1);
-        margin-bottom: 25px;
-        border-left: 5px solid #6c5ce7;
-        transition: transform 0.2s ease;
-    }
-    .question-card:hover {
-        transform: translateY(-3px);
-    }
-    
-    /* Option buttons styling */
-    .option-button {
-        width: 100%;
-        text-align: left;
-        margin: 8px 0;
-        padding: 12px 18px;
-        border-radius: 8px;
-        border: 1px solid #e0e0e0;
-        background-color: white;
-        color:black;
-        transition: all 0.2s ease;
-        font-size: 16px;
-        cursor: pointer;
-    }
-    .option-button:hover {
-        background-color: #f0f2f6;
-        border-color: #6c5ce7;
-    }
-    
-    /* Answer feedback styling */
-    .selected-correct {
-        background-color: #d4edda;
-        border-color: #28a745;
-        border-left: 5px solid #28a745;
-    }
-    .selected-incorrect {
-        background-color: #f8d7da;
-        border-color: #dc3545;
-        border-left: 5px solid #dc3545;
-    }
-    .correct-answer {
-        background-color: #d4edda;
-        border-color: #28a745;
-        border-left: 5px solid #28a745;
-    }
-    
-    /* Button styling */
-    .stButton > button {
-        width: 100%;
-        border-radius: 8px;
-        font-weight: 500;
-        transition: all 0.2s ease;
-        border: none;
-        padding: 10px 24px;
-    }
-    .stButton > button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);
-    }
-    
-    /* Explanation box styling */
-    .explanation-box {
-        background-color: #f8f9fa;
-        color:black;
-        padding: 18px;
-        border-radius: 8px;
-        margin-top: 18px;
-        border-left: 3px solid #6c5ce7;
-    }
-    
-    /* Title styling */
-    .title-container {
-        text-align: center;
-        padding: 30px 0;
-        background: linear-gradient(135deg, #6c5ce7, #a29bfe);
-        border-radius: 12px;
-        margin-bottom: 25px;
-        color: white;
-    }
-    .title-text {
-        font-size: 2.5rem;
-        font-weight: 700;
-        margin: 0;
-        text-shadow: 1px 1px 2px rgba(0,0,0,0.1);
-    }
-    .subtitle-text {
-        font-size: 1.1rem;
-        color:black;
-        opacity: 0.9;
-        margin-top: 8px;
-    }
-    
-    /* Analytics card styling */
-    .analytics-card {
-        background-color: white;
-        padding: 25px;
-        border-radius: 12px;
-        box-shadow: 0 6px 12px rgba(0, 0, 0, 0.1);
-        margin-bottom: 25px;
-        border-top: 4px solid #6c5ce7;
-    }
-    
-    /* Metric styling */
-    .metric-card {
-        background: linear-gradient(135deg, #6c5ce7, #a29bfe);
-        padding: 20px;
-        border-radius: 10px;
-        color: white;
-        box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);
-        text-align: center;
-    }
-    .metric-value {
-        font-size: 2rem;
-        font-weight: 700;
-        margin: 10px 0;
-    }
-    .metric-label {
-        font-size: 0.9rem;
-        opacity: 0.9;
-    }
-    
-    /* Progress bar styling */
-    .stProgress > div > div {
-        background-color: #6c5ce7;
-    }
-    
-    /* Sidebar styling */
-    .sidebar .sidebar-content {
-        background-color: #f8f9fa;
-    }
-    
-    /* Widget labels */
-    .stTextInput > label, .stSelectbox > label, .stNumberInput > label {
-        font-weight: 500;
-        font-size: 16px;
-        color: #333;
-    }
-    
-    /* Remove fullscreen button */
-    .modebar-container {
-        display: none !important;
-    }
-</style>
-""", unsafe_allow_html=True)
+# Apply custom styling for a more attractive UI; with static serving this is only a link
+# to static/theme.css, which the browser loads once instead of on every rerun
+st.markdown(theme_html(st.get_option("server.enableStaticServing")), unsafe_allow_html=True)
 
 # Remove old UI section and replace with only empty title placeholder
 # We'll use the main() function for the actual UI
 st.markdown("<div id='title-placeholder'></div>", unsafe_allow_html=True)
 
 # Function to generate MCQs based on the topic and difficulty
-def generate_mcqs(topic, difficulty_level, num_questions, performance_history=None):
+def generate_mcqs(topic, difficulty_level, num_questions, performance_history=None, context_passages=None):
     """
     Generate MCQs using Groq LLM based on topic, difficulty, and past performance
     """
-    
-    # Create a system prompt based on user performance and requirements
-    performance_context = ""
-    if performance_history:
-        # Format performance data for the AI to understand patterns
-        performance_context = f"User performance history: {performance_history}\n"
-        
-    system_prompt = f"""
-    You are an expert educational assessment generator specialized in creating high-quality multiple-choice questions (MCQs) for adaptive learning systems.
-
-    TOPIC: {topic}
-    DIFFICULTY: {difficulty_level}
-    NUMBER OF QUESTIONS: {num_questions}
-    {performance_context}
-
-    Create exactly {num_questions} multiple-choice questions on the topic "{topic}" with {difficulty_level} difficulty.
-    
-    Follow these requirements strictly:
-    1. Each question must be clear, concise, and directly relevant to the topic
-    2. Match the difficulty level accurately: 
-       - Easy: Basic understanding and recall questions
-       - Medium: Application and comprehension questions
-       - Hard: Analysis and evaluation questions
-    3. Provide exactly 4 answer choices labeled A, B, C, D for each question
-    4. Only ONE answer should be correct
-    5. The other answers must be plausible distractors that seem reasonable but are incorrect
-    6. Include a detailed explanation that teaches why the correct answer is right
-    
-    Format your response as a valid Python list of lists ONLY, where each inner list contains EXACTLY:
-    [question_text, option_A, option_B, option_C, option_D, correct_answer_letter, explanation]
-
-    Example format:
-    [
-        ["What is the capital of France?", "London", "Berlin", "Paris", "Madrid", "C", "Paris is the capital city of France."],
-        ["Which planet is closest to the sun?", "Earth", "Mercury", "Venus", "Mars", "B", "Mercury is the closest planet to the sun in our solar system."]
-    ]
-
-    The output MUST be a valid Python list that can be parsed with ast.literal_eval() - nothing else.
-    DO NOT include any text, explanations, or markdown formatting before or after the list.
-    """
-
-    messages = [
-        SystemMessage(content=system_prompt),
-        HumanMessage(content=f"Generate {num_questions} multiple-choice questions about {topic} with {difficulty_level} difficulty level.")
-    ]
-
     try:
-        response = llm.invoke(messages)
-        # Clean the response to ensure it's a valid Python list
-        content = response.content.strip()
-        
-        # Handle different response formats
-        if content.startswith("```python") and content.endswith("```"):
-            content = content[content.find("["):content.rfind("]")+1]
-        elif content.startswith("```") and content.endswith("```"):
-            content = content[content.find("["):content.rfind("]")+1]
-        elif content.startswith("[") and content.endswith("]"):
-            content = content
-        else:
-            # Try to extract the list if it's embedded in text
-            start_idx = content.find("[")
-            end_idx = content.rfind("]")
-            if start_idx != -1 and end_idx != -1:
-                content = content[start_idx:end_idx+1]
-            
-        # Parse the list
-        questions = ast.literal_eval(content)
-        
-        # Ensure we have the right number of questions
-        questions = questions[:num_questions]
-        
-        # Validate question format
-        for q in questions:
-            if len(q) != 7:
-                st.error(f"Question format is incorrect: {q}")
-                return []
-                
+        questions = request_mcqs(
+            llm, topic, difficulty_level, num_questions, performance_history,
+            context_passages=context_passages
+        )
+        # Make the new questions searchable
+        question_index.add(questions, topic, difficulty_level)
         return questions
+    except MCQFormatError as e:
+        st.error(str(e))
+        return []
+    except QuotaExceededError as e:
+        st.error(f"⛔ {str(e)}")
+        return []
     except Exception as e:
         st.error(f"Error generating questions: {str(e)}")
         st.error("Please try again with a different topic or check your API key.")
         return []
 
-# Function to determine next question difficulty based on performance
-def determine_difficulty(current_difficulty, correct_answers, total_questions):
-    """
-    Adapt difficulty based on user performance
-    """
-    if total_questions == 0:
-        return "Medium"
-        
-    accuracy = correct_answers / total_questions
-    
-    if current_difficulty == "Easy":
-        if accuracy > 0.7:
-            return "Medium"
-        else:
-            return "Easy"
-    elif current_difficulty == "Medium":
-        if accuracy > 0.7:
-            return "Hard"
-        elif accuracy < 0.4:
-            return "Easy"
-        else:
-            return "Medium"
-    else:  # Hard
-        if accuracy < 0.5:
-            return "Medium"
-        else:
-            return "Hard"
-
 # Function to save user performance data
 def save_performance_data(topic, score, total, difficulty, questions, answers):
     """
     Save the user's performance data for analytics
     """
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    # Calculate metrics for each question
-    question_metrics = []
-    for i, (question, user_answer) in enumerate(zip(questions, answers)):
-        is_correct = user_answer == question[5]  # Index 5 contains the correct answer
-        question_metrics.append({
-            "question_number": i + 1,
-            "question_text": question[0],
-            "correct_answer": question[5],
-            "user_answer": user_answer,
-            "is_correct": is_correct
-        })
-    
-    performance_data = {
-        "timestamp": timestamp,
-        "topic": topic,
-        "difficulty": difficulty,
-        "score": score,
-        "total": total,
-        "accuracy": score / total if total > 0 else 0,
-        "question_details": question_metrics
-    }
+    performance_data = performance_record(topic, score, total, difficulty, questions, answers)
     
     # Append to session state user data
-    st.session_state.user_data.append(performance_data)
+    record_history(performance_data)
     
     # Return a summary for adaptive difficulty
-    return {
-        "topic": topic,
-        "accuracy": performance_data["accuracy"],
-        "difficulty": difficulty
-    }
+    return performance_summary(performance_data)
+
+# Function to add a performance record to the history and its indexes
+def record_history(performance_data, persist=True):
+    """
+    Append a performance record and index it by topic and in the answers table
+    """
+    # Records with full question details (older versions, imports) are stored by id;
+    # only complete questions ever go into the shared question store
+    performance_data = compact_record(performance_data)
+    st.session_state.user_data.append(performance_data)
+    if persist:
+        state_backend.push(f"session:{session_id}:history", performance_data, ttl=SESSION_TTL)
+    registry = st.session_state.topic_registry
+    registry.add_record(performance_data["topic"], len(st.session_state.user_data) - 1)
+    st.session_state.answer_table.add_quiz(
+        registry.display_name(performance_data["topic"]),
+        performance_data["question_ids"],
+        performance_data["answers"],
+        performance_data["correct_answers"]
+    )
+
+# Function to summarize recent quizzes for the generation prompt
+def recent_performance():
+    """
+    Topic, accuracy and difficulty of the quizzes held in memory (records only refer to
+    their questions by id, which mean nothing to the LLM)
+    """
+    return [performance_summary(record) for record in st.session_state.user_data.recent()]
+
+# Function to save the quiz in progress (without its answers) to the shared backend
+def save_quiz_snapshot():
+    """
+    Save the current quiz's questions and settings under its resume token; called when
+    a quiz starts or grows, not on every answer
+    """
+    snapshot = {field: st.session_state[field] for field in SNAPSHOT_FIELDS}
+    # The questions are already in the question store, so only their ids are saved
+    snapshot["question_ids"] = [question.id for question in st.session_state.questions]
+    quiz_snapshots.save(st.session_state.quiz_token, snapshot)
+
+# Function to forget the quiz in progress once it is left for a new one
+def clear_quiz_snapshot():
+    """
+    Delete the current quiz's snapshot and drop its resume token from the URL
+    """
+    if st.session_state.quiz_token:
+        quiz_snapshots.delete(st.session_state.quiz_token)
+    st.session_state.quiz_token = None
+    if "quiz" in st.query_params:
+        del st.query_params["quiz"]
+
+# Function to continue a quiz from its snapshot
+def resume_quiz(token):
+    """
+    Load the quiz saved under a resume token, without calling the LLM; returns False if
+    it no longer exists
+    """
+    saved = quiz_snapshots.load(token)
+    if saved is None:
+        return False
+    snapshot, answers = saved
+    questions = question_store.get_many(snapshot["question_ids"])
+    if None in questions:
+        return False  # Questions expired from the store
+    
+    answers = answers[:len(questions)]
+    st.session_state.quiz_token = token
+    for field in SNAPSHOT_FIELDS:
+        # Snapshots saved before a field existed keep the session's value
+        st.session_state[field] = snapshot.get(field, st.session_state[field])
+    st.session_state.quiz_topic = st.session_state.topic
+    st.session_state.questions = localize(questions)
+    st.session_state.answers = answers
+    st.session_state.feedback = [answer == question.answer for question, answer in zip(questions, answers)]
+    st.session_state.score = sum(st.session_state.feedback)
+    st.session_state.once = False
+    st.session_state.done = len(answers) >= st.session_state.total
+    # Continue at the first unanswered question (the last one once the quiz is finished)
+    st.session_state.current_question = min(len(answers), st.session_state.total - 1)
+    return True
+
+# Function to load this session's state from the shared backend
+def restore_session_state():
+    """
+    Rebuild history and the quiz in progress after a refresh, a reconnect or a move
+    to another worker
+    """
+    for performance_data in state_backend.range(f"session:{session_id}:history"):
+        record_history(performance_data, persist=False)
+    st.session_state.seen_quizzes = state_backend.range(f"session:{session_id}:seen")
+    token = st.query_params.get("quiz")
+    if token and not resume_quiz(token):
+        del st.query_params["quiz"]
+
+# Function to remember a cached quiz this session has been served
+def mark_quiz_seen(cached_quiz_id):
+    st.session_state.seen_quizzes.append(cached_quiz_id)
+    state_backend.push(f"session:{session_id}:seen", cached_quiz_id, max_length=MAX_SEEN_QUIZZES, ttl=SESSION_TTL)
+
+# Function to show questions in the selected language
+def localize(questions):
+    """
+    The questions translated into the session's language (cached translations are
+    reused, the rest take one LLM call); the originals if translation fails
+    """
+    language = st.session_state.language
+    if language == SOURCE_LANGUAGE:
+        return list(questions)
+    try:
+        return translate_questions(llm.for_purpose("translation"), translation_cache, questions, language)
+    except QuotaExceededError as e:
+        st.warning(f"⛔ {str(e)} The questions are shown in {SOURCE_LANGUAGE}.")
+    except Exception as e:
+        st.warning(f"Could not translate the questions into {language} ({str(e)}). They are shown in {SOURCE_LANGUAGE}.")
+    return list(questions)
+
+# Function to translate background-generated questions in the background job itself
+def translation_job(language):
+    """
+    A function that translates generated questions into the translation cache from a
+    worker thread, or None when no translation is needed
+    """
+    if language == SOURCE_LANGUAGE:
+        return None
+    translation_llm = llm.for_purpose("translation")
+    
+    def prepare(questions):
+        try:
+            translate_questions(
+                translation_llm, translation_cache, [Question.from_list(q) for q in questions], language
+            )
+        except Exception:
+            pass  # The questions are then shown in the source language
+    return prepare
+
+# Function to switch the current quiz to the newly selected language
+def change_language():
+    """
+    Show the quiz in progress (or just finished) in the new language, keeping its answers
+    """
+    if not st.session_state.questions:
+        return
+    originals = question_store.get_many([question.id for question in st.session_state.questions])
+    if None in originals:
+        return  # Questions expired from the store: the next quiz uses the new language
+    st.session_state.questions = localize(originals)
+    if st.session_state.quiz_token:
+        save_quiz_snapshot()
+
+# Function to reset the quiz state for a new set of questions
+def start_quiz(questions, plan=None):
+    """
+    Load a list of questions as the current quiz and reset progress
+
+    A plan marks a long quiz whose remaining questions are generated in the background.
+    The quiz gets a new resume token, kept in the URL so a refresh continues it.
+    """
+    clear_quiz_snapshot()
+    st.session_state.quiz_token = uuid.uuid4().hex
+    st.query_params["quiz"] = st.session_state.quiz_token
+    st.session_state.questions = localize(question_store.put(questions))
+    st.session_state.quiz_plan = plan
+    # The topic box may be edited during the quiz; results are saved under this topic
+    st.session_state.quiz_topic = st.session_state.topic
+    st.session_state.total = plan["target"] if plan else len(questions)
+    st.session_state.current_question = 0
+    st.session_state.score = 0
+    st.session_state.answers = []
+    st.session_state.feedback = []
+    st.session_state.once = False
+    st.session_state.done = False
+    save_quiz_snapshot()
+
+# Function to add background-generated questions to a long quiz
+def top_up_questions(wait=False):
+    """
+    Append any finished background batch and request the next one when running low
+    """
+    plan = st.session_state.quiz_plan
+    if not plan or plan.get("kind") in FIXED_PLAN_KINDS:
+        return
+    generator = st.session_state.get("batch_generator")
+    if generator is None or generator.plan is not plan:
+        # New quiz, or progress restored on another worker
+        if isinstance(generator, LookaheadQuiz):
+            generator.close()
+        if plan.get("kind") == "adaptive":
+            generator = LookaheadQuiz(plan, question_pool)
+        else:
+            generator = ProgressiveQuiz(plan)
+        st.session_state.batch_generator = generator
+    # Questions are translated in the background job that generates them, so picking
+    # them up here never waits for a translation call
+    generator.prepare = translation_job(st.session_state.language)
+    
+    new_questions = generator.top_up(
+        get_executor(), llm.for_purpose("background"), st.session_state.questions, st.session_state.feedback, wait=wait
+    )
+    if new_questions:
+        st.session_state.questions.extend(
+            cached_translations(translation_cache, question_store.put(new_questions), st.session_state.language)
+        )
+        question_index.add(new_questions, plan["topic"], plan["difficulty"])
+    if generator.exhausted:
+        # Background generation keeps failing: end the quiz with what we have
+        st.session_state.total = len(st.session_state.questions)
+    if new_questions or generator.exhausted:
+        save_quiz_snapshot()
 
 # Function to display analytics
 def display_analytics():
@@ -394,28 +485,18 @@ def display_analytics():
         st.info("📊 No performance data available yet. Complete a quiz to see analytics.")
         
         # Show sample analytics UI
-        st.markdown(
-            """
-            <div style='background-color: #f8f9fa; padding: 20px; border-radius: 10px; margin: 20px 0; border-left: 4px solid #6c5ce7;'>
-                <h4 style='color: #6c5ce7; margin-top: 0;'>Analytics Preview</h4>
-                <p>After completing quizzes, you'll see detailed analytics including:</p>
-                <ul>
-                    <li>Performance trends over time</li>
-                    <li>Topic strengths and weaknesses</li>
-                    <li>Difficulty progression</li>
-                    <li>Question-level analysis</li>
-                </ul>
-                <p>Take a quiz to start building your personalized learning profile!</p>
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
+        st.markdown(ANALYTICS_PREVIEW_HTML, unsafe_allow_html=True)
         return
     
-    # Create dataframes for analysis
+    # Charting libraries are only loaded when the Analytics page is shown
+    import pandas as pd
+    import plotly.express as px
+    
+    # Create dataframes for analysis, merging different spellings of the same topic
+    registry = st.session_state.topic_registry
     df = pd.DataFrame([
         {
-            "Topic": data["topic"],
+            "Topic": registry.display_name(data["topic"]),
             "Difficulty": data["difficulty"],
             "Score": data["score"],
             "Total": data["total"],
@@ -425,59 +506,25 @@ def display_analytics():
     ])
     
     # Overall stats with card styling
-    st.markdown("<h3 style='color: #6c5ce7; margin-bottom: 20px;'>📈 Overall Performance</h3>", unsafe_allow_html=True)
+    st.markdown(SECTION_TITLE_HTML.format(title="📈 Overall Performance"), unsafe_allow_html=True)
     
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.markdown(
-            f"""
-            <div class='metric-card'>
-                <div class='metric-label'>Total Quizzes</div>
-                <div class='metric-value'>{len(df)}</div>
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
+        st.markdown(METRIC_CARD_HTML.format(label="Total Quizzes", value=len(df)), unsafe_allow_html=True)
     
     with col2:
-        st.markdown(
-            f"""
-            <div class='metric-card'>
-                <div class='metric-label'>Average Accuracy</div>
-                <div class='metric-value'>{df['Accuracy'].mean():.0%}</div>
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
+        st.markdown(METRIC_CARD_HTML.format(label="Average Accuracy", value=f"{df['Accuracy'].mean():.0%}"), unsafe_allow_html=True)
     
     with col3:
-        st.markdown(
-            f"""
-            <div class='metric-card'>
-                <div class='metric-label'>Topics Covered</div>
-                <div class='metric-value'>{df['Topic'].nunique()}</div>
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
+        st.markdown(METRIC_CARD_HTML.format(label="Topics Covered", value=df['Topic'].nunique()), unsafe_allow_html=True)
     
     # Topic performance
-    st.markdown("<div style='height: 30px;'></div>", unsafe_allow_html=True)
-    st.markdown("<h3 style='color: #6c5ce7; margin-bottom: 20px;'>📚 Performance by Topic</h3>", unsafe_allow_html=True)
+    st.markdown(SPACER_HTML[30], unsafe_allow_html=True)
+    st.markdown(SECTION_TITLE_HTML.format(title="📚 Performance by Topic"), unsafe_allow_html=True)
     
     # Create an analytics card for topic performance
-    st.markdown(
-        """
-        <div class='analytics-card'>
-            <p style='color: #666; margin-bottom: 20px;'>
-                This chart shows your average accuracy for each topic you've studied.
-                Higher bars indicate better understanding of those topics.
-            </p>
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
+    st.markdown(TOPIC_CHART_NOTE_HTML, unsafe_allow_html=True)
     
     topic_df = df.groupby("Topic").agg({
         "Accuracy": "mean",
@@ -520,49 +567,27 @@ def display_analytics():
     st.plotly_chart(fig, use_container_width=True)
     
     # Show detailed topic statistics
-    st.markdown("<div style='height: 10px;'></div>", unsafe_allow_html=True)
+    st.markdown(SPACER_HTML[10], unsafe_allow_html=True)
     with st.expander("View Detailed Topic Statistics"):
         # Create a formatted table
         for i, row in topic_df.iterrows():
-            topic_color = "#6c5ce7" if row["Accuracy"] >= 0.7 else "#e74c3c" if row["Accuracy"] < 0.5 else "#3498db"
+            level = "topic-strong" if row["Accuracy"] >= 0.7 else "topic-weak" if row["Accuracy"] < 0.5 else "topic-fair"
             
             st.markdown(
-                f"""
-                <div style='padding: 15px; margin-bottom: 10px; border-radius: 8px; border-left: 4px solid {topic_color}; background-color: white;'>
-                    <h4 style='margin: 0 0 10px 0; color: {topic_color};'>{row["Topic"]}</h4>
-                    <div style='display: flex; justify-content: space-between;'>
-                        <div>
-                            <strong>Questions Answered:</strong> {int(row["Total"])}
-                        </div>
-                        <div>
-                            <strong>Correct Answers:</strong> {int(row["Score"])}
-                        </div>
-                        <div>
-                            <strong>Accuracy:</strong> {row["Accuracy"]:.0%}
-                        </div>
-                    </div>
-                </div>
-                """,
+                TOPIC_STATS_HTML.format(
+                    level=level, topic=row["Topic"], total=int(row["Total"]), score=int(row["Score"]),
+                    accuracy=row["Accuracy"]
+                ),
                 unsafe_allow_html=True
             )
     
     # Difficulty progression
     if len(df) > 1:
-        st.markdown("<div style='height: 30px;'></div>", unsafe_allow_html=True)
-        st.markdown("<h3 style='color: #6c5ce7; margin-bottom: 20px;'>🔄 Learning Progression</h3>", unsafe_allow_html=True)
+        st.markdown(SPACER_HTML[30], unsafe_allow_html=True)
+        st.markdown(SECTION_TITLE_HTML.format(title="🔄 Learning Progression"), unsafe_allow_html=True)
         
         # Create an analytics card for learning progression
-        st.markdown(
-            """
-            <div class='analytics-card'>
-                <p style='color: #666; margin-bottom: 20px;'>
-                    This chart shows how your performance has changed over time.
-                    Upward trends indicate improvement in your understanding.
-                </p>
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
+        st.markdown(PROGRESSION_CHART_NOTE_HTML, unsafe_allow_html=True)
         
         fig = px.line(
             df,
@@ -601,7 +626,7 @@ def display_analytics():
         st.plotly_chart(fig, use_container_width=True)
         
         # Add difficulty progression visualization
-        st.markdown("<div style='height: 10px;'></div>", unsafe_allow_html=True)
+        st.markdown(SPACER_HTML[10], unsafe_allow_html=True)
         
         # Create difficulty level counts
         difficulty_counts = df.groupby(["Topic", "Difficulty"]).size().reset_index(name="Count")
@@ -642,39 +667,27 @@ def display_analytics():
         
         st.plotly_chart(fig, use_container_width=True)
     
+    # Question-level statistics across the whole history
+    display_item_statistics()
+    
     # Question-level analysis (most recent quiz)
     if st.session_state.user_data:
-        st.markdown("<div style='height: 30px;'></div>", unsafe_allow_html=True)
-        st.markdown("<h3 style='color: #6c5ce7; margin-bottom: 20px;'>🔍 Recent Quiz Analysis</h3>", unsafe_allow_html=True)
+        st.markdown(SPACER_HTML[30], unsafe_allow_html=True)
+        st.markdown(SECTION_TITLE_HTML.format(title="🔍 Recent Quiz Analysis"), unsafe_allow_html=True)
         
         # Create an analytics card
         last_quiz = st.session_state.user_data[-1]
-        questions_df = pd.DataFrame(last_quiz["question_details"])
+        questions_df = pd.DataFrame(
+            question_details(last_quiz, question_store.get_many(last_quiz["question_ids"]))
+        )
         
         # Add a summary of the most recent quiz
         st.markdown(
-            f"""
-            <div class='analytics-card'>
-                <h4 style='color: #6c5ce7; margin: 0 0 15px 0;'>Latest Quiz: {last_quiz['topic']} ({last_quiz['difficulty']})</h4>
-                <div style='display: flex; justify-content: space-between; margin-bottom: 20px;'>
-                    <div style='text-align: center; padding: 10px 15px; background-color: #f8f9fa; border-radius: 8px;'>
-                        <div style='font-size: 16px;'>Score</div>
-                        <div style='font-size: 24px; font-weight: 500;'>{last_quiz['score']} / {last_quiz['total']}</div>
-                    </div>
-                    <div style='text-align: center; padding: 10px 15px; background-color: #f8f9fa; border-radius: 8px;'>
-                        <div style='font-size: 16px;'>Accuracy</div>
-                        <div style='font-size: 24px; font-weight: 500;'>{last_quiz['accuracy']:.0%}</div>
-                    </div>
-                    <div style='text-align: center; padding: 10px 15px; background-color: #f8f9fa; border-radius: 8px;'>
-                        <div style='font-size: 16px;'>Date</div>
-                        <div style='font-size: 18px;'>{last_quiz['timestamp'].split()[0]}</div>
-                    </div>
-                </div>
-                <p style='color: #666;'>
-                    This chart shows your performance on each question in your most recent quiz.
-                </p>
-            </div>
-            """,
+            LATEST_QUIZ_HTML.format(
+                topic=last_quiz["topic"], difficulty=last_quiz["difficulty"], score=last_quiz["score"],
+                total=last_quiz["total"], accuracy=last_quiz["accuracy"], date=last_quiz["timestamp"].split()[0],
+                note="This chart shows your performance on each question in your most recent quiz."
+            ),
             unsafe_allow_html=True
         )
         
@@ -717,13 +730,7 @@ def display_analytics():
         col1, col2 = st.columns(2)
         
         with col1:
-            st.markdown(
-                """
-                <div style='background-color: #d4edda; padding: 15px; border-radius: 8px; height: 100%;'>
-                    <h4 style='color: #28a745; margin-top: 0;'>💪 Strengths</h4>
-                """,
-                unsafe_allow_html=True
-            )
+            st.markdown(STRENGTHS_HTML, unsafe_allow_html=True)
             
             if correct_count > 0:
                 correct_questions = questions_df[questions_df["is_correct"]]
@@ -733,13 +740,7 @@ def display_analytics():
                 st.write("No correct answers in this quiz.")
         
         with col2:
-            st.markdown(
-                """
-                <div style='background-color: #f8d7da; padding: 15px; border-radius: 8px; height: 100%;'>
-                    <h4 style='color: #dc3545; margin-top: 0;'>🎯 Areas to Improve</h4>
-                """,
-                unsafe_allow_html=True
-            )
+            st.markdown(AREAS_TO_IMPROVE_HTML, unsafe_allow_html=True)
             
             if incorrect_count > 0:
                 incorrect_questions = questions_df[~questions_df["is_correct"]]
@@ -749,50 +750,774 @@ def display_analytics():
                 st.write("Perfect score! No areas to improve.")
         
         # Recommendations based on performance
-        st.markdown("<div style='height: 20px;'></div>", unsafe_allow_html=True)
+        st.markdown(SPACER_HTML[20], unsafe_allow_html=True)
+        accuracy = last_quiz["accuracy"]
+        recommendations = html_list([
+            "Consider moving to a <strong>harder difficulty</strong> for this topic." if accuracy > 0.8 else "",
+            "You're doing well! Continue practicing at the current difficulty." if 0.6 <= accuracy <= 0.8 else "",
+            "Try studying this topic more or attempt an <strong>easier difficulty</strong>." if accuracy < 0.6 else "",
+            "Focus on reviewing the questions you answered incorrectly." if incorrect_count > 0 else "",
+            "Try a new related topic to expand your knowledge." if accuracy > 0.7 else "",
+        ])
         st.markdown(
-            f"""
-            <div style='background-color: #f8f9fa; padding: 20px; border-radius: 10px; margin: 20px 0; border-left: 5px solid #6c5ce7;'>
-                <h4 style='color: #6c5ce7; margin-top: 0;'>🎓 Learning Recommendations</h4>
-                <p>Based on your performance in the "{last_quiz['topic']}" quiz:</p>
-                <ul>
-                    {"<li>Consider moving to a <strong>harder difficulty</strong> for this topic.</li>" if last_quiz['accuracy'] > 0.8 else ""}
-                    {"<li>You're doing well! Continue practicing at the current difficulty.</li>" if 0.6 <= last_quiz['accuracy'] <= 0.8 else ""}
-                    {"<li>Try studying this topic more or attempt an <strong>easier difficulty</strong>.</li>" if last_quiz['accuracy'] < 0.6 else ""}
-                    {"<li>Focus on reviewing the questions you answered incorrectly.</li>" if incorrect_count > 0 else ""}
-                    {"<li>Try a new related topic to expand your knowledge.</li>" if last_quiz['accuracy'] > 0.7 else ""}
-                </ul>
-            </div>
-            """,
+            INFO_PANEL_HTML.format(
+                title="🎓 Learning Recommendations",
+                body=f"<p>Based on your performance in the \"{last_quiz['topic']}\" quiz:</p>{recommendations}"
+            ),
             unsafe_allow_html=True
         )
 
+# Function to display question-level statistics across all quizzes
+def display_item_statistics():
+    """
+    Display per-question difficulty, discrimination, distractors and weak concepts
+    """
+    from item_analysis import item_statistics, weak_concept_clusters
+    
+    table = st.session_state.answer_table
+    stats = item_statistics(table, question_store.get_many(table.question_ids))
+    if stats.empty:
+        return
+    
+    st.markdown(SPACER_HTML[30], unsafe_allow_html=True)
+    st.markdown(SECTION_TITLE_HTML.format(title="🧪 Question Statistics (All Quizzes)"), unsafe_allow_html=True)
+    
+    st.markdown(ITEM_STATISTICS_NOTE_HTML, unsafe_allow_html=True)
+    
+    st.dataframe(
+        stats.drop(columns=["question_id"]).sort_values("p_value"),
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "question_text": st.column_config.TextColumn("Question", width="large"),
+            "topic": "Topic",
+            "attempts": "Attempts",
+            "p_value": st.column_config.NumberColumn("P-value", format="%.2f"),
+            "discrimination": st.column_config.NumberColumn("Discrimination", format="%.2f"),
+            "correct_answer": "Key",
+            "pct_A": st.column_config.ProgressColumn("A", format="%.2f", min_value=0, max_value=1),
+            "pct_B": st.column_config.ProgressColumn("B", format="%.2f", min_value=0, max_value=1),
+            "pct_C": st.column_config.ProgressColumn("C", format="%.2f", min_value=0, max_value=1),
+            "pct_D": st.column_config.ProgressColumn("D", format="%.2f", min_value=0, max_value=1),
+            "top_distractor": "Top Distractor",
+        }
+    )
+    
+    # Weak concept clusters per topic
+    clusters = weak_concept_clusters(stats)
+    if clusters:
+        with st.expander("View Weak Concepts by Topic"):
+            for topic, topic_clusters in clusters.items():
+                st.markdown(WEAK_TOPIC_HTML.format(topic=topic), unsafe_allow_html=True)
+                for term, questions in topic_clusters:
+                    st.markdown(f"**{term}** ({len(questions)} questions)")
+                    for question in questions:
+                        st.markdown(f"✗ {question[:80]}...")
+
+# Function to list this session's questions for export
+def stored_question_records():
+    """
+    Export records of every question in this session's history and current quiz, read
+    from the question store, with the topic and difficulty they were asked at
+    """
+    exported = set()
+    quizzes = [
+        (record["question_ids"], record["topic"], record["difficulty"]) for record in st.session_state.user_data
+    ]
+    quizzes.append((
+        [question.id for question in st.session_state.questions],
+        st.session_state.get("quiz_topic") or st.session_state.topic,
+        st.session_state.difficulty_level
+    ))
+    for question_ids, topic, difficulty in quizzes:
+        new_ids = [question_id for question_id in question_ids if question_id not in exported]
+        exported.update(new_ids)
+        for question in question_store.get_many(new_ids):
+            if question is not None:  # Expired from the store
+                yield question_to_record(question.to_list(), topic, difficulty)
+
+# Function to export and import history and question data
+def display_data_transfer():
+    """
+    Download or upload quiz history and questions as JSONL or Parquet
+    """
+    st.markdown(SPACER_HTML[30], unsafe_allow_html=True)
+    st.markdown(SECTION_TITLE_HTML.format(title="💾 Export & Import"), unsafe_allow_html=True)
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        kind = st.selectbox("Data:", ["history", "questions"], key="export_kind")
+        fmt = st.selectbox("Format:", list(FORMATS), key="export_format")
+        # Only build the export when asked, not on every rerun of the page
+        if st.button("📦 Prepare Export", use_container_width=True):
+            if kind == "history":
+                # Exports carry the question texts so they can be read without this app
+                records = (
+                    expanded_record(record, question_store.get_many(record["question_ids"]))
+                    for record in st.session_state.user_data
+                )
+            else:
+                records = stored_question_records()
+            with export_to_tempfile(records, kind, fmt) as export_file:
+                st.download_button(
+                    f"⬇️ Download {kind.title()}",
+                    data=export_file.read(),
+                    file_name=f"mcq_{kind}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}",
+                    mime="application/octet-stream",
+                    use_container_width=True
+                )
+    
+    with col2:
+        import_kind = st.selectbox("Import as:", ["history", "questions"], key="import_kind")
+        uploaded = st.file_uploader("Upload an export file", type=["jsonl", "parquet"], key="import_file")
+        if uploaded is not None and st.button("⬆️ Import", use_container_width=True):
+            if import_kind == "history":
+                def sink(chunk):
+                    for record in chunk:
+                        record_history(record)
+            else:
+                imported_questions = []
+                def sink(chunk):
+                    # Saved chunk by chunk, like history records, so a resumed import keeps them
+                    imported_questions.extend(question_store.put([record_to_question(record) for record in chunk]))
+            
+            # Importing the same file again continues after the last chunk that was saved
+            checkpoint = checkpoint_path(uploaded, session_id, import_kind)
+            resumed = os.path.exists(checkpoint)
+            try:
+                count = import_records(
+                    uploaded, import_kind, sink, fmt=detect_format(uploaded.name), checkpoint=checkpoint
+                )
+            except (SchemaError, ValueError, KeyError) as e:
+                st.error(f"Could not import file: {str(e)}")
+                return
+            
+            if import_kind == "questions" and resumed:
+                # The chunks saved before the interruption belong to the quiz too: read
+                # the whole file again (the questions are already in the store)
+                imported_questions = []
+                import_records(
+                    uploaded, import_kind, lambda chunk: imported_questions.extend(map(record_to_question, chunk)),
+                    fmt=detect_format(uploaded.name)
+                )
+            if import_kind == "questions" and imported_questions:
+                start_quiz(imported_questions)
+            st.success(f"Imported {count} {'more ' if resumed else ''}{import_kind} records.")
+
+# Function to start a quiz from the questions picked on the search page
+def start_search_quiz(query, hits, difficulty):
+    """
+    Start a quiz from the selected search results (without calling the LLM) and open it
+    """
+    questions = [hit["question"] for hit in hits if st.session_state.get(f"search_pick_{hit['question'].id}")]
+    if not questions:
+        return
+    llm.record_cache_hit()
+    start_quiz(questions, plan=new_search_plan(query, len(questions), difficulty))
+    st.session_state.nav_page = NAV_PAGES[0]
+
+# Function to display the question search page
+def display_search():
+    """
+    Search every generated question by its text, options, explanation and topic
+    """
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        query = st.text_input(
+            "Search:", key="search_query", placeholder="Words to look for, e.g. recursion base case"
+        )
+    with col2:
+        difficulty = st.selectbox("Difficulty:", ["Any"] + DIFFICULTY_LEVELS, key="search_difficulty")
+    difficulty = None if difficulty == "Any" else difficulty
+    
+    if not query.strip():
+        st.info(f"🔎 {question_index.count():,} questions can be searched. Every generated question is added.")
+        return
+    
+    started = time.perf_counter()
+    hits = question_index.search(query, SEARCH_RESULTS, difficulty=difficulty)
+    st.caption(f"{len(hits)} result{'s' if len(hits) != 1 else ''} in {(time.perf_counter() - started) * 1000:.0f} ms")
+    if not hits:
+        st.warning("No questions contain all of these words.")
+        return
+    
+    for hit in hits:
+        question = hit["question"]
+        col1, col2 = st.columns([1, 20])
+        with col1:
+            st.checkbox("Use", value=True, key=f"search_pick_{question.id}", label_visibility="collapsed")
+        with col2:
+            with st.expander(f"{question.text}  ·  {hit['topic']} · {hit['difficulty']}"):
+                options = "".join(
+                    f"<li>{'<b>' if letter == question.answer else ''}{letter}. {highlight(option, query)}"
+                    f"{' ✓</b>' if letter == question.answer else ''}</li>"
+                    for letter, option in zip("ABCD", question.options)
+                )
+                st.markdown(
+                    SEARCH_HIT_HTML.format(options=options, explanation=highlight(question.explanation, query)),
+                    unsafe_allow_html=True
+                )
+    
+    selected = sum(bool(st.session_state.get(f"search_pick_{hit['question'].id}")) for hit in hits)
+    st.button(
+        f"📝 Practice {selected} selected question{'s' if selected != 1 else ''}",
+        key="search_quiz_button",
+        use_container_width=True,
+        type="primary",
+        disabled=not selected,
+        on_click=start_search_quiz,
+        args=(query, hits, difficulty)
+    )
+
+# Function to join a class quiz as a student
+def join_class():
+    """
+    Start the class quiz of the entered join code, served without calling the LLM, and open it
+    """
+    code = normalize_code(st.session_state.class_code)
+    name = st.session_state.class_student_name.strip()
+    if not name:
+        st.session_state.class_error = "Enter your name so your teacher can see your results."
+        return
+    loaded = classroom.load(code) if code else None
+    if loaded is None:
+        st.session_state.class_error = f"No class quiz was found for the code {code or '(empty)'}."
+        return
+    quiz, questions = loaded
+    st.session_state.class_error = None
+    llm.record_cache_hit()
+    start_quiz(questions, plan=new_class_plan(code, quiz, name))
+    classroom.record_join(code, session_id, name)
+    st.session_state.nav_page = NAV_PAGES[0]
+
+# Live results of a class, refreshed on their own while the instructor watches
+@st.fragment(run_every=CLASS_REFRESH_SECONDS)
+def render_class_results(code):
+    """
+    Show who joined and finished, the class accuracy, each student's score and how the
+    class answered every question
+    """
+    loaded = classroom.load(code)
+    if loaded is None:
+        st.warning(f"The class quiz {code} has expired.")
+        return
+    quiz, questions = loaded
+    if quiz["instructor"] != session_id:
+        st.warning("Only the instructor who published this quiz can see its results.")
+        return
+    summary = class_summary(questions, *classroom.activity(code))
+    
+    st.markdown(
+        JOIN_CODE_HTML.format(
+            code=code, details=f"{quiz['topic']} · {quiz['difficulty']} · {len(questions)} questions"
+        ),
+        unsafe_allow_html=True
+    )
+    st.caption(
+        f"Students enter the code on the 👩‍🏫 Class page, or open the app with ?join={code} at the end of its address."
+    )
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Joined", summary["joined"])
+    with col2:
+        st.metric("Finished", summary["finished"])
+    with col3:
+        st.metric("Class Accuracy", f"{summary['average_accuracy']:.0%}" if summary["finished"] else "–")
+    
+    if not summary["finished"]:
+        st.info(f"⏳ Waiting for results. This view refreshes every {CLASS_REFRESH_SECONDS} seconds.")
+        return
+    st.dataframe(
+        summary["students"],
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "student": "Student",
+            "score": st.column_config.NumberColumn("Score", format=f"%d / {len(questions)}"),
+            "accuracy": st.column_config.ProgressColumn("Accuracy", format="%.2f", min_value=0, max_value=1),
+        }
+    )
+    st.dataframe(
+        summary["questions"],
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "number": "#",
+            "question": st.column_config.TextColumn("Question", width="large"),
+            "answer": "Key",
+            "correct": st.column_config.ProgressColumn("Correct", format="%.2f", min_value=0, max_value=1),
+            "pct_A": st.column_config.ProgressColumn("A", format="%.2f", min_value=0, max_value=1),
+            "pct_B": st.column_config.ProgressColumn("B", format="%.2f", min_value=0, max_value=1),
+            "pct_C": st.column_config.ProgressColumn("C", format="%.2f", min_value=0, max_value=1),
+            "pct_D": st.column_config.ProgressColumn("D", format="%.2f", min_value=0, max_value=1),
+        }
+    )
+
+# Function to display the class page for students and instructors
+def display_classroom():
+    """
+    Join a class quiz with a code, or generate one quiz for a whole class and follow its results
+    """
+    join_tab, teach_tab = st.tabs(["🎓 Join a Class", "👩‍🏫 Teach a Class"])
+    
+    with join_tab:
+        col1, col2 = st.columns(2)
+        with col1:
+            st.text_input("Join code:", key="class_code", value=normalize_code(st.query_params.get("join", "")),
+                          placeholder="e.g. K7QX2M")
+        with col2:
+            st.text_input("Your name:", key="class_student_name", placeholder="Shown to your teacher")
+        st.button("🎓 Join", key="join_class_button", use_container_width=True, type="primary", on_click=join_class)
+        if st.session_state.get("class_error"):
+            st.error(st.session_state.class_error)
+    
+    with teach_tab:
+        st.markdown(CLASS_NOTE_HTML, unsafe_allow_html=True)
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            class_topic = st.text_input("Topic:", key="class_topic", placeholder="Topic of today's quiz")
+        with col2:
+            class_difficulty = st.selectbox("Difficulty Level:", DIFFICULTY_LEVELS, index=1, key="class_difficulty")
+        with col3:
+            class_num_questions = st.number_input(
+                "Number of Questions:", min_value=3, max_value=20, value=10, key="class_num_questions"
+            )
+        if st.button("📣 Publish Class Quiz", key="publish_class_button", use_container_width=True,
+                     disabled=not class_topic.strip()):
+            with st.spinner(f"🔮 Generating the class quiz about {class_topic}..."):
+                questions = generate_mcqs(class_topic.strip(), class_difficulty, class_num_questions)
+            if questions:
+                code = classroom.publish(questions, class_topic.strip(), class_difficulty, session_id)
+                state_backend.push(f"session:{session_id}:classes", code, ttl=SESSION_TTL)
+        
+        # Classes published from this session, newest first
+        codes = state_backend.range(f"session:{session_id}:classes")[::-1]
+        if codes:
+            code = st.selectbox("Class:", codes) if len(codes) > 1 else codes[0]
+            render_class_results(code)
+
+# Function to display token usage
+def display_token_usage():
+    """
+    Show today's token usage for this session and the whole app, against the quotas
+    """
+    st.markdown(SPACER_HTML[30], unsafe_allow_html=True)
+    st.markdown(SECTION_TITLE_HTML.format(title="🔢 Token Usage Today"), unsafe_allow_html=True)
+    
+    session_used = usage_ledger.tokens_used(session_id)
+    summary = usage_ledger.summary()
+    totals = summary["totals"]
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric(
+            "This Session",
+            f"{session_used:,} tokens",
+            help=(
+                f"Daily limit per session: {usage_ledger.user_daily_tokens:,} (a new session starts a new count)"
+                if usage_ledger.user_daily_tokens else "No daily limit per session"
+            )
+        )
+    with col2:
+        st.metric(
+            "All Users",
+            f"{totals['total_tokens']:,} tokens",
+            help=f"Daily limit: {usage_ledger.global_daily_tokens:,}" if usage_ledger.global_daily_tokens else "No daily limit"
+        )
+    with col3:
+        requests = totals["llm_calls"] + totals["cache_hits"]
+        st.metric("Cache Hit Rate", f"{totals['cache_hits'] / requests:.0%}" if requests else "–")
+    
+    if usage_ledger.user_daily_tokens:
+        st.progress(min(session_used / usage_ledger.user_daily_tokens, 1.0))
+    
+    if summary["by_purpose"]:
+        with st.expander("View Usage by Model and Purpose"):
+            import pandas as pd
+            st.dataframe(pd.DataFrame(summary["by_model"]), use_container_width=True, hide_index=True)
+            st.dataframe(pd.DataFrame(summary["by_purpose"]), use_container_width=True, hide_index=True)
+
+# Function to record how long the server spent handling an interaction
+def record_interaction_time(scope, started):
+    """
+    Keep the last server-side run times (in ms) for full and quiz-only reruns
+    """
+    st.session_state.interaction_times.append((scope, (time.perf_counter() - started) * 1000))
+
+# Function to keep the result of a profiled rerun
+def store_profile(profile):
+    """
+    Summarize a profiled rerun and keep it for download from the admin panel
+    """
+    st.session_state.profiles.append({
+        "label": f"{datetime.now().strftime('%H:%M:%S')} · {profile.duration * 1000:.0f} ms",
+        "samples": profile.samples,
+        "categories": profile.categories(),
+        "svg": profile.flame_graph_svg(),
+        "folded": profile.folded(),
+    })
+
+def start_profiling(runs):
+    st.session_state.profile_runs_left = runs
+
+# Function to display the admin profiler panel
+def display_profiler_panel():
+    """
+    Let an admin profile the next reruns and download the flame graphs
+    """
+    st.markdown(HEADING_HTML.format(title="🔬 Profiler"), unsafe_allow_html=True)
+    runs = st.number_input("Reruns to profile:", min_value=1, max_value=20, value=3, key="profile_runs")
+    st.button("▶️ Profile Next Reruns", use_container_width=True, on_click=start_profiling, args=(runs,))
+    if st.session_state.profile_runs_left:
+        st.caption(f"Profiling the next {st.session_state.profile_runs_left} reruns...")
+    
+    if st.session_state.profiles:
+        profiles = list(st.session_state.profiles)
+        index = st.selectbox(
+            "Profiled rerun:", range(len(profiles)), index=len(profiles) - 1,
+            format_func=lambda i: profiles[i]["label"], key="profile_choice"
+        )
+        result = profiles[index]
+        for category, seconds in result["categories"].items():
+            if seconds:
+                st.caption(f"{category.title()}: {seconds * 1000:.0f} ms")
+        st.download_button(
+            "⬇️ Flame Graph (SVG)", result["svg"], file_name="mcq_profile.svg",
+            mime="image/svg+xml", use_container_width=True
+        )
+        st.download_button(
+            "⬇️ Folded Stacks", result["folded"], file_name="mcq_profile.folded",
+            mime="text/plain", use_container_width=True
+        )
+
+# Callbacks for the quiz view. They run before the next rerun, so clicking only
+# re-executes the quiz fragment instead of the whole script.
+def answer_question(selected_option, topic, difficulty):
+    """
+    Record the selected answer and move to the next question or finish the quiz
+    """
+    current_idx = st.session_state.current_question
+    question_data = st.session_state.questions[current_idx]
+    
+    # Ignore a second click that arrives before the view has been redrawn
+    if len(st.session_state.answers) > current_idx:
+        return
+    
+    # Record the answer; the only write to the backend on this path is appending it
+    st.session_state.answers.append(selected_option)
+    quiz_snapshots.record_answer(st.session_state.quiz_token, selected_option)
+    
+    # Update score
+    if selected_option == question_data.answer:
+        st.session_state.score += 1
+        st.session_state.feedback.append(True)
+    else:
+        st.session_state.feedback.append(False)
+    
+    # Move to next question or end quiz
+    if current_idx < st.session_state.total - 1:
+        st.session_state.current_question += 1
+        top_up_questions()
+    else:
+        finish_quiz(topic, difficulty)
+
+def go_to_question(offset):
+    """
+    Move to the previous or next question
+    """
+    st.session_state.current_question += offset
+
+def finish_quiz(topic, difficulty):
+    """
+    Save performance data, schedule missed questions for review and mark the quiz as done
+    """
+    plan = st.session_state.quiz_plan
+    if plan and plan.get("kind") in FIXED_PLAN_KINDS:
+        # Review and search quizzes mix topics and difficulties
+        topic, difficulty = plan["topic"], plan["difficulty"]
+    else:
+        # The topic box may have been edited or cleared during the quiz: save the results
+        # under the topic the quiz started with
+        topic = st.session_state.get("quiz_topic") or topic
+    questions = st.session_state.questions
+    if st.session_state.language != SOURCE_LANGUAGE:
+        # Review cards keep the questions in the language they were generated in
+        originals = question_store.get_many([question.id for question in questions])
+        questions = [original or question for original, question in zip(originals, questions)]
+    review_queue.record_quiz(session_id, questions, st.session_state.answers)
+    if plan and plan.get("kind") == "class":
+        # Shown to the instructor in the live class results
+        classroom.record_result(
+            plan["code"], session_id, plan["student"], st.session_state.answers, st.session_state.score
+        )
+    save_performance_data(
+        topic,
+        st.session_state.score,
+        st.session_state.total,
+        difficulty,
+        st.session_state.questions,
+        st.session_state.answers
+    )
+    st.session_state.done = True
+
+# Quiz-taking view, re-executed on its own when the user answers or navigates
+@st.fragment
+def render_quiz(topic, difficulty):
+    """
+    Display the current question card, answer options, explanation and navigation
+    """
+    started = time.perf_counter()
+    
+    # The last answer finished the quiz: rerun the whole page to show the results
+    if st.session_state.done:
+        st.rerun()
+    
+    # Long quiz caught up with background generation: wait for the next batch
+    while st.session_state.current_question >= len(st.session_state.questions):
+        with st.spinner("🔮 Generating more questions..."):
+            top_up_questions(wait=True)
+        if st.session_state.current_question >= st.session_state.total:
+            finish_quiz(topic, difficulty)
+            st.rerun()
+    
+    # Get current question data
+    current_idx = st.session_state.current_question
+    question_data = st.session_state.questions[current_idx]
+    
+    question = question_data.text
+    options = question_data.options  # A, B, C, D
+    correct_answer = question_data.answer
+    
+    # Adaptive quizzes show the difficulty each question was picked at
+    plan = st.session_state.quiz_plan
+    difficulty_label = ""
+    if plan and plan.get("kind") == "adaptive" and current_idx < len(plan["difficulties"]):
+        difficulty_label = f" · {plan['difficulties'][current_idx]}"
+    
+    # Progress indicator with custom styling
+    st.markdown(
+        QUIZ_PROGRESS_HTML.format(number=current_idx + 1, total=st.session_state.total, label=difficulty_label),
+        unsafe_allow_html=True
+    )
+    progress = (current_idx + 1) / st.session_state.total
+    st.progress(progress)
+    
+    # Question card with improved styling
+    with st.container():
+        st.markdown(QUESTION_CARD_HTML.format(question=question), unsafe_allow_html=True)
+        
+        # Answer options
+        option_labels = ["A", "B", "C", "D"]
+        
+        # Check if this question has already been answered
+        already_answered = len(st.session_state.answers) > current_idx
+        
+        st.markdown(ANSWER_PROMPT_HTML, unsafe_allow_html=True)
+        
+        # Create columns for better layout of options
+        col1, col2 = st.columns(2)
+        
+        for i, (label, option) in enumerate(zip(option_labels, options)):
+            # Determine which column to use
+            col = col1 if i % 2 == 0 else col2
+            
+            # Determine button style based on whether the question was already answered
+            with col:
+                if already_answered:
+                    user_answer = st.session_state.answers[current_idx]
+                    is_correct_answer = label == correct_answer
+                    is_user_selection = label == user_answer
+                    
+                    if is_user_selection and is_correct_answer:
+                        button_style = "selected-correct"
+                        icon = "✓"
+                    elif is_user_selection and not is_correct_answer:
+                        button_style = "selected-incorrect"
+                        icon = "✗"
+                    elif is_correct_answer:
+                        button_style = "correct-answer"
+                        icon = "✓"
+                    else:
+                        button_style = ""
+                        icon = ""
+                    
+                    # Display the option as text with appropriate styling
+                    st.markdown(
+                        OPTION_HTML.format(style=button_style, label=label, option=option, note=icon),
+                        unsafe_allow_html=True
+                    )
+                else:
+                    # Display clickable buttons for unanswered questions
+                    st.button(
+                        f"{label}. {option}",
+                        key=f"option_{current_idx}_{label}",
+                        on_click=answer_question,
+                        args=(label, topic, difficulty)
+                    )
+        
+        # Show explanation if the question has been answered
+        if already_answered:
+            with st.expander("📚 View Explanation", expanded=True):
+                st.markdown(EXPLANATION_HTML.format(explanation=question_data.explanation), unsafe_allow_html=True)
+            
+            # Navigation buttons with improved styling
+            st.markdown(SPACER_HTML[20], unsafe_allow_html=True)
+            col1, col2 = st.columns(2)
+            with col1:
+                if current_idx > 0:
+                    st.button("⬅️ Previous Question", use_container_width=True, on_click=go_to_question, args=(-1,))
+            with col2:
+                if current_idx < st.session_state.total - 1:
+                    st.button("Next Question ➡️", use_container_width=True, on_click=go_to_question, args=(1,))
+                elif not st.session_state.done:
+                    st.button("Finish Quiz 🏁", use_container_width=True, on_click=finish_quiz, args=(topic, difficulty))
+    
+    record_interaction_time("quiz", started)
+    if os.getenv("MCQ_SHOW_TIMINGS"):
+        timings = [ms for scope, ms in st.session_state.interaction_times if scope == "quiz"]
+        st.caption(f"⏱️ Quiz view: {timings[-1]:.0f} ms (median {sorted(timings)[len(timings) // 2]:.0f} ms)")
+
+# Quiz-taking view for instant mode, handled entirely by the browser component
+def render_client_quiz(topic, difficulty):
+    """
+    Send the whole quiz to the browser once and grade the answers it submits at the end
+    """
+    questions = st.session_state.questions
+    current_quiz_id = quiz_id(questions)
+    answers = quiz_player(
+        questions=[question.to_list() for question in questions],
+        quiz_id=current_quiz_id,
+        key=f"quiz_player_{current_quiz_id}",
+        default=None
+    )
+    if answers:
+        submit_answers(answers, topic, difficulty)
+        st.rerun()  # Refresh to show the results
+
+def submit_answers(answers, topic, difficulty):
+    """
+    Grade a complete answer vector in one step and finish the quiz
+    """
+    st.session_state.answers = []
+    st.session_state.feedback = []
+    st.session_state.score = 0
+    for question_data, answer in zip(st.session_state.questions, answers):
+        # Anything other than a valid option letter counts as unanswered
+        answer = answer if answer in ("A", "B", "C", "D") else None
+        st.session_state.answers.append(answer)
+        is_correct = answer == question_data.answer
+        st.session_state.score += int(is_correct)
+        st.session_state.feedback.append(is_correct)
+    # The whole answer vector is saved in one backend write
+    quiz_snapshots.record_answers(st.session_state.quiz_token, st.session_state.answers)
+    st.session_state.current_question = st.session_state.total - 1
+    finish_quiz(topic, difficulty)
+
+# Build the review HTML for one answered question as a single fragment
+def build_review_html(number, question, user_answer):
+    """
+    Render a question, its highlighted options and explanation as one collapsible block
+    """
+    options_html = ""
+    for opt, option in zip(["A", "B", "C", "D"], question.options):
+        if opt == question.answer and opt == user_answer:  # Correct and selected
+            style = "selected-correct"
+        elif opt == question.answer:  # Correct but not selected
+            style = "correct-answer"
+        elif opt == user_answer:  # Incorrect and selected
+            style = "selected-incorrect"
+        else:  # Not selected
+            style = ""
+        options_html += OPTION_HTML.format(style=style, label=opt, option=option, note=REVIEW_NOTES[style])
+    
+    return REVIEW_ITEM_HTML.format(
+        icon="✅" if user_answer == question.answer else "❌",
+        number=number,
+        preview=question.text[:60],
+        question=question.text,
+        options=options_html,
+        explanation=EXPLANATION_HTML.format(explanation=question.explanation)
+    )
+
+# Question review for the results page, paginated and re-executed on its own
+@st.fragment
+def render_question_review():
+    """
+    Display the answered questions one page at a time, building each page only once
+    """
+    st.subheader("📝 Question Review")
+    
+    total = len(st.session_state.answers)
+    col1, col2 = st.columns([3, 1])
+    with col2:
+        page_size = st.selectbox("Questions per page:", [10, 25, 50], key="review_page_size")
+    num_pages = max(1, -(-total // page_size))
+    page = 1
+    if num_pages > 1:
+        with col1:
+            page = st.radio("Page:", range(1, num_pages + 1), horizontal=True, key="review_page")
+    
+    # Pages are cached per quiz, so switching back to a page costs nothing
+    cache_key = (quiz_id(st.session_state.questions), st.session_state.language, page_size, page)
+    review_cache = st.session_state.setdefault("review_cache", {})
+    if cache_key not in review_cache:
+        if review_cache and next(iter(review_cache))[:2] != cache_key[:2]:
+            review_cache.clear()  # A new quiz or language: drop the previous pages
+        start = (page - 1) * page_size
+        page_items = islice(zip(st.session_state.questions, st.session_state.answers), start, start + page_size)
+        review_cache[cache_key] = "".join(
+            build_review_html(i, question, user_answer)
+            for i, (question, user_answer) in enumerate(page_items, start=start + 1)
+        )
+    
+    st.markdown(review_cache[cache_key], unsafe_allow_html=True)
+
 # Main application UI
 def main():
     """
     Main Streamlit application
     """
+    # Pick up history and any quiz in progress from the shared backend
+    if not st.session_state.restored:
+        restore_session_state()
+        st.session_state.restored = True
+    
     # Sidebar navigation and information
     with st.sidebar:
         st.image("mcqimage.jpg", width=80)
-        st.markdown("<h1 style='text-align: center; color: #6c5ce7;'>Adaptive MCQ Generator</h1>", unsafe_allow_html=True)
+        st.markdown(SIDEBAR_TITLE_HTML.format(title="Adaptive MCQ Generator"), unsafe_allow_html=True)
         
         st.divider()
         
         # Navigation
-        page = st.radio("📋 Navigation", ["🧠 Generate MCQs", "📊 Analytics"], index=0)
+        # A ?join=<code> link opens the class page with the code filled in
+        if "join" in st.query_params:
+            st.session_state.setdefault("nav_page", "👩‍🏫 Class")
+        page = st.radio("📋 Navigation", NAV_PAGES, key="nav_page")
+        
+        # Questions are generated in English and translated with one extra call per quiz
+        st.selectbox(
+            "🌐 Quiz Language",
+            LANGUAGES,
+            key="language",
+            on_change=change_language,
+            help="Questions are translated from English, keeping the answer letters and the order of the "
+                 "options, so your results can be compared across languages. Translations are cached."
+        )
         
         st.divider()
         
         # About section
-        st.markdown("<h3 style='color: #6c5ce7;'>📌 About</h3>", unsafe_allow_html=True)
+        st.markdown(HEADING_HTML.format(title="📌 About"), unsafe_allow_html=True)
         st.info(
             "This intelligent MCQ generator creates adaptive assessment questions that adjust difficulty based on your performance. "
             "Powered by Groq LLM, it generates high-quality questions for educational assessment."
         )
         
         # Usage tips
-        st.markdown("<h3 style='color: #6c5ce7;'>💡 Tips</h3>", unsafe_allow_html=True)
+        st.markdown(HEADING_HTML.format(title="💡 Tips"), unsafe_allow_html=True)
         st.success(
             "✓ Enter any educational topic\n"
             "✓ Start with Medium difficulty\n"
@@ -800,29 +1525,43 @@ def main():
             "✓ The system adapts to your performance"
         )
         
+        # History memory usage (history beyond the budget is spilled to disk), from the
+        # buffer's own byte counter; walking the whole session state is only done on request
+        history_usage = st.session_state.user_data.memory_usage()
+        st.metric(
+            "💾 History Memory",
+            f"{history_usage['in_memory_bytes'] / 1024:.0f} KB",
+            help=(
+                f"{history_usage['in_memory_records']} recent quizzes in memory, "
+                f"{history_usage['spilled_records']} older quizzes stored on disk. "
+                f"History budget: {history_usage['budget_bytes'] / 1024:.0f} KB."
+            )
+        )
+        if st.toggle("🔍 Measure session state", key="measure_session_state"):
+            memory_usage = session_memory_usage(st.session_state)
+            st.caption(f"Whole session: {sum(memory_usage.values()) / 1024:.0f} KB")
+            largest = sorted(memory_usage.items(), key=lambda item: item[1], reverse=True)[:5]
+            st.caption(" · ".join(f"{key}: {size / 1024:.0f} KB" for key, size in largest))
+        
+        if is_admin():
+            st.divider()
+            display_profiler_panel()
+        
         st.divider()
         
         # GitHub link
-        st.markdown("<h3 style='color: #6c5ce7;'>🔗 Links</h3>", unsafe_allow_html=True)
+        st.markdown(HEADING_HTML.format(title="🔗 Links"), unsafe_allow_html=True)
         st.markdown("[GitHub Repository](https://github.com/Universe7Nandu/McqChatbot)")
         st.markdown("[Report Issues](https://github.com/Universe7Nandu/McqChatbot/issues)")
     
     # Main content area
     if page == "🧠 Generate MCQs":
         # Title section with custom styling
-        st.markdown(
-            """
-            <div class='title-container'>
-                <h1 class='title-text'>🧠 Intelligent MCQ Generator</h1>
-                <p class='subtitle-text'>Create adaptive assessment questions on any educational topic</p>
-            </div>
-            """, 
-            unsafe_allow_html=True
-        )
+        st.markdown(PAGE_TITLES["generate"], unsafe_allow_html=True)
         
         # Input form with improved styling
         with st.container():
-            st.markdown("<h3 style='color: #6c5ce7;'>Enter Topic Details</h3>", unsafe_allow_html=True)
+            st.markdown(HEADING_HTML.format(title="Enter Topic Details"), unsafe_allow_html=True)
             
             col1, col2, col3 = st.columns([2, 1, 1])
             with col1:
@@ -835,8 +1574,8 @@ def main():
             with col2:
                 difficulty = st.selectbox(
                     "Difficulty Level:",
-                    ["Easy", "Medium", "Hard"],
-                    index=["Easy", "Medium", "Hard"].index(st.session_state.difficulty_level)
+                    DIFFICULTY_LEVELS,
+                    index=DIFFICULTY_LEVELS.index(st.session_state.difficulty_level)
                 )
             with col3:
                 num_questions = st.number_input(
@@ -846,6 +1585,56 @@ def main():
                     value=st.session_state.num_questions
                 )
         
+            source_file = st.file_uploader(
+                "📄 Source material (optional):",
+                type=["pdf", "txt", "md"],
+                key="source_document",
+                help="Questions will be based on the most relevant passages of this document."
+            )
+            if source_file is None:
+                st.session_state.document = None
+            elif not st.session_state.document or (
+                (st.session_state.document["name"], st.session_state.document["size"]) != (source_file.name, source_file.size)
+            ):
+                with st.spinner(f"📄 Indexing {source_file.name}..."):
+                    try:
+                        doc_hash, index = load_or_build_index(source_file, source_file.name)
+                        st.session_state.document = {
+                            "hash": doc_hash, "name": source_file.name, "size": source_file.size, "chunks": index.num_chunks
+                        }
+                    except Exception as e:
+                        st.error(f"Could not read {source_file.name}: {str(e)}")
+            
+            st.toggle(
+                "📚 Long practice mode",
+                key="large_quiz",
+                help="Practice with a long quiz. It starts right away and more questions are generated "
+                     "in the background, adjusted to how well you are doing."
+            )
+            if st.session_state.get("large_quiz"):
+                st.number_input(
+                    "Total Questions:",
+                    min_value=20,
+                    max_value=200,
+                    value=100,
+                    step=10,
+                    key="large_quiz_total"
+                )
+            st.toggle(
+                "🎯 Adaptive mode",
+                key="adaptive_quiz",
+                disabled=st.session_state.get("large_quiz", False),
+                help="The difficulty changes after every answer: harder after a correct answer, "
+                     "easier after a wrong one."
+            )
+            st.toggle(
+                "⚡ Instant mode",
+                key="instant_mode",
+                disabled=st.session_state.get("large_quiz", False) or st.session_state.get("adaptive_quiz", False),
+                help="The whole quiz is sent to your browser once. Answers and explanations are shown "
+                     "instantly and your results are submitted when you finish."
+            )
+        
         # Generate button with attractive styling
         generate_button = st.button(
             "🔮 Generate MCQs",
@@ -855,212 +1644,117 @@ def main():
         )
         
         # Help text
-        st.markdown(
-            "<div style='text-align: center; color: #666; font-size: 14px; margin-top: 10px;'>"
-            "The system will generate questions and adapt to your performance over time."
-            "</div>",
-            unsafe_allow_html=True
-        )
+        st.markdown(GENERATE_HELP_HTML, unsafe_allow_html=True)
+        
+        # Questions answered wrongly come back for review at growing intervals
+        due_count = review_queue.due_count(session_id)
+        review_button = False
+        if due_count:
+            review_button = st.button(
+                f"🔁 Review {due_count} missed question{'s' if due_count != 1 else ''}",
+                key="review_button",
+                use_container_width=True,
+                help="Spaced repetition: questions you got wrong are asked again, a little less often "
+                     "each time you get them right. Reviews use saved questions and start instantly."
+            )
+        else:
+            next_due = review_queue.next_due(session_id)
+            if next_due:
+                st.caption(f"🔁 Next review due {datetime.fromtimestamp(next_due):%b %d, %H:%M}")
         
         # Update session state
         st.session_state.topic = topic
         st.session_state.difficulty_level = difficulty
         st.session_state.num_questions = num_questions
         
+        # Start a review quiz from the due questions, without calling the LLM
+        if review_button:
+            questions = review_queue.due_questions(session_id, num_questions)
+            if questions:
+                llm.record_cache_hit()
+                start_quiz(questions, plan=new_review_plan(len(questions)))
+                st.rerun()  # Refresh to show the first question
+        
         # Generate questions when button is clicked
-        if generate_button and topic:
+        if generate_button and topic.strip():
             with st.spinner(f"🔮 Generating questions about {topic}..."):
                 # Determine appropriate difficulty based on past performance
-                if st.session_state.user_data:
-                    # Filter data for the same topic if it exists
-                    topic_data = [d for d in st.session_state.user_data if d["topic"].lower() == topic.lower()]
-                    if topic_data:
-                        # Use the most recent performance data for this topic
-                        recent_data = topic_data[-1]
-                        adaptive_difficulty = determine_difficulty(
-                            difficulty,
-                            recent_data["score"],
-                            recent_data["total"]
-                        )
-                        if adaptive_difficulty != difficulty:
-                            st.info(f"🔄 Based on your previous performance, the difficulty has been adjusted to **{adaptive_difficulty}**.")
-                            difficulty = adaptive_difficulty
-                
-                # Generate questions
-                questions = generate_mcqs(topic, difficulty, num_questions, st.session_state.user_data)
-                
-                if questions:
-                    # Reset quiz state
-                    st.session_state.questions = questions
-                    st.session_state.total = len(questions)
-                    st.session_state.current_question = 0
-                    st.session_state.score = 0
-                    st.session_state.answers = []
-                    st.session_state.explanations = []
-                    st.session_state.feedback = []
-                    st.session_state.once = False
-                    st.session_state.done = False
-                    
-                    st.rerun()  # Refresh to show the first question
-        
-        # Display questions
-        if not st.session_state.once and not st.session_state.done and st.session_state.questions:
-            # Get current question data
-            current_idx = st.session_state.current_question
-            question_data = st.session_state.questions[current_idx]
-            
-            question = question_data[0]
-            options = question_data[1:5]  # A, B, C, D
-            correct_answer = question_data[5]
-            explanation = question_data[6]
-            
-            # Progress indicator with custom styling
-            st.markdown(
-                f"""
-                <div style='margin-bottom: 15px;'>
-                    <p style='color: #6c5ce7; font-weight: 500; margin-bottom: 5px;'>
-                        Question {current_idx + 1} of {st.session_state.total}
-                    </p>
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
-            progress = (current_idx + 1) / st.session_state.total
-            st.progress(progress)
-            
-            # Question card with improved styling
-            with st.container():
-                st.markdown(
-                    f"""
-                    <div class='question-card'>
-                        <h3 style='color: #333; margin-bottom: 20px;'>{question}</h3>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
-                
-                # Answer options
-                option_labels = ["A", "B", "C", "D"]
-                selected_option = None
-                
-                # Check if this question has already been answered
-                already_answered = len(st.session_state.answers) > current_idx
-                
-                st.markdown("<h4 style='color: #6c5ce7; margin-bottom: 15px;'>Select your answer:</h4>", unsafe_allow_html=True)
-                
-                # Create columns for better layout of options
-                col1, col2 = st.columns(2)
+                # Look up the most recent quiz on this topic (any spelling of it)
+                recent_index = st.session_state.topic_registry.latest(topic)
+                if recent_index is not None:
+                    recent_data = st.session_state.user_data[recent_index]
+                    adaptive_difficulty = determine_difficulty(
+                        difficulty,
+                        recent_data["score"],
+                        recent_data["total"]
+                    )
+                    if adaptive_difficulty != difficulty:
+                        st.info(f"🔄 Based on your previous performance, the difficulty has been adjusted to **{adaptive_difficulty}**.")
+                        difficulty = adaptive_difficulty
                 
-                for i, (label, option) in enumerate(zip(option_labels, options)):
-                    # Determine which column to use
-                    col = col1 if i % 2 == 0 else col2
-                    
-                    # Determine button style based on whether the question was already answered
-                    with col:
-                        if already_answered:
-                            user_answer = st.session_state.answers[current_idx]
-                            is_correct_answer = label == correct_answer
-                            is_user_selection = label == user_answer
-                            
-                            if is_user_selection and is_correct_answer:
-                                button_style = "selected-correct"
-                                icon = "✓"
-                            elif is_user_selection and not is_correct_answer:
-                                button_style = "selected-incorrect"
-                                icon = "✗"
-                            elif is_correct_answer:
-                                button_style = "correct-answer"
-                                icon = "✓"
-                            else:
-                                button_style = ""
-                                icon = ""
-                            
-                            # Display the option as text with appropriate styling
-                            st.markdown(
-                                f"<div class='option-button {button_style}'><strong>{label}.</strong> {option} {icon}</div>",
-                                unsafe_allow_html=True
-                            )
-                        else:
-                            # Display clickable buttons for unanswered questions
-                            if st.button(f"{label}. {option}", key=f"option_{current_idx}_{label}"):
-                                selected_option = label
+                # Ground the questions in the most relevant passages of the uploaded document
+                document_hash = st.session_state.document["hash"] if st.session_state.document else None
+                context_passages = load_index(document_hash).search(topic) if document_hash else None
                 
-                # Process selected answer
-                if selected_option:
-                    # Record the answer
-                    st.session_state.answers.append(selected_option)
-                    
-                    # Update score
-                    if selected_option == correct_answer:
-                        st.session_state.score += 1
-                        st.session_state.feedback.append(True)
-                    else:
-                        st.session_state.feedback.append(False)
-                    
-                    # Save explanation
-                    st.session_state.explanations.append(explanation)
-                    
-                    # Move to next question or end quiz
-                    if current_idx < st.session_state.total - 1:
-                        st.session_state.current_question += 1
+                if st.session_state.get("large_quiz"):
+                    # Long practice: start with a small batch, the rest is generated in the background
+                    questions = generate_mcqs(
+                        topic, difficulty, FIRST_BATCH_SIZE, recent_performance(), context_passages
+                    )
+                    # On failure the error stays on screen; no other kind of quiz is started
+                    if questions:
+                        plan = new_plan(topic, difficulty, st.session_state.large_quiz_total, document=document_hash)
+                        plan["batches"] = 1  # The first batch used the top-ranked passages
+                        start_quiz(questions, plan=plan)
+                        top_up_questions()
+                        st.rerun()  # Refresh to show the first question
+                elif st.session_state.get("adaptive_quiz"):
+                    # Adaptive: start with one question, the next ones are picked after each answer
+                    first_question = question_pool.take(topic, difficulty, source=document_hash)
+                    if first_question:
+                        llm.record_cache_hit()
+                    questions = [first_question] if first_question else generate_mcqs(
+                        topic, difficulty, 1, recent_performance(), context_passages
+                    )
+                    # On failure the error stays on screen; no other kind of quiz is started
+                    if questions:
+                        start_quiz(questions, plan=new_adaptive_plan(topic, difficulty, num_questions, document_hash))
+                        top_up_questions()
+                        st.rerun()  # Refresh to show the first question
+                else:
+                    # Reuse a quiz another session already generated, if this session hasn't seen it
+                    cached_quiz_id, questions = question_cache.get(
+                        topic, difficulty, num_questions, seen=st.session_state.seen_quizzes, source=document_hash
+                    )
+                    if questions is not None:
+                        llm.record_cache_hit()
                     else:
-                        # Save performance data
-                        save_performance_data(
-                            topic,
-                            st.session_state.score,
-                            st.session_state.total,
-                            difficulty,
-                            st.session_state.questions,
-                            st.session_state.answers
-                        )
-                        st.session_state.done = True
-                    
-                    st.rerun()  # Refresh to show next question or results
-                
-                # Show explanation if the question has been answered
-                if already_answered:
-                    with st.expander("📚 View Explanation", expanded=True):
-                        st.markdown(
-                            f"""
-                            <div class='explanation-box'>
-                                <h4 style='color: #6c5ce7; margin-top: 0;'>Explanation</h4>
-                                <p>{st.session_state.explanations[current_idx]}</p>
-                            </div>
-                            """,
-                            unsafe_allow_html=True
+                        # Generate questions
+                        questions = generate_mcqs(
+                            topic, difficulty, num_questions, recent_performance(), context_passages
                         )
+                        if questions:
+                            cached_quiz_id = question_cache.add(
+                                topic, difficulty, num_questions, questions, source=document_hash
+                            )
                     
-                    # Navigation buttons with improved styling
-                    st.markdown("<div style='height: 20px;'></div>", unsafe_allow_html=True)
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        if current_idx > 0:
-                            if st.button("⬅️ Previous Question", use_container_width=True):
-                                st.session_state.current_question -= 1
-                                st.rerun()
-                    with col2:
-                        if current_idx < st.session_state.total - 1:
-                            if st.button("Next Question ➡️", use_container_width=True):
-                                st.session_state.current_question += 1
-                                st.rerun()
-                        elif not st.session_state.done:
-                            if st.button("Finish Quiz 🏁", use_container_width=True):
-                                # Save performance data if not already saved
-                                save_performance_data(
-                                    topic,
-                                    st.session_state.score,
-                                    st.session_state.total,
-                                    difficulty,
-                                    st.session_state.questions,
-                                    st.session_state.answers
-                                )
-                                st.session_state.done = True
-                                st.rerun()
+                    if questions:
+                        mark_quiz_seen(cached_quiz_id)
+                        start_quiz(questions)
+                        st.rerun()  # Refresh to show the first question
         
+        # Display questions
+        if not st.session_state.once and not st.session_state.done and st.session_state.questions:
+            if st.session_state.get("instant_mode") and not st.session_state.quiz_plan:
+                render_client_quiz(topic, difficulty)
+            else:
+                render_quiz(topic, difficulty)
+
         # Quiz results with attractive styling
         if st.session_state.done and st.session_state.questions:
             st.balloons()
             
+            from streamlit_extras.colored_header import colored_header
             colored_header(
                 label="🏆 Quiz Results",
                 description=f"Topic: {st.session_state.topic} | Difficulty: {st.session_state.difficulty_level}",
@@ -1072,23 +1766,16 @@ def main():
             
             # Create score card
             st.markdown(
-                f"""
-                <div style='background: linear-gradient(135deg, #6c5ce7, #a29bfe); border-radius: 15px; padding: 20px; text-align: center; color: white; margin-bottom: 30px;'>
-                    <h2 style='margin-bottom: 10px;'>Your Score</h2>
-                    <div style='font-size: 48px; font-weight: 700; margin: 20px 0;'>
-                        {st.session_state.score} / {st.session_state.total}
-                    </div>
-                    <div style='font-size: 24px; font-weight: 500;'>
-                        {score_percentage:.1f}%
-                    </div>
-                </div>
-                """,
+                SCORE_CARD_HTML.format(
+                    score=st.session_state.score, total=st.session_state.total, percentage=score_percentage
+                ),
                 unsafe_allow_html=True
             )
             
             # Performance gauge chart
             col1, col2, col3 = st.columns([1, 2, 1])
             with col2:
+                import matplotlib.pyplot as plt
                 fig, ax = plt.subplots(figsize=(8, 3))
                 ax.set_xlim(0, 100)
                 ax.set_ylim(0, 1)
@@ -1110,90 +1797,25 @@ def main():
                 st.warning("💪 You might need more practice on this topic. Don't give up! Try again to improve your score.")
             
             # Learning recommendation based on performance
+            recommendations = html_list([
+                "Reviewing the basics of this topic before attempting harder questions" if score_percentage < 50 else "",
+                "Focusing on the concepts you answered incorrectly" if score_percentage < 100 else "",
+                "Moving to a higher difficulty level" if score_percentage >= 80 else "",
+                "Practicing with more questions on this topic",
+            ])
             st.markdown(
-                f"""
-                <div style='background-color: #f8f9fa; padding: 20px; border-radius: 10px; margin: 20px 0; border-left: 5px solid #6c5ce7;'>
-                    <h4 style='color: #6c5ce7; margin-top: 0;'>Learning Recommendation</h4>
-                    <p>Based on your performance, you should consider:</p>
-                    <ul>
-                        {"<li>Reviewing the basics of this topic before attempting harder questions</li>" if score_percentage < 50 else ""}
-                        {"<li>Focusing on the concepts you answered incorrectly</li>" if score_percentage < 100 else ""}
-                        {"<li>Moving to a higher difficulty level</li>" if score_percentage >= 80 else ""}
-                        {"<li>Practicing with more questions on this topic</li>"}
-                    </ul>
-                </div>
-                """,
+                INFO_PANEL_HTML.format(
+                    title="Learning Recommendation",
+                    body=f"<p>Based on your performance, you should consider:</p>{recommendations}"
+                ),
                 unsafe_allow_html=True
             )
             
-            # Question review with improved styling
-            st.subheader("📝 Question Review")
-            for i, (question, user_answer, is_correct, explanation) in enumerate(
-                zip(st.session_state.questions, st.session_state.answers, st.session_state.feedback, st.session_state.explanations)
-            ):
-                with st.expander(f"Question {i+1}: {question[0][:60]}...", expanded=False):
-                    # Question card
-                    st.markdown(
-                        f"""
-                        <div style='padding: 15px 0;'>
-                            <h4 style='color: #333;'>{question[0]}</h4>
-                        </div>
-                        """,
-                        unsafe_allow_html=True
-                    )
-                    
-                    # Display options with improved highlighting
-                    for j, opt in enumerate(["A", "B", "C", "D"]):
-                        if opt == question[5] and opt == user_answer:  # Correct and selected
-                            st.markdown(
-                                f"""
-                                <div class='option-button selected-correct'>
-                                    <strong>{opt}.</strong> {question[j+1]} ✓ <span style='color: green;'>(Your answer - Correct)</span>
-                                </div>
-                                """,
-                                unsafe_allow_html=True
-                            )
-                        elif opt == question[5]:  # Correct but not selected
-                            st.markdown(
-                                f"""
-                                <div class='option-button correct-answer'>
-                                    <strong>{opt}.</strong> {question[j+1]} ✓ <span style='color: green;'>(Correct answer)</span>
-                                </div>
-                                """,
-                                unsafe_allow_html=True
-                            )
-                        elif opt == user_answer:  # Incorrect and selected
-                            st.markdown(
-                                f"""
-                                <div class='option-button selected-incorrect'>
-                                    <strong>{opt}.</strong> {question[j+1]} ✗ <span style='color: red;'>(Your answer - Incorrect)</span>
-                                </div>
-                                """,
-                                unsafe_allow_html=True
-                            )
-                        else:  # Not selected
-                            st.markdown(
-                                f"""
-                                <div class='option-button'>
-                                    <strong>{opt}.</strong> {question[j+1]}
-                                </div>
-                                """,
-                                unsafe_allow_html=True
-                            )
-                    
-                    # Explanation with improved styling
-                    st.markdown(
-                        f"""
-                        <div class='explanation-box'>
-                            <h4 style='color: #6c5ce7; margin-top: 0;'>Explanation</h4>
-                            <p>{explanation}</p>
-                        </div>
-                        """,
-                        unsafe_allow_html=True
-                    )
+            # Question review, one page at a time
+            render_question_review()
             
             # Call to action buttons with improved styling
-            st.markdown("<div style='height: 30px;'></div>", unsafe_allow_html=True)
+            st.markdown(SPACER_HTML[30], unsafe_allow_html=True)
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("🆕 Try Another Topic", use_container_width=True):
@@ -1201,42 +1823,60 @@ def main():
                     st.session_state.once = True
                     st.session_state.done = False
                     st.session_state.topic = ""
+                    clear_quiz_snapshot()
                     st.rerun()
             with col2:
                 if st.button("🔄 Retry This Topic", use_container_width=True):
                     # Keep the topic but reset other state for regenerating questions
                     st.session_state.once = True
                     st.session_state.done = False
+                    clear_quiz_snapshot()
                     st.rerun()
             
             # Add button to view analytics
-            st.markdown("<div style='height: 20px;'></div>", unsafe_allow_html=True)
+            st.markdown(SPACER_HTML[20], unsafe_allow_html=True)
             if st.button("📊 View Detailed Analytics", use_container_width=True, type="secondary"):
                 # Switch to analytics page
                 st.session_state.page = "Analytics"
                 st.rerun()
                 
+    elif page == "🔎 Search":
+        st.markdown(PAGE_TITLES["search"], unsafe_allow_html=True)
+        
+        display_search()
+    
+    elif page == "👩‍🏫 Class":
+        st.markdown(PAGE_TITLES["class"], unsafe_allow_html=True)
+        
+        display_classroom()
+    
     elif page == "📊 Analytics":
         # Analytics page with improved styling
-        st.markdown(
-            """
-            <div class='title-container'>
-                <h1 class='title-text'>📊 Performance Analytics</h1>
-                <p class='subtitle-text'>Track your progress and identify areas for improvement</p>
-            </div>
-            """, 
-            unsafe_allow_html=True
-        )
+        st.markdown(PAGE_TITLES["analytics"], unsafe_allow_html=True)
         
         # Display the analytics
         display_analytics()
         
+        # Bulk data export and import
+        display_data_transfer()
+        
+        # Tokens used for question generation
+        display_token_usage()
+        
         # Button to return to quiz generation
-        st.markdown("<div style='height: 30px;'></div>", unsafe_allow_html=True)
+        st.markdown(SPACER_HTML[30], unsafe_allow_html=True)
         if st.button("🧠 Back to Quiz Generator", use_container_width=True):
             st.session_state.page = "Generate MCQs"
             st.rerun()
+    
+    record_interaction_time("full", script_started)
 
 # Run the application
 if __name__ == "__main__":
-    main()
+    if st.session_state.profile_runs_left:
+        # An admin asked for this rerun to be profiled; otherwise main() runs untouched
+        st.session_state.profile_runs_left -= 1
+        with profiled(store_profile):
+            main()
+    else:
+        main()
@@ -0,0 +1,283 @@
+"""
+Generate quizzes from a manifest without the Streamlit UI
+
+    python batch_generate.py manifest.jsonl -o quizzes.jsonl --workers 4 --rate 30
+
+The manifest is a JSONL file with one {"topic", "difficulty", "num_questions"} object
+per line (an optional "id" names the job), or a CSV file with the same columns.
+Each finished quiz is appended to the output as one JSON line. Running the same
+command again after an interruption skips every job already in the output.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+import generation
+from difficulty import DIFFICULTY_LEVELS
+from generation import MCQGenerationError, create_llm, request_mcqs
+from search_index import QuestionIndex
+from usage_ledger import MeteredLLM, UsageLedger
+
+DEFAULT_NUM_QUESTIONS = 5
+DEFAULT_WORKERS = 4
+# Requests per minute across all workers (Groq's free tier allows 30)
+DEFAULT_RATE = 30
+DEFAULT_RETRIES = 2
+
+# Chat model of the current worker process, created once by _init_worker
+_llm = None
+
+
+class ManifestError(ValueError):
+    """
+    Raised when a manifest line is not an object, is missing a topic or has an invalid
+    setting
+    """
+
+
+class OutputError(ValueError):
+    """
+    Raised when a complete line of the output is not a generated quiz with an id
+    """
+
+
+class RateLimiter:
+    """
+    Spaces calls evenly so that at most `rate` start per minute
+    """
+
+    def __init__(self, rate):
+        self.interval = 60.0 / rate if rate else 0.0
+        self.next_time = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _content_key(entry):
+    return json.dumps([entry["topic"], entry["difficulty"], entry["num_questions"]])
+
+
+def job_id(entry, occurrence=0):
+    """
+    Stable identifier of a manifest entry, used to skip finished jobs on resume
+
+    It depends on the entry's settings, not on its line, so adding, removing or
+    reordering other lines keeps it; occurrence tells identical entries apart.
+    """
+    if entry.get("id"):
+        return str(entry["id"])
+    key = _content_key(entry) + (f"#{occurrence}" if occurrence else "")
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+
+def _validate_entry(entry, line_number, seen):
+    if not isinstance(entry, dict):
+        raise ManifestError(f"Line {line_number}: expected a JSON object")
+    topic = str(entry.get("topic") or "").strip()
+    if not topic:
+        raise ManifestError(f"Line {line_number}: missing topic")
+    difficulty = str(entry.get("difficulty") or "Medium").strip().capitalize()
+    if difficulty not in DIFFICULTY_LEVELS:
+        raise ManifestError(f"Line {line_number}: difficulty must be one of {', '.join(DIFFICULTY_LEVELS)}")
+    try:
+        num_questions = int(entry.get("num_questions") or DEFAULT_NUM_QUESTIONS)
+    except ValueError:
+        raise ManifestError(f"Line {line_number}: num_questions must be a number") from None
+    if num_questions < 1:
+        raise ManifestError(f"Line {line_number}: num_questions must be positive")
+
+    job = {"topic": topic, "difficulty": difficulty, "num_questions": num_questions, "id": entry.get("id")}
+    key = _content_key(job)
+    job["id"] = job_id(job, seen[key])
+    seen[key] += 1
+    return job
+
+
+def iter_manifest(path):
+    """
+    Yield validated jobs from a JSONL or CSV manifest, one line at a time
+    """
+    # Earlier entries per settings, to number identical entries
+    seen = Counter()
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            for line_number, row in enumerate(csv.DictReader(f), start=2):
+                yield _validate_entry(row, line_number, seen)
+        else:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    raise ManifestError(f"Line {line_number}: not valid JSON") from None
+                yield _validate_entry(entry, line_number, seen)
+
+
+def completed_jobs(output_path):
+    """
+    Return the ids of the jobs already written to the output
+
+    A line cut short by an interruption is removed so the file stays valid JSONL.
+    Complete lines that are not a quiz with an id raise OutputError.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "rb+") as f:
+        good_end = 0
+        for line_number, line in enumerate(iter(f.readline, b""), start=1):
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if not isinstance(record, dict) or "id" not in record:
+                raise OutputError(f"{output_path} line {line_number}: not a generated quiz (no id)")
+            done.add(record["id"])
+            good_end = f.tell()
+        f.truncate(good_end)
+    return done
+
+
+def _init_worker(api_key):
+    global _llm
+    # Batch jobs count against the quotas like any other user
+    _llm = MeteredLLM(create_llm(api_key), UsageLedger(), "batch", "batch")
+
+
+def generate_job(job):
+    """
+    Generate one quiz in a worker process
+    """
+    started = time.perf_counter()
+    questions = request_mcqs(_llm, job["topic"], job["difficulty"], job["num_questions"])
+    return {
+        **job,
+        "questions": questions,
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def run_batch(manifest_path, output_path, api_key, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE,
+              retries=DEFAULT_RETRIES, log=print, question_index=None):
+    """
+    Generate every job in the manifest that is not already in the output
+
+    At most `workers` jobs are in flight at a time, so the manifest is streamed rather
+    than loaded. Failed jobs are retried up to `retries` times and then left out of the
+    output, so a later run picks them up again. Generated questions are also added to
+    question_index, if given. Returns (generated, failed) counts.
+    """
+    done = completed_jobs(output_path)
+    if done:
+        log(f"Resuming: {len(done)} jobs already in {output_path}")
+
+    limiter = RateLimiter(rate)
+    generated = failed = 0
+    attempts = {}
+    retry_queue = []
+    jobs = (job for job in iter_manifest(manifest_path) if job["id"] not in done)
+
+    with open(output_path, "a", encoding="utf-8") as out, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(api_key,)) as pool:
+        in_flight = {}
+        try:
+            while True:
+                while len(in_flight) < workers:
+                    job = retry_queue.pop() if retry_queue else next(jobs, None)
+                    if job is None:
+                        break
+                    limiter.wait()
+                    attempts[job["id"]] = attempts.get(job["id"], 0) + 1
+                    in_flight[pool.submit(generate_job, job)] = job
+                if not in_flight:
+                    break
+
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    job = in_flight.pop(future)
+                    try:
+                        record = future.result()
+                    except MCQGenerationError as e:
+                        error = f"could not parse the response ({e})"
+                    except Exception as e:
+                        error = str(e) or type(e).__name__
+                    else:
+                        # One line per quiz, flushed immediately so it survives an interruption
+                        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                        out.flush()
+                        if question_index is not None:
+                            question_index.add(record["questions"], job["topic"], job["difficulty"])
+                        attempts.pop(job["id"], None)
+                        generated += 1
+                        log(f"[{job['id']}] {job['topic']} ({job['difficulty']}): "
+                            f"{len(record['questions'])} questions in {record['seconds']}s")
+                        continue
+
+                    if attempts[job["id"]] <= retries:
+                        log(f"[{job['id']}] {job['topic']}: {error}, retrying")
+                        retry_queue.append(job)
+                    else:
+                        attempts.pop(job["id"], None)
+                        failed += 1
+                        log(f"[{job['id']}] {job['topic']}: {error}, giving up")
+        except KeyboardInterrupt:
+            for future in in_flight:
+                future.cancel()
+            raise
+    return generated, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate MCQ quizzes from a topic manifest")
+    parser.add_argument("manifest", help="JSONL or CSV file with topic, difficulty and num_questions")
+    parser.add_argument("-o", "--output", default="quizzes.jsonl", help="JSONL file the quizzes are appended to")
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_WORKERS, help="worker processes")
+    parser.add_argument("-r", "--rate", type=float, default=DEFAULT_RATE,
+                        help="maximum requests per minute, 0 for no limit")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES, help="retries per failed job")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    api_key = os.getenv("GROQ_API_KEY")
+    # The fake model (MCQ_LLM_BACKEND=fake) needs no key
+    if not api_key and generation.LLM_BACKEND != "fake":
+        parser.error("GROQ_API_KEY is not set (add it to .env or the environment)")
+
+    try:
+        generated, failed = run_batch(
+            args.manifest, args.output, api_key, max(1, args.workers), args.rate, args.retries,
+            log=lambda message: print(message, file=sys.stderr), question_index=QuestionIndex()
+        )
+    except (ManifestError, OutputError) as e:
+        parser.error(str(e))
+    except KeyboardInterrupt:
+        print("Interrupted; run the same command again to resume", file=sys.stderr)
+        return 130
+
+    print(f"Generated {generated} quizzes, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+Measure how long a fresh process takes to serve the first page, and fail over budget
+
+    python bench_startup.py --runs 5 --budget-ms 4000
+
+Each run starts a new Python process (so nothing is cached) that imports Streamlit and
+renders app.py once with Streamlit's test runner, then reruns it once more. Reported:
+
+    cold start   process start until the first page has rendered (what the autoscaler sees)
+    first render the first script run, including importing the app's own dependencies
+    rerun        a second script run in the same process
+
+The run also fails if a module that should only load on demand (charts, LLM client)
+was imported while rendering the quiz page.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+DEFAULT_BUDGET_MS = float(os.getenv("MCQ_STARTUP_BUDGET_MS", "4000"))
+# Only the Analytics page, the results gauge and generation may load these. (plotly is
+# not listed: Streamlit imports it on startup to register its chart theme.)
+LAZY_MODULES = ["pandas", "matplotlib", "langchain", "langchain_core", "langchain_groq", "streamlit_extras"]
+
+
+def _child():
+    started = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+
+    imported = time.perf_counter()
+    app = AppTest.from_file(APP_PATH, default_timeout=120).run()
+    rendered = time.perf_counter()
+    app.run()
+    rerun = time.perf_counter()
+    print(json.dumps({
+        "streamlit_import_ms": (imported - started) * 1000,
+        "first_render_ms": (rendered - imported) * 1000,
+        "rerun_ms": (rerun - rendered) * 1000,
+        "exception": [str(e.value) for e in app.exception],
+        "lazy_modules_loaded": sorted(m for m in LAZY_MODULES if m in sys.modules),
+    }))
+
+
+def measure_once():
+    """
+    Start a fresh interpreter, render the app and return its timings
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        # Render offline with throwaway state
+        env.setdefault("GROQ_API_KEY", "benchmark")
+        env["MCQ_STATE_BACKEND"] = "memory://"
+        env["MCQ_USAGE_LEDGER"] = os.path.join(tmp, "usage.sqlite3")
+        env["MCQ_REVIEW_DB"] = os.path.join(tmp, "review.sqlite3")
+        env["MCQ_SEARCH_DB"] = os.path.join(tmp, "search.sqlite3")
+        env["MCQ_SPILL_DIR"] = tmp
+        started = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child"],
+            env=env, capture_output=True, text=True, check=True, cwd=os.path.dirname(APP_PATH)
+        ).stdout
+        elapsed = (time.perf_counter() - started) * 1000
+    result = json.loads(output.strip().splitlines()[-1])
+    # Process start to first page, excluding the measurement's own rerun
+    result["cold_start_ms"] = elapsed - result["rerun_ms"]
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the app's cold start")
+    parser.add_argument("--runs", type=int, default=3, help="fresh processes to start")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="maximum median cold start in milliseconds")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        _child()
+        return 0
+
+    results = [measure_once() for _ in range(max(1, args.runs))]
+    failures = []
+    for key, label in [
+        ("cold_start_ms", "cold start"),
+        ("streamlit_import_ms", "streamlit import"),
+        ("first_render_ms", "first render"),
+        ("rerun_ms", "rerun"),
+    ]:
+        values = [r[key] for r in results]
+        print(f"{label:<17} median {statistics.median(values):7.0f} ms   "
+              f"min {min(values):7.0f} ms   max {max(values):7.0f} ms")
+
+    cold_start = statistics.median(r["cold_start_ms"] for r in results)
+    if cold_start > args.budget_ms:
+        failures.append(f"cold start {cold_start:.0f} ms is over the budget of {args.budget_ms:.0f} ms")
+    loaded = sorted({m for r in results for m in r["lazy_modules_loaded"]})
+    if loaded:
+        failures.append(f"modules that should load on demand were imported at startup: {', '.join(loaded)}")
+    errors = sorted({e for r in results for e in r["exception"]})
+    if errors:
+        failures.append(f"the app raised: {'; '.join(errors)}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    if not failures:
+        print(f"OK: within the budget of {args.budget_ms:.0f} ms")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
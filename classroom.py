@@ -0,0 +1,122 @@
+"""
+Instructor quizzes: one generated quiz published under a short join code and served
+to every student of a class from the shared state backend
+"""
+import secrets
+import time
+
+from state_backend import SESSION_TTL
+
+# Join codes avoid characters that are easy to confuse when read out (0/O, 1/I)
+JOIN_CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+JOIN_CODE_LENGTH = 6
+
+
+def normalize_code(code):
+    return "".join(str(code or "").split()).upper()
+
+
+def new_class_plan(code, quiz, student):
+    """
+    Plan of a student's copy of a class quiz (plain data, saved with the quiz); its
+    questions are all known up front, so nothing is generated in the background
+    """
+    return {
+        "kind": "class", "code": code, "topic": quiz["topic"], "difficulty": quiz["difficulty"],
+        "target": len(quiz["question_ids"]), "student": student,
+    }
+
+
+class Classroom:
+    """
+    Published class quizzes by join code, with who joined and each student's answers
+
+    A class quiz only refers to its questions, which are kept in the question store, so
+    serving it to a student is a read of the quiz and of questions that are usually
+    already in the process's memory. Students never write to the quiz: joining and
+    finishing each append one entry to a list of the class.
+    """
+
+    def __init__(self, backend, question_store, ttl=SESSION_TTL):
+        self.backend = backend
+        self.question_store = question_store
+        self.ttl = ttl
+
+    def _key(self, code):
+        return f"class:{code}"
+
+    def publish(self, questions, topic, difficulty, instructor):
+        """
+        Save a quiz under a new join code and return the code
+        """
+        questions = self.question_store.put(questions)
+        code = "".join(secrets.choice(JOIN_CODE_ALPHABET) for _ in range(JOIN_CODE_LENGTH))
+        while self.backend.get(self._key(code)) is not None:
+            code = "".join(secrets.choice(JOIN_CODE_ALPHABET) for _ in range(JOIN_CODE_LENGTH))
+        quiz = {
+            "topic": topic, "difficulty": difficulty, "question_ids": [q.id for q in questions],
+            "instructor": str(instructor), "created": time.time(),
+        }
+        self.backend.set(self._key(code), quiz, ttl=self.ttl)
+        return code
+
+    def load(self, code):
+        """
+        Return (quiz, questions) for a join code, or None if there is no such class
+        """
+        quiz = self.backend.get(self._key(normalize_code(code)))
+        if quiz is None:
+            return None
+        questions = self.question_store.get_many(quiz["question_ids"])
+        if None in questions:
+            return None  # Questions expired from the store
+        return quiz, questions
+
+    def record_join(self, code, student_id, name):
+        self.backend.push(f"{self._key(code)}:joined", {"id": str(student_id), "name": name}, ttl=self.ttl)
+
+    def record_result(self, code, student_id, name, answers, score):
+        self.backend.push(f"{self._key(code)}:results", {
+            "id": str(student_id), "name": name, "answers": list(answers), "score": score, "time": time.time(),
+        }, ttl=self.ttl)
+
+    def activity(self, code):
+        """
+        Return (joined, results) entries of a class, oldest first
+        """
+        return self.backend.range(f"{self._key(code)}:joined"), self.backend.range(f"{self._key(code)}:results")
+
+
+def class_summary(questions, joined, results):
+    """
+    Aggregate class results for the live view
+
+    A student who takes the quiz again is counted once, with their latest answers.
+    """
+    latest = {}
+    for result in results:
+        latest[result["id"]] = result
+    students = sorted(latest.values(), key=lambda result: (-result["score"], result["time"]))
+    total = len(questions)
+
+    per_question = []
+    for i, question in enumerate(questions):
+        picks = [result["answers"][i] if i < len(result["answers"]) else None for result in students]
+        per_question.append({
+            "number": i + 1,
+            "question": question.text,
+            "answer": question.answer,
+            "correct": sum(pick == question.answer for pick in picks) / len(picks) if picks else 0.0,
+            **{f"pct_{letter}": picks.count(letter) / len(picks) if picks else 0.0 for letter in "ABCD"},
+        })
+
+    return {
+        "joined": len({entry["id"] for entry in joined} | set(latest)),
+        "finished": len(students),
+        "average_accuracy": sum(result["score"] for result in students) / (total * len(students)) if students else 0.0,
+        "students": [
+            {"student": result["name"], "score": result["score"], "accuracy": result["score"] / total if total else 0.0}
+            for result in students
+        ],
+        "questions": per_question,
+    }
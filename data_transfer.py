@@ -0,0 +1,309 @@
+import hashlib
+import json
+import os
+import tempfile
+from itertools import islice
+
+# Bump when the exported record layout changes and register a migration below
+SCHEMA_VERSION = 2
+SCHEMA_NAME = "mcq-export"
+KINDS = ("history", "questions")
+FORMATS = ("jsonl", "parquet")
+DEFAULT_CHUNK_SIZE = 1000
+# Where the progress of interrupted imports is kept until they are run again
+CHECKPOINT_DIR = os.path.join(tempfile.gettempdir(), "mcq_import_checkpoints")
+
+QUESTION_FIELDS = ["question", "option_a", "option_b", "option_c", "option_d", "answer", "explanation"]
+
+
+class SchemaError(ValueError):
+    """
+    Raised when an import file is not a recognised export or uses a newer schema
+    """
+
+
+def _add_question_ids(record):
+    # Version 2 gave each question detail the id of its question; version 1 details
+    # have none and are filed under a legacy id on import (see compact_record)
+    if "question_details" in record:
+        record["question_details"] = [
+            {"question_id": None, **detail} for detail in record["question_details"]
+        ]
+    return record
+
+
+# Migrations from version N to N+1, applied in order on import
+MIGRATIONS = {1: _add_question_ids}
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def question_to_record(question, topic="", difficulty=""):
+    """
+    Convert a generated 7-element question list into an export record
+    """
+    record = dict(zip(QUESTION_FIELDS, question))
+    record["topic"] = topic
+    record["difficulty"] = difficulty
+    return record
+
+
+def record_to_question(record):
+    """
+    Convert an imported question record back into the 7-element list used by the quiz
+    """
+    return [record[field] for field in QUESTION_FIELDS]
+
+
+def _check_version(version):
+    if version > SCHEMA_VERSION:
+        raise SchemaError(f"Export schema version {version} is newer than supported version {SCHEMA_VERSION}")
+    if any(v not in MIGRATIONS for v in range(version, SCHEMA_VERSION)):
+        raise SchemaError(f"Unsupported export format version {version}")
+
+
+def migrate_record(record, version):
+    """
+    Upgrade a record written with an older schema version to the current one
+    """
+    _check_version(version)
+    while version < SCHEMA_VERSION:
+        record = MIGRATIONS[version](record)
+        version += 1
+    return record
+
+
+def _header(kind):
+    if kind not in KINDS:
+        raise ValueError(f"Unknown export kind: {kind}")
+    return {"schema": SCHEMA_NAME, "version": SCHEMA_VERSION, "kind": kind}
+
+
+def _check_header(header, kind):
+    if header.get("schema") != SCHEMA_NAME:
+        raise SchemaError("File is not an MCQ Generator export")
+    if header.get("kind") != kind:
+        raise SchemaError(f"Expected a '{kind}' export but found '{header.get('kind')}'")
+    try:
+        version = int(header.get("version", 0))
+    except (TypeError, ValueError):
+        raise SchemaError(f"Invalid export format version: {header.get('version')!r}") from None
+    _check_version(version)
+    return version
+
+
+# ---------------------------------------------------------------------------
+# JSONL
+# ---------------------------------------------------------------------------
+
+def export_jsonl(records, fp, kind, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream records to a binary file object as JSON lines, preceded by a schema header line
+    """
+    fp.write((json.dumps(_header(kind)) + "\n").encode("utf-8"))
+    count = 0
+    for chunk in _chunks(records, chunk_size):
+        fp.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in chunk).encode("utf-8"))
+        count += len(chunk)
+    return count
+
+
+def iter_jsonl(fp, kind, position=0):
+    """
+    Yield (next_position, record) pairs from a binary JSONL export
+
+    Positions are byte offsets, so an interrupted import can seek straight back to
+    the first record it has not yet committed.
+    """
+    fp.seek(0)
+    version = _check_header(json.loads(fp.readline()), kind)
+    if position:
+        fp.seek(position)
+    while True:
+        line = fp.readline()
+        if not line:
+            return
+        if line.strip():
+            yield fp.tell(), migrate_record(json.loads(line), version)
+
+
+# ---------------------------------------------------------------------------
+# Parquet
+# ---------------------------------------------------------------------------
+
+def _parquet_schema(kind):
+    import pyarrow as pa
+
+    if kind == "history":
+        fields = [
+            ("timestamp", pa.string()),
+            ("topic", pa.string()),
+            ("difficulty", pa.string()),
+            ("score", pa.int64()),
+            ("total", pa.int64()),
+            ("accuracy", pa.float64()),
+            ("question_details", pa.list_(pa.struct([
+                ("question_number", pa.int64()),
+                ("question_id", pa.string()),
+                ("question_text", pa.string()),
+                ("correct_answer", pa.string()),
+                ("user_answer", pa.string()),
+                ("is_correct", pa.bool_()),
+            ]))),
+        ]
+    else:
+        fields = [(name, pa.string()) for name in QUESTION_FIELDS + ["topic", "difficulty"]]
+    metadata = {key: str(value) for key, value in _header(kind).items()}
+    return pa.schema(fields, metadata=metadata)
+
+
+def export_parquet(records, fp, kind, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream records to a Parquet file, writing one row group per chunk
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema(kind)
+    count = 0
+    with pq.ParquetWriter(fp, schema) as writer:
+        for chunk in _chunks(records, chunk_size):
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+            count += len(chunk)
+    return count
+
+
+def iter_parquet(fp, kind, position=0, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield (next_position, record) pairs from a Parquet export
+
+    Positions are row numbers; whole row groups before the resume point are skipped
+    without being read.
+    """
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(fp)
+    metadata = parquet_file.schema_arrow.metadata or {}
+    header = {key.decode(): value.decode() for key, value in metadata.items()}
+    version = _check_header(header, kind)
+
+    row = 0
+    for group in range(parquet_file.num_row_groups):
+        group_rows = parquet_file.metadata.row_group(group).num_rows
+        if row + group_rows <= position:
+            row += group_rows
+            continue
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, row_groups=[group]):
+            for record in batch.to_pylist():
+                row += 1
+                if row > position:
+                    yield row, migrate_record(record, version)
+
+
+# ---------------------------------------------------------------------------
+# Format-independent entry points
+# ---------------------------------------------------------------------------
+
+def export_records(records, fp, kind, fmt="jsonl", chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Export an iterable of history or question records in the requested format
+    """
+    if fmt == "jsonl":
+        return export_jsonl(records, fp, kind, chunk_size)
+    if fmt == "parquet":
+        return export_parquet(records, fp, kind, chunk_size)
+    raise ValueError(f"Unsupported export format: {fmt}")
+
+
+def export_to_tempfile(records, kind, fmt="jsonl", chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Export to an anonymous temporary file (spooled to disk) rewound for reading
+    """
+    fp = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    export_records(records, fp, kind, fmt, chunk_size)
+    fp.seek(0)
+    return fp
+
+
+def checkpoint_path(fp, *scope, checkpoint_dir=CHECKPOINT_DIR):
+    """
+    Checkpoint file for importing this file's content, e.g. into one session as one kind,
+    so uploading the same file again resumes an interrupted import
+    """
+    digest = hashlib.sha256("\x1f".join(map(str, scope)).encode("utf-8"))
+    fp.seek(0)
+    for block in iter(lambda: fp.read(64 * 1024), b""):
+        digest.update(block)
+    fp.seek(0)
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    return os.path.join(checkpoint_dir, f"{digest.hexdigest()[:32]}.json")
+
+
+def _load_checkpoint(path):
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def _save_checkpoint(path, state):
+    # Write then rename so a crash never leaves a half-written checkpoint
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def import_records(fp, kind, sink, fmt="jsonl", checkpoint=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream records from an export into sink(chunk), one chunk at a time
+
+    When a checkpoint path is given, progress is recorded after every committed chunk
+    and a later call with the same checkpoint resumes where the previous one stopped.
+    The checkpoint is removed once the import completes. Returns the number of records
+    imported by this call.
+    """
+    if fmt == "jsonl":
+        reader = iter_jsonl
+    elif fmt == "parquet":
+        reader = iter_parquet
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+    state = _load_checkpoint(checkpoint)
+    if state and (state.get("kind") != kind or state.get("format") != fmt):
+        raise SchemaError("Checkpoint belongs to a different import")
+    position = state.get("position", 0)
+
+    imported = 0
+    chunk = []
+    for position_after, record in reader(fp, kind, position):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            sink(chunk)
+            imported += len(chunk)
+            chunk = []
+            if checkpoint:
+                _save_checkpoint(checkpoint, {"kind": kind, "format": fmt, "position": position_after})
+    if chunk:
+        sink(chunk)
+        imported += len(chunk)
+
+    if checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return imported
+
+
+def detect_format(name):
+    """
+    Guess the export format from a file name
+    """
+    return "parquet" if name.lower().endswith((".parquet", ".pq")) else "jsonl"
+
@@ -0,0 +1,39 @@
+# Difficulty levels from easiest to hardest
+DIFFICULTY_LEVELS = ["Easy", "Medium", "Hard"]
+
+
+def step_difficulty(level, offset):
+    """
+    Move a difficulty level up (offset > 0) or down, staying within the known levels
+    """
+    index = DIFFICULTY_LEVELS.index(level) + offset
+    return DIFFICULTY_LEVELS[min(max(index, 0), len(DIFFICULTY_LEVELS) - 1)]
+
+
+# Function to determine next question difficulty based on performance
+def determine_difficulty(current_difficulty, correct_answers, total_questions):
+    """
+    Adapt difficulty based on user performance
+    """
+    if total_questions == 0:
+        return "Medium"
+        
+    accuracy = correct_answers / total_questions
+    
+    if current_difficulty == "Easy":
+        if accuracy > 0.7:
+            return "Medium"
+        else:
+            return "Easy"
+    elif current_difficulty == "Medium":
+        if accuracy > 0.7:
+            return "Hard"
+        elif accuracy < 0.4:
+            return "Easy"
+        else:
+            return "Medium"
+    else:  # Hard
+        if accuracy < 0.5:
+            return "Medium"
+        else:
+            return "Hard"
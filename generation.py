@@ -0,0 +1,243 @@
+import ast
+import asyncio
+import os
+import re
+import threading
+import time
+
+# Chat model used for every generation request
+LLM_MODEL = "llama-3.1-8b-instant"
+LLM_TEMPERATURE = 0.5
+# "groq", or "fake" to generate placeholder questions offline
+LLM_BACKEND = os.getenv("MCQ_LLM_BACKEND", "groq")
+
+
+class MCQGenerationError(Exception):
+    """
+    Raised when the LLM response cannot be turned into a list of questions
+    """
+
+
+class MCQFormatError(MCQGenerationError):
+    """
+    Raised when a parsed question does not have the expected 7 fields
+    """
+
+
+class FakeLLM:
+    """
+    Offline stand-in for the chat model that answers with placeholder questions
+
+    Used for development and tests without an API key (MCQ_LLM_BACKEND=fake). Translation
+    requests get their fields back prefixed with the language. A delay simulates the
+    latency of a real model.
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def _respond(self, messages):
+        request = messages[-1].content
+        translation = re.match(r"Translate into (.*?):\n(.*)", request, re.DOTALL)
+        if translation:
+            # Mark every field with the language instead of translating it
+            language, items = translation.group(1), ast.literal_eval(translation.group(2))
+            questions = [[f"[{language}] {field}" for field in item] for item in items]
+        else:
+            match = re.search(r"Generate (\d+) multiple-choice questions about (.*) with (\w+) difficulty", request)
+            num_questions, topic, difficulty = int(match.group(1)), match.group(2), match.group(3)
+            questions = [
+                [f"{topic} ({difficulty}) question {i + 1}?", "Option A", "Option B", "Option C", "Option D",
+                 "ABCD"[i % 4], f"Option {'ABCD'[i % 4]} is correct."]
+                for i in range(num_questions)
+            ]
+        from langchain_core.messages import AIMessage
+
+        content = repr(questions)
+        # Rough token counts so usage accounting can be exercised offline
+        prompt_tokens = sum(len(message.content) for message in messages) // 4
+        return AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": len(content) // 4,
+                "total_tokens": prompt_tokens + len(content) // 4,
+            },
+        )
+
+    def invoke(self, messages):
+        time.sleep(self.delay)
+        return self._respond(messages)
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(self.delay)
+        return self._respond(messages)
+
+
+# Function to create the chat model
+def create_llm(api_key):
+    """
+    Create the chat model used for question generation
+    """
+    if LLM_BACKEND == "fake":
+        return FakeLLM()
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(model_name=LLM_MODEL, temperature=LLM_TEMPERATURE, groq_api_key=api_key)
+
+
+class LazyLLM:
+    """
+    Chat model created on first use, so starting the app doesn't import the LLM client
+    """
+
+    def __init__(self, factory, model_name=LLM_MODEL):
+        self.model_name = model_name
+        self._factory = factory
+        self._llm = None
+        self._lock = threading.Lock()
+
+    def _get(self):
+        if self._llm is None:
+            with self._lock:
+                if self._llm is None:
+                    self._llm = self._factory()
+        return self._llm
+
+    def invoke(self, messages):
+        return self._get().invoke(messages)
+
+    async def ainvoke(self, messages):
+        return await self._get().ainvoke(messages)
+
+
+# Function to build the chat messages for a generation request
+def build_messages(topic, difficulty_level, num_questions, performance_history=None, exclude_questions=None,
+                   context_passages=None):
+    """
+    Build the system and user messages asking for MCQs on a topic
+    """
+    # Imported here so that loading this module stays cheap
+    from langchain_core.messages import HumanMessage, SystemMessage
+    
+    # Create a system prompt based on user performance and requirements
+    performance_context = ""
+    if performance_history:
+        # Format performance data for the AI to understand patterns
+        performance_context = f"User performance history: {performance_history}\n"
+    
+    # Questions already asked in this session should not be repeated
+    exclude_context = ""
+    if exclude_questions:
+        exclude_context = "Do NOT repeat or rephrase any of these questions: " + " | ".join(exclude_questions) + "\n"
+    
+    # Passages retrieved from the user's source document
+    source_context = ""
+    if context_passages:
+        passages = "\n".join(f"[{i + 1}] {passage}" for i, passage in enumerate(context_passages))
+        source_context = (
+            "SOURCE MATERIAL (base every question and explanation strictly on these passages):\n"
+            f"{passages}\n"
+        )
+        
+    system_prompt = f"""
+    You are an expert educational assessment generator specialized in creating high-quality multiple-choice questions (MCQs) for adaptive learning systems.
+
+    TOPIC: {topic}
+    DIFFICULTY: {difficulty_level}
+    NUMBER OF QUESTIONS: {num_questions}
+    {performance_context}{exclude_context}{source_context}
+
+    Create exactly {num_questions} multiple-choice questions on the topic "{topic}" with {difficulty_level} difficulty.
+    
+    Follow these requirements strictly:
+    1. Each question must be clear, concise, and directly relevant to the topic
+    2. Match the difficulty level accurately: 
+       - Easy: Basic understanding and recall questions
+       - Medium: Application and comprehension questions
+       - Hard: Analysis and evaluation questions
+    3. Provide exactly 4 answer choices labeled A, B, C, D for each question
+    4. Only ONE answer should be correct
+    5. The other answers must be plausible distractors that seem reasonable but are incorrect
+    6. Include a detailed explanation that teaches why the correct answer is right
+    
+    Format your response as a valid Python list of lists ONLY, where each inner list contains EXACTLY:
+    [question_text, option_A, option_B, option_C, option_D, correct_answer_letter, explanation]
+
+    Example format:
+    [
+        ["What is the capital of France?", "London", "Berlin", "Paris", "Madrid", "C", "Paris is the capital city of France."],
+        ["Which planet is closest to the sun?", "Earth", "Mercury", "Venus", "Mars", "B", "Mercury is the closest planet to the sun in our solar system."]
+    ]
+
+    The output MUST be a valid Python list that can be parsed with ast.literal_eval() - nothing else.
+    DO NOT include any text, explanations, or markdown formatting before or after the list.
+    """
+
+    return [
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=f"Generate {num_questions} multiple-choice questions about {topic} with {difficulty_level} difficulty level.")
+    ]
+
+# Function to parse the LLM response into question lists
+def parse_mcq_response(content, num_questions):
+    """
+    Extract and validate the list of [question, A, B, C, D, answer, explanation] lists
+    """
+    # Clean the response to ensure it's a valid Python list
+    content = content.strip()
+    
+    # Handle different response formats
+    if content.startswith("```python") and content.endswith("```"):
+        content = content[content.find("["):content.rfind("]")+1]
+    elif content.startswith("```") and content.endswith("```"):
+        content = content[content.find("["):content.rfind("]")+1]
+    elif content.startswith("[") and content.endswith("]"):
+        content = content
+    else:
+        # Try to extract the list if it's embedded in text
+        start_idx = content.find("[")
+        end_idx = content.rfind("]")
+        if start_idx != -1 and end_idx != -1:
+            content = content[start_idx:end_idx+1]
+    
+    # Parse the list
+    try:
+        questions = ast.literal_eval(content)
+    except (ValueError, SyntaxError) as e:
+        raise MCQGenerationError(str(e)) from e
+    
+    # Ensure we have the right number of questions
+    questions = questions[:num_questions]
+    
+    # Validate question format
+    for q in questions:
+        if len(q) != 7:
+            raise MCQFormatError(f"Question format is incorrect: {q}")
+            
+    return questions
+
+# Function to generate MCQs with a given chat model
+def request_mcqs(llm, topic, difficulty_level, num_questions, performance_history=None, exclude_questions=None,
+                 context_passages=None):
+    """
+    Generate MCQs with the given LLM; raises instead of reporting to the UI so it can
+    also run in background threads
+    """
+    messages = build_messages(
+        topic, difficulty_level, num_questions, performance_history, exclude_questions, context_passages
+    )
+    response = llm.invoke(messages)
+    return parse_mcq_response(response.content, num_questions)
+
+# Async variant for servers that run many generation requests on one event loop
+async def arequest_mcqs(llm, topic, difficulty_level, num_questions, performance_history=None,
+                        exclude_questions=None, context_passages=None):
+    """
+    Generate MCQs with the chat model's async API
+    """
+    messages = build_messages(
+        topic, difficulty_level, num_questions, performance_history, exclude_questions, context_passages
+    )
+    response = await llm.ainvoke(messages)
+    return parse_mcq_response(response.content, num_questions)
@@ -0,0 +1,233 @@
+import re
+import numpy as np
+
+# Answer letters are stored as small integer codes in the columnar table
+OPTION_LABELS = ["A", "B", "C", "D"]
+OPTION_CODES = {label: i for i, label in enumerate(OPTION_LABELS)}
+
+# Words that never make a useful concept label
+STOPWORDS = {
+    "a", "an", "the", "of", "to", "in", "on", "for", "and", "or", "is", "are", "was", "were",
+    "be", "by", "with", "as", "at", "from", "that", "this", "these", "those", "which", "what",
+    "who", "whom", "when", "where", "why", "how", "it", "its", "into", "than", "then", "not",
+    "does", "do", "did", "can", "could", "would", "should", "will", "has", "have", "had",
+    "following", "most", "best", "true", "false", "correct", "statement", "describes", "used",
+    "use", "main", "primary", "between", "about", "following:", "one", "two", "type", "types",
+}
+
+_WORD_RE = re.compile(r"[a-z][a-z0-9\-]{2,}")
+
+
+class AnswerTable:
+    """
+    Columnar store of every answered question across the quiz history.
+
+    Each answer is one row spread over parallel NumPy arrays, and question ids and
+    topics are interned to integer codes, so statistics can be computed with
+    bincount-style reductions instead of looping over nested dicts.
+    """
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.quiz = np.zeros(capacity, dtype=np.int32)
+        self.question = np.zeros(capacity, dtype=np.int32)
+        self.topic = np.zeros(capacity, dtype=np.int32)
+        self.answer = np.zeros(capacity, dtype=np.int8)
+        self.correct_answer = np.zeros(capacity, dtype=np.int8)
+        self.is_correct = np.zeros(capacity, dtype=np.bool_)
+        self.num_quizzes = 0
+        self.question_ids = []
+        self.question_topics = []
+        self.topics = []
+        self._question_index = {}
+        self._topic_index = {}
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self, needed):
+        capacity = len(self.quiz)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ("quiz", "question", "topic", "answer", "correct_answer", "is_correct"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def _topic_code(self, topic):
+        key = topic.strip().lower()
+        if key not in self._topic_index:
+            self._topic_index[key] = len(self.topics)
+            self.topics.append(topic.strip())
+        return self._topic_index[key]
+
+    def _question_code(self, topic_code, question_id):
+        key = (topic_code, question_id)
+        if key not in self._question_index:
+            self._question_index[key] = len(self.question_ids)
+            self.question_ids.append(question_id)
+            self.question_topics.append(topic_code)
+        return self._question_index[key]
+
+    def add_quiz(self, topic, question_ids, answers, correct_answers):
+        """
+        Append the answers of one completed quiz (parallel lists, as in a performance record)
+        """
+        n = len(question_ids)
+        start = self.size
+        self._grow(start + n)
+        topic_code = self._topic_code(topic)
+
+        rows = slice(start, start + n)
+        self.quiz[rows] = self.num_quizzes
+        self.topic[rows] = topic_code
+        self.question[rows] = [self._question_code(topic_code, question_id) for question_id in question_ids]
+        self.answer[rows] = [OPTION_CODES.get(answer, -1) for answer in answers]
+        self.correct_answer[rows] = [OPTION_CODES.get(answer, -1) for answer in correct_answers]
+        self.is_correct[rows] = [answer == correct for answer, correct in zip(answers, correct_answers)]
+
+        self.size += n
+        self.num_quizzes += 1
+
+    def columns(self):
+        """
+        Return trimmed views of the populated rows
+        """
+        n = self.size
+        return (
+            self.quiz[:n], self.question[:n], self.topic[:n],
+            self.answer[:n], self.correct_answer[:n], self.is_correct[:n]
+        )
+
+
+def item_statistics(table, questions=None):
+    """
+    Compute per-question difficulty (p-value), discrimination and distractor frequencies
+
+    Discrimination is the corrected point-biserial correlation between getting the item
+    right and the accuracy on the rest of the same quiz. questions are the Question
+    records for table.question_ids (None where unknown) and provide the question texts.
+    """
+    # Imported here so that recording answers doesn't load pandas
+    import pandas as pd
+
+    columns = [
+        "question_id", "topic", "question_text", "attempts", "p_value", "discrimination",
+        "correct_answer", "pct_A", "pct_B", "pct_C", "pct_D", "top_distractor"
+    ]
+    if len(table) == 0:
+        return pd.DataFrame(columns=columns)
+
+    quiz, question, _, answer, correct_answer, is_correct = table.columns()
+    num_items = len(table.question_ids)
+    c = is_correct.astype(np.float64)
+
+    # Accuracy on the other questions of the same quiz (rest score)
+    quiz_correct = np.bincount(quiz, weights=c, minlength=table.num_quizzes)
+    quiz_count = np.bincount(quiz, minlength=table.num_quizzes).astype(np.float64)
+    rest_count = quiz_count[quiz] - 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rest = np.where(rest_count > 0, (quiz_correct[quiz] - c) / rest_count, np.nan)
+
+    attempts = np.bincount(question, minlength=num_items).astype(np.float64)
+    right = np.bincount(question, weights=c, minlength=num_items)
+
+    # Point-biserial correlation from per-item sufficient statistics
+    valid = ~np.isnan(rest)
+    qv, cv, rv = question[valid], c[valid], rest[valid]
+    n = np.bincount(qv, minlength=num_items).astype(np.float64)
+    sc = np.bincount(qv, weights=cv, minlength=num_items)
+    sr = np.bincount(qv, weights=rv, minlength=num_items)
+    scr = np.bincount(qv, weights=cv * rv, minlength=num_items)
+    srr = np.bincount(qv, weights=rv * rv, minlength=num_items)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = scr / n - (sc / n) * (sr / n)
+        var_c = sc / n - (sc / n) ** 2
+        var_r = srr / n - (sr / n) ** 2
+        discrimination = cov / np.sqrt(var_c * var_r)
+        p_value = right / attempts
+    discrimination[~np.isfinite(discrimination)] = np.nan
+
+    # Option selection frequencies as a (questions x 4) matrix
+    answered = answer >= 0
+    counts = np.bincount(
+        question[answered].astype(np.int64) * 4 + answer[answered],
+        minlength=num_items * 4
+    ).reshape(num_items, 4).astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        freqs = counts / counts.sum(axis=1, keepdims=True)
+    freqs = np.nan_to_num(freqs)
+
+    # The correct option for each item (last seen wins, they never differ)
+    item_key = np.full(num_items, -1, dtype=np.int8)
+    item_key[question] = correct_answer
+    distractor_counts = counts.copy()
+    has_key = item_key >= 0
+    distractor_counts[np.nonzero(has_key)[0], item_key[has_key]] = -1
+    top_distractor = np.argmax(distractor_counts, axis=1)
+    no_distractor = distractor_counts.max(axis=1) <= 0
+
+    labels = np.array(OPTION_LABELS + [""])
+    if questions is None:
+        questions = [None] * num_items
+    return pd.DataFrame({
+        "question_id": table.question_ids,
+        "topic": np.array(table.topics, dtype=object)[np.array(table.question_topics, dtype=np.int64)],
+        "question_text": [q.text if q is not None else "" for q in questions],
+        "attempts": attempts.astype(np.int64),
+        "p_value": p_value,
+        "discrimination": discrimination,
+        "correct_answer": labels[item_key],
+        "pct_A": freqs[:, 0],
+        "pct_B": freqs[:, 1],
+        "pct_C": freqs[:, 2],
+        "pct_D": freqs[:, 3],
+        "top_distractor": np.where(no_distractor, "", labels[top_distractor]),
+    }, columns=columns)
+
+
+def _concept_terms(text, topic_words):
+    return {w for w in _WORD_RE.findall(text.lower()) if w not in STOPWORDS and w not in topic_words}
+
+
+def weak_concept_clusters(stats, threshold=0.5, max_clusters=5):
+    """
+    Group the weak questions of each topic (p-value below threshold) by shared concept term
+
+    Terms are weighted by how often the questions containing them were missed, and each
+    weak question is assigned to its heaviest term. Returns {topic: [(term, [questions])]}.
+    """
+    weak = stats[stats["p_value"] < threshold]
+    clusters = {}
+    for topic, group in weak.groupby("topic", sort=False):
+        topic_words = set(_WORD_RE.findall(topic.lower()))
+        texts = group["question_text"].tolist()
+        misses = ((1 - group["p_value"]) * group["attempts"]).to_numpy()
+        terms = [_concept_terms(text, topic_words) for text in texts]
+
+        vocabulary = sorted(set().union(*terms))
+        if not vocabulary:
+            continue
+        column = {term: j for j, term in enumerate(vocabulary)}
+        # Binary question x term incidence matrix
+        incidence = np.zeros((len(texts), len(vocabulary)), dtype=np.float64)
+        for i, item_terms in enumerate(terms):
+            incidence[i, [column[t] for t in item_terms]] = 1.0
+
+        weights = misses @ incidence
+        # Only terms shared by at least two weak questions form a cluster
+        shared = incidence.sum(axis=0) >= 2
+        scores = np.where(shared, weights, 0.0)
+        best = np.argmax(incidence * scores, axis=1)
+        has_cluster = (incidence * scores).max(axis=1) > 0
+
+        topic_clusters = {}
+        for i in np.nonzero(has_cluster)[0]:
+            topic_clusters.setdefault(vocabulary[best[i]], []).append(texts[i])
+        ranked = sorted(topic_clusters.items(), key=lambda kv: -weights[column[kv[0]]])
+        if ranked:
+            clusters[topic] = ranked[:max_clusters]
+    return clusters
@@ -0,0 +1,102 @@
+from difficulty import determine_difficulty
+from generation import request_mcqs
+from questions import Question
+from retrieval import TOP_K, load_index
+
+# Questions generated up front so the quiz can start quickly
+FIRST_BATCH_SIZE = 5
+# Questions per background batch
+BATCH_SIZE = 10
+# Give up on background generation after this many failed batches in a row
+MAX_FAILURES = 3
+# Recent questions passed to the LLM so later batches don't repeat them
+EXCLUDE_WINDOW = 30
+
+
+def generate_batch(prepare, llm, topic, difficulty, num_questions, exclude=None, context_passages=None):
+    """
+    Generate questions in a background job and, if given, run prepare on them in the
+    same job (e.g. to translate them), so the session only picks up finished work
+    """
+    questions = request_mcqs(llm, topic, difficulty, num_questions, None, exclude, context_passages)
+    if prepare is not None:
+        prepare(questions)
+    return questions
+
+
+def new_plan(topic, difficulty, target, batch_size=BATCH_SIZE, document=None):
+    """
+    Describe a long quiz; the plan is plain data so it can be saved with the quiz progress
+    """
+    return {
+        "topic": topic, "difficulty": difficulty, "target": target, "batch_size": batch_size,
+        "document": document, "batches": 0
+    }
+
+
+class ProgressiveQuiz:
+    """
+    Generates the questions of a long quiz in background batches
+
+    A new batch is requested as soon as fewer than a batch's worth of unanswered
+    questions remain, so under normal LLM latency the next batch is ready before the
+    user reaches the end of the current one. Each batch's difficulty is steered by
+    the accuracy on the most recent batch of answers. prepare, if set, is run on each
+    batch in the background job.
+    """
+
+    def __init__(self, plan, prepare=None):
+        self.plan = plan
+        self.prepare = prepare
+        self.pending = None
+        self.failures = 0
+
+    @property
+    def exhausted(self):
+        return self.failures >= MAX_FAILURES
+
+    def next_difficulty(self, feedback):
+        recent = feedback[-self.plan["batch_size"]:]
+        if not recent:
+            return self.plan["difficulty"]
+        return determine_difficulty(self.plan["difficulty"], sum(recent), len(recent))
+
+    def _collect(self):
+        future, self.pending = self.pending, None
+        try:
+            questions = future.result()
+        except Exception:
+            self.failures += 1
+            return []
+        self.failures = 0
+        return [Question.from_list(q) for q in questions]
+
+    def top_up(self, executor, llm, questions, feedback, wait=False):
+        """
+        Return newly generated Question records (possibly none) and start the next batch if needed
+
+        With wait=True, block until the pending batch (if any) has finished.
+        """
+        new_questions = []
+        if self.pending is not None and (wait or self.pending.done()):
+            new_questions = self._collect()
+
+        available = len(questions) + len(new_questions)
+        remaining = self.plan["target"] - available
+        unanswered = available - len(feedback)
+        if self.pending is None and remaining > 0 and unanswered <= self.plan["batch_size"] and not self.exhausted:
+            self.plan["difficulty"] = self.next_difficulty(feedback)
+            exclude = [q.text for q in (list(questions) + new_questions)[-EXCLUDE_WINDOW:]]
+            batch_number = self.plan.get("batches", 0)
+            context_passages = None
+            if self.plan.get("document"):
+                # Each batch draws on the next passages in the ranking
+                context_passages = load_index(self.plan["document"]).search(
+                    self.plan["topic"], k=TOP_K, offset=batch_number * TOP_K
+                )
+            self.plan["batches"] = batch_number + 1
+            self.pending = executor.submit(
+                generate_batch, self.prepare, llm, self.plan["topic"], self.plan["difficulty"],
+                min(self.plan["batch_size"], remaining), exclude, context_passages
+            )
+        return new_questions
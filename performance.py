@@ -0,0 +1,172 @@
+from datetime import datetime
+
+from difficulty import determine_difficulty
+from questions import Question, question_id
+from topics import TopicRegistry
+
+# Fields of a performance record that refer to questions by id
+COMPACT_FIELDS = ("question_ids", "answers", "correct_answers", "question_texts")
+
+
+# Function to score a finished quiz
+def performance_record(topic, score, total, difficulty, questions, answers):
+    """
+    Build the performance record saved for analytics after a quiz
+
+    Questions are referenced by id; their text stays in the question store.
+    """
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    questions = [Question.from_list(q) for q in questions[:len(answers)]]
+
+    return {
+        "timestamp": timestamp,
+        "topic": topic,
+        "difficulty": difficulty,
+        "score": score,
+        "total": total,
+        "accuracy": score / total if total > 0 else 0,
+        "question_ids": [q.id for q in questions],
+        "answers": list(answers[:len(questions)]),
+        "correct_answers": [q.answer for q in questions],
+    }
+
+
+def question_details(record, questions):
+    """
+    Per-question results of a record, with the text of each question
+
+    questions are the Question records for record["question_ids"] (None for any that
+    are no longer available), e.g. from QuestionStore.get_many. Imported records keep
+    the exported question texts for questions missing from the store.
+    """
+    texts = record.get("question_texts") or [None] * len(record["question_ids"])
+    return [
+        {
+            "question_number": i + 1,
+            "question_id": question_id,
+            "question_text": (
+                question.text if question is not None else text or "(question no longer available)"
+            ),
+            "correct_answer": correct_answer,
+            "user_answer": user_answer,
+            "is_correct": user_answer == correct_answer
+        }
+        for i, (question_id, question, text, user_answer, correct_answer) in enumerate(
+            zip(record["question_ids"], questions, texts, record["answers"], record["correct_answers"])
+        )
+    ]
+
+
+def expanded_record(record, questions):
+    """
+    The record with full question_details (id, text and answers of each question), as
+    written to exports
+    """
+    expanded = {key: value for key, value in record.items() if key not in COMPACT_FIELDS}
+    expanded["question_details"] = question_details(record, questions)
+    return expanded
+
+
+def legacy_question_id(text, correct_answer):
+    """
+    Id for a question known only by its text and correct answer (details exported
+    before they carried ids); the same on every import, and never a stored question's id
+    """
+    return "legacy-" + question_id(text, (), correct_answer)
+
+
+def compact_record(record):
+    """
+    Convert a record with full question_details (saved by an older version or
+    imported from an export) to the compact layout
+
+    Details carry the id of their question, which is kept, so a question keeps its id
+    through an export and import; older details without one get a legacy id. Only the
+    text of each question is known, so it is kept in the record rather than put in
+    the question store.
+    """
+    if "question_details" not in record:
+        return record
+    details = record["question_details"]
+    compact = {key: value for key, value in record.items() if key != "question_details"}
+    compact["question_ids"] = [
+        detail.get("question_id") or legacy_question_id(detail["question_text"], detail["correct_answer"])
+        for detail in details
+    ]
+    compact["answers"] = [detail["user_answer"] for detail in details]
+    compact["correct_answers"] = [detail["correct_answer"] for detail in details]
+    compact["question_texts"] = [detail["question_text"] for detail in details]
+    return compact
+
+
+def performance_summary(performance_data):
+    """
+    Summary of a performance record used for adaptive difficulty
+    """
+    return {
+        "topic": performance_data["topic"],
+        "accuracy": performance_data["accuracy"],
+        "difficulty": performance_data["difficulty"]
+    }
+
+
+def count_correct(questions, answers):
+    """
+    Number of answers matching the correct letter of their question
+    """
+    return sum(1 for question, answer in zip(questions, answers) if answer == Question.from_list(question).answer)
+
+
+def build_registry(history):
+    """
+    Topic registry over a list of performance records, merging spellings of a topic
+    """
+    registry = TopicRegistry()
+    for index, record in enumerate(history):
+        registry.add_record(record["topic"], index)
+    return registry
+
+
+def adaptive_difficulty(history, registry, topic, difficulty):
+    """
+    Adjust the requested difficulty from the most recent quiz on the same topic
+    """
+    recent_index = registry.latest(topic)
+    if recent_index is None:
+        return difficulty
+    recent = history[recent_index]
+    return determine_difficulty(difficulty, recent["score"], recent["total"])
+
+
+def analytics_summary(history, registry=None):
+    """
+    Aggregate performance records into the figures shown on the Analytics page
+    """
+    registry = registry or build_registry(history)
+    by_topic = {}
+    by_difficulty = {}
+    for record in history:
+        topic = by_topic.setdefault(
+            registry.display_name(record["topic"]),
+            {"quizzes": 0, "score": 0, "total": 0, "accuracy_sum": 0.0}
+        )
+        topic["quizzes"] += 1
+        topic["score"] += record["score"]
+        topic["total"] += record["total"]
+        topic["accuracy_sum"] += record["accuracy"]
+        by_difficulty[record["difficulty"]] = by_difficulty.get(record["difficulty"], 0) + 1
+
+    for topic in by_topic.values():
+        topic["accuracy"] = topic.pop("accuracy_sum") / topic["quizzes"]
+
+    return {
+        "total_quizzes": len(history),
+        "average_accuracy": sum(r["accuracy"] for r in history) / len(history) if history else 0,
+        "topics_covered": len(by_topic),
+        "by_topic": by_topic,
+        "by_difficulty": by_difficulty,
+        "progression": [
+            {"timestamp": r["timestamp"], "topic": registry.display_name(r["topic"]), "accuracy": r["accuracy"]}
+            for r in history
+        ],
+    }
@@ -0,0 +1,205 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from html import escape
+
+# Seconds between stack samples of the profiled thread
+SAMPLE_INTERVAL = float(os.getenv("MCQ_PROFILE_INTERVAL_MS", "2")) / 1000
+
+# Where time is attributed: the innermost frame on a sampled stack that matches one of
+# these (file, function names) decides the category. None matches the whole file.
+CATEGORIES = [
+    ("parsing", "generation.py", {"parse_mcq_response"}),
+    ("generation", "generation.py", None),
+    ("generation", "app.py", {"generate_mcqs", "top_up_questions"}),
+    ("generation", "large_quiz.py", None),
+    ("generation", "adaptive_quiz.py", None),
+    ("generation", "retrieval.py", None),
+    ("analytics", "app.py", {"display_analytics", "display_item_statistics", "display_token_usage"}),
+    ("analytics", "item_analysis.py", None),
+    ("analytics", "performance.py", None),
+]
+# Samples outside the categories above whose closest caller is one of these count as rendering
+RENDERING_PACKAGES = ("streamlit", "streamlit_extras", "plotly")
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CATEGORY_COLORS = {
+    "generation": "#e17055", "parsing": "#fdcb6e", "analytics": "#6c5ce7", "rendering": "#00b894", "other": "#b2bec3",
+}
+
+
+def _category(stack):
+    for filename, function, _ in reversed(stack):
+        name = os.path.basename(filename)
+        for category, category_file, functions in CATEGORIES:
+            if name == category_file and (functions is None or function in functions):
+                return category
+    # Otherwise the closest caller that is either app code or a UI library decides
+    for filename, _, _ in reversed(stack):
+        if os.path.dirname(os.path.abspath(filename)) == APP_DIR:
+            return "other"
+        parts = filename.replace("\\", "/").split("/")
+        if any(package in parts for package in RENDERING_PACKAGES):
+            return "rendering"
+    return "other"
+
+
+class StackSampler:
+    """
+    Sampling profiler for one thread: a background thread records the thread's call
+    stack at a fixed interval
+
+    Unlike cProfile nothing is hooked into the profiled code, so it runs at full speed
+    and time spent waiting (e.g. on the LLM) is captured too.
+    """
+
+    def __init__(self, thread_id=None, interval=SAMPLE_INTERVAL):
+        self.thread_id = threading.get_ident() if thread_id is None else thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+        self.started = None
+        self.duration = 0.0
+
+    def _run(self):
+        own_file = os.path.abspath(__file__)
+        is_own = {}
+        while not self._stop.is_set():
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                filename = code.co_filename
+                if filename not in is_own:
+                    is_own[filename] = os.path.abspath(filename) == own_file
+                if not is_own[filename]:
+                    stack.append((filename, code.co_name, code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="mcq-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started
+        return Profile(self.stacks, self.duration, self.interval)
+
+
+class Profile:
+    """
+    Result of a sampled run: folded stacks, time per category and a flame graph
+    """
+
+    def __init__(self, stacks, duration, interval, label=""):
+        self.stacks = stacks
+        self.duration = duration
+        self.interval = interval
+        self.label = label
+        self.samples = sum(stacks.values())
+
+    def categories(self):
+        """
+        Seconds attributed to generation, parsing, analytics, rendering and other
+        """
+        counts = Counter()
+        for stack, count in self.stacks.items():
+            counts[_category(stack)] += count
+        scale = self.duration / self.samples if self.samples else 0.0
+        return {category: counts.get(category, 0) * scale for category in CATEGORY_COLORS}
+
+    @staticmethod
+    def _frame_label(frame):
+        filename, function, line = frame
+        return f"{function} ({os.path.basename(filename)}:{line})"
+
+    def folded(self):
+        """
+        Stacks in the collapsed format read by flamegraph.pl and speedscope
+        """
+        lines = [
+            ";".join(self._frame_label(frame).replace(";", ",") for frame in stack) + f" {count}"
+            for stack, count in self.stacks.most_common()
+        ]
+        return "\n".join(lines) + "\n"
+
+    def flame_graph_svg(self, width=1200, row_height=16, min_width=0.5):
+        """
+        Render the samples as an SVG flame graph (root at the bottom, hover for details)
+        """
+        # Merge stacks into a call tree: node = [samples, children, category counts]
+        root = [0, {}, Counter()]
+        max_depth = 0
+        for stack, count in self.stacks.items():
+            category = _category(stack)
+            node = root
+            node[0] += count
+            for frame in stack:
+                node = node[1].setdefault(self._frame_label(frame), [0, {}, Counter()])
+                node[0] += count
+                node[2][category] += count
+            max_depth = max(max_depth, len(stack))
+
+        height = (max_depth + 2) * row_height
+        scale = width / root[0] if root[0] else 0
+        rects = []
+
+        def draw(label, node, x, depth):
+            node_width = node[0] * scale
+            if node_width < min_width:
+                return
+            y = height - (depth + 1) * row_height
+            category = node[2].most_common(1)[0][0] if node[2] else "other"
+            seconds = node[0] * self.duration / self.samples
+            title = escape(f"{label}: {node[0]} samples, {seconds * 1000:.0f} ms, {category}")
+            text = escape(label[:int(node_width / 7)]) if node_width > 35 else ""
+            rects.append(
+                f'<g><title>{title}</title><rect x="{x:.1f}" y="{y}" width="{node_width:.1f}" height="{row_height - 1}" '
+                f'fill="{CATEGORY_COLORS[category]}" rx="2"/>'
+                f'<text x="{x + 3:.1f}" y="{y + row_height - 4}">{text}</text></g>'
+            )
+            child_x = x
+            for child_label, child in sorted(node[1].items()):
+                draw(child_label, child, child_x, depth + 1)
+                child_x += child[0] * scale
+
+        child_x = 0.0
+        for label, child in sorted(root[1].items()):
+            draw(label, child, child_x, 0)
+            child_x += child[0] * scale
+
+        legend = "".join(
+            f'<rect x="{10 + i * 110}" y="4" width="10" height="10" fill="{color}"/>'
+            f'<text x="{24 + i * 110}" y="13">{category}</text>'
+            for i, (category, color) in enumerate(CATEGORY_COLORS.items())
+        )
+        return (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'font-family="Segoe UI, Arial, sans-serif" font-size="11">'
+            f'<rect width="100%" height="100%" fill="white"/>{legend}{"".join(rects)}</svg>'
+        )
+
+
+@contextmanager
+def profiled(on_done, label=""):
+    """
+    Sample the current thread for the duration of the block and pass the Profile to
+    on_done, also when the block raises (Streamlit reruns and stops are exceptions)
+    """
+    sampler = StackSampler().start()
+    try:
+        yield
+    finally:
+        profile = sampler.stop()
+        profile.label = label
+        on_done(profile)
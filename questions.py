@@ -0,0 +1,59 @@
+import hashlib
+
+OPTION_LETTERS = ("A", "B", "C", "D")
+
+
+def _normalize(text):
+    return " ".join(str(text).split()).lower()
+
+
+def question_id(text, options, answer):
+    """
+    Stable identifier of a question: the same text, options and answer always give the
+    same id, in every session and process
+    """
+    key = "\x1f".join([_normalize(text)] + [_normalize(option) for option in options] + [str(answer)])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+
+class Question:
+    """
+    One multiple-choice question with a stable id
+
+    Quizzes hold these instead of the 7-element lists the LLM output is parsed into;
+    answers, history records and explanations refer to a question by its id rather
+    than copying its text.
+    """
+
+    __slots__ = ("id", "text", "options", "answer", "explanation")
+
+    def __init__(self, text, options, answer, explanation, id=None):
+        self.text = text
+        self.options = tuple(options)
+        self.answer = answer
+        self.explanation = explanation
+        self.id = id or question_id(text, self.options, answer)
+
+    @classmethod
+    def from_list(cls, question):
+        """
+        Build a question from a generated [question, A, B, C, D, answer, explanation] list
+        """
+        if isinstance(question, cls):
+            return question
+        return cls(question[0], question[1:5], question[5], question[6])
+
+    def to_list(self):
+        """
+        The generated 7-element list layout, for JSON, exports and the browser quiz player
+        """
+        return [self.text, *self.options, self.answer, self.explanation]
+
+    def __eq__(self, other):
+        return isinstance(other, Question) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"Question({self.id!r}, {self.text[:40]!r})"
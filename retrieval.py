@@ -0,0 +1,249 @@
+import codecs
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from array import array
+from functools import lru_cache
+
+import numpy as np
+
+# Indexes are cached per document hash, so uploading the same file again is free
+INDEX_DIR = os.getenv("MCQ_INDEX_DIR", os.path.join(tempfile.gettempdir(), "mcq_indexes"))
+# Opened indexes kept per process; each holds its document's vocabulary in memory
+OPEN_INDEXES = 32
+READ_BLOCK_SIZE = 64 * 1024
+CHUNK_WORDS = 200
+CHUNK_OVERLAP = 40
+TOP_K = 5
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9\-]+")
+_WORD_SPLIT_RE = re.compile(r"\S+")
+STOPWORDS = {
+    "the", "and", "for", "are", "was", "were", "with", "that", "this", "from", "have", "has",
+    "had", "not", "but", "its", "into", "than", "then", "they", "them", "their", "there",
+    "which", "what", "when", "where", "who", "will", "would", "can", "could", "should", "been",
+    "also", "such", "these", "those", "each", "other", "more", "most", "some", "any", "all",
+    "about", "over", "only", "our", "your", "you", "his", "her", "she", "him", "one", "may",
+}
+
+
+def tokenize(text):
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def document_hash(fp):
+    """
+    SHA-256 of a binary file object, read block by block
+    """
+    digest = hashlib.sha256()
+    fp.seek(0)
+    for block in iter(lambda: fp.read(READ_BLOCK_SIZE), b""):
+        digest.update(block)
+    fp.seek(0)
+    return digest.hexdigest()
+
+
+def iter_text_blocks(fp, name):
+    """
+    Yield the text of a document piece by piece: page by page for PDFs, fixed-size
+    blocks for plain text
+    """
+    fp.seek(0)
+    if name.lower().endswith(".pdf"):
+        try:
+            from pypdf import PdfReader
+        except ImportError as e:
+            raise ImportError("The pypdf package is required to index PDF files (pip install pypdf)") from e
+        for page in PdfReader(fp).pages:
+            yield page.extract_text() or ""
+    else:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        for block in iter(lambda: fp.read(READ_BLOCK_SIZE), b""):
+            yield decoder.decode(block)
+        yield decoder.decode(b"", final=True)
+
+
+def iter_chunks(blocks, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """
+    Split a stream of text blocks into overlapping windows of words
+
+    A word cut at a block boundary is carried over to the next block.
+    """
+    words = []
+    carry = ""
+    step = chunk_words - overlap
+    for block in blocks:
+        text = carry + block
+        carry = ""
+        if text and not text[-1].isspace():
+            # The last word may continue in the next block
+            split_at = max(text.rfind(" "), text.rfind("\n"), text.rfind("\t"))
+            text, carry = text[:split_at + 1], text[split_at + 1:]
+        words.extend(_WORD_SPLIT_RE.findall(text))
+        while len(words) >= chunk_words:
+            yield " ".join(words[:chunk_words])
+            del words[:step]
+    words.extend(_WORD_SPLIT_RE.findall(carry))
+    if words:
+        yield " ".join(words)
+
+
+class DocumentIndex:
+    """
+    BM25 index over the chunks of one document, stored as NumPy arrays on disk
+
+    Term weights are kept in compressed sparse column form (one column per term), so
+    scoring a query only touches the postings of its terms. All arrays and the chunk
+    text are memory-mapped, so large corpora are not loaded into memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.name = meta["name"]
+        self.num_chunks = meta["num_chunks"]
+        self.vocabulary = meta["vocabulary"]
+        self.indptr = np.load(os.path.join(path, "indptr.npy"), mmap_mode="r")
+        self.indices = np.load(os.path.join(path, "indices.npy"), mmap_mode="r")
+        self.weights = np.load(os.path.join(path, "weights.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        text_path = os.path.join(path, "chunks.bin")
+        self.text = np.memmap(text_path, dtype=np.uint8, mode="r") if os.path.getsize(text_path) else b""
+
+    def chunk(self, i):
+        return bytes(self.text[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def search(self, query, k=TOP_K, offset=0):
+        """
+        Return the chunks ranked offset..offset+k for a query (offset lets successive
+        batches of questions draw on different passages)
+        """
+        scores = np.zeros(self.num_chunks, dtype=np.float64)
+        for term in set(tokenize(query)):
+            col = self.vocabulary.get(term)
+            if col is None:
+                continue
+            start, end = self.indptr[col], self.indptr[col + 1]
+            scores[self.indices[start:end]] += self.weights[start:end]
+        ranked = np.argsort(-scores, kind="stable")
+        ranked = ranked[scores[ranked] > 0]
+        if len(ranked) == 0:
+            # Nothing matches the query: fall back to the start of the document
+            ranked = np.arange(self.num_chunks)
+        if len(ranked) > k:
+            offset = offset % len(ranked)
+            ranked = np.roll(ranked, -offset)
+        return [self.chunk(i) for i in ranked[:k]]
+
+
+def build_index(fp, name, path):
+    """
+    Stream a document into chunks and write its BM25 index to path
+
+    Each build writes to its own staging directory next to path, so two sessions
+    indexing the same document at once don't overwrite each other's files; whichever
+    finishes first publishes the index and the other discards its copy.
+    """
+    if os.path.exists(os.path.join(path, "meta.json")):
+        return
+    tmp_path = tempfile.mkdtemp(dir=os.path.dirname(path), prefix=f"{os.path.basename(path)}.")
+    try:
+        _write_index(fp, name, tmp_path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    # Publish atomically so a concurrent reader never sees a half-written index; if
+    # another build published first, its index is the same and ours is dropped
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            raise
+
+
+def _write_index(fp, name, tmp_path):
+    vocabulary = {}
+    rows, cols, counts = array("i"), array("i"), array("i")
+    lengths = array("i")
+    offsets = array("q", [0])
+
+    with open(os.path.join(tmp_path, "chunks.bin"), "wb") as text_file:
+        for i, chunk in enumerate(iter_chunks(iter_text_blocks(fp, name))):
+            encoded = chunk.encode("utf-8")
+            text_file.write(encoded)
+            offsets.append(offsets[-1] + len(encoded))
+            tokens = tokenize(chunk)
+            lengths.append(len(tokens))
+            term_counts = {}
+            for token in tokens:
+                term_counts[token] = term_counts.get(token, 0) + 1
+            for token, count in term_counts.items():
+                rows.append(i)
+                cols.append(vocabulary.setdefault(token, len(vocabulary)))
+                counts.append(count)
+
+    num_chunks = len(lengths)
+    row = np.frombuffer(rows, dtype=np.int32)
+    col = np.frombuffer(cols, dtype=np.int32)
+    tf = np.frombuffer(counts, dtype=np.int32).astype(np.float32)
+    doc_len = np.frombuffer(lengths, dtype=np.int32).astype(np.float32)
+
+    # BM25 weight of each (chunk, term) posting
+    df = np.bincount(col, minlength=len(vocabulary)).astype(np.float32)
+    idf = np.log1p((num_chunks - df + 0.5) / (df + 0.5))
+    avg_len = doc_len.mean() if num_chunks else 1.0
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len[row] / max(avg_len, 1.0))
+    weights = idf[col] * tf * (BM25_K1 + 1) / (tf + norm)
+
+    # Compressed sparse column layout: postings grouped by term
+    order = np.argsort(col, kind="stable")
+    indptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+    np.cumsum(df.astype(np.int64), out=indptr[1:])
+
+    np.save(os.path.join(tmp_path, "indptr.npy"), indptr)
+    np.save(os.path.join(tmp_path, "indices.npy"), row[order])
+    np.save(os.path.join(tmp_path, "weights.npy"), weights[order].astype(np.float32))
+    np.save(os.path.join(tmp_path, "offsets.npy"), np.frombuffer(offsets, dtype=np.int64))
+    with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+        json.dump({"name": name, "num_chunks": num_chunks, "vocabulary": vocabulary}, f)
+
+
+def index_path(doc_hash, index_dir=INDEX_DIR):
+    return os.path.join(index_dir, doc_hash)
+
+
+def load_or_build_index(fp, name, index_dir=INDEX_DIR):
+    """
+    Return (document hash, index) for an uploaded file, building the index only once
+    """
+    doc_hash = document_hash(fp)
+    path = index_path(doc_hash, index_dir)
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        os.makedirs(index_dir, exist_ok=True)
+        build_index(fp, name, path)
+    return doc_hash, load_index(doc_hash, index_dir)
+
+
+def load_index(doc_hash, index_dir=INDEX_DIR):
+    """
+    Open a previously built index by document hash
+
+    An index never changes once built, so it is opened once per process and shared:
+    background batches and prefetches don't read meta.json again.
+    """
+    return _open_index(index_path(doc_hash, index_dir))
+
+
+@lru_cache(maxsize=OPEN_INDEXES)
+def _open_index(path):
+    return DocumentIndex(path)
@@ -0,0 +1,187 @@
+"""
+Spaced repetition of missed questions (SM-2), served from stored questions only
+
+    python review.py --user <sid>     # cards due now and scheduled for one session
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from questions import Question
+
+REVIEW_DB_PATH = os.getenv("MCQ_REVIEW_DB", "mcq_review.sqlite3")
+
+# SM-2 grades (0-5) given to an answer; only right or wrong is known
+CORRECT_QUALITY = 4
+WRONG_QUALITY = 1
+# Easiness factor of a new card and its lower bound
+INITIAL_EASE = 2.5
+MIN_EASE = 1.3
+# Longest interval between reviews, in days
+MAX_INTERVAL_DAYS = 365
+REVIEW_TOPIC = "Spaced review"
+
+
+def sm2(ease, interval, repetitions, quality):
+    """
+    Next (ease, interval in days, repetitions) of a card after a review graded 0-5
+
+    A failed review (quality below 3) starts the card over with an interval of zero:
+    as in SM-2, failed items are repeated in the same session until they are recalled.
+    """
+    if quality < 3:
+        repetitions, interval = 0, 0
+    else:
+        if repetitions == 0:
+            interval = 1
+        elif repetitions == 1:
+            interval = 6
+        else:
+            interval = min(round(interval * ease), MAX_INTERVAL_DAYS)
+        repetitions += 1
+    ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return ease, interval, repetitions
+
+
+def new_review_plan(num_questions):
+    """
+    Plan of a review quiz (plain data, saved with the quiz); its questions are all known
+    up front, so nothing is generated in the background
+    """
+    return {"kind": "review", "topic": REVIEW_TOPIC, "difficulty": "Mixed", "target": num_questions}
+
+
+class ReviewQueue:
+    """
+    Review cards per user in a SQLite file shared by all worker processes on a host
+
+    A card is created when a question is answered wrongly and rescheduled with SM-2
+    every time the question is answered again. Due cards are found through the
+    (user, due) index. Scheduled questions are copied into the same file, so a review
+    quiz needs neither the LLM nor the shared question cache, whose entries expire.
+    """
+
+    def __init__(self, path=REVIEW_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        with closing(sqlite3.connect(path)) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cards ("
+                "user TEXT NOT NULL, question_id TEXT NOT NULL, ease REAL NOT NULL, interval INTEGER NOT NULL, "
+                "repetitions INTEGER NOT NULL, lapses INTEGER NOT NULL, due INTEGER NOT NULL, "
+                "PRIMARY KEY (user, question_id))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cards_user_due ON cards (user, due)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS questions ("
+                "id TEXT PRIMARY KEY, text TEXT NOT NULL, option_a TEXT NOT NULL, option_b TEXT NOT NULL, "
+                "option_c TEXT NOT NULL, option_d TEXT NOT NULL, answer TEXT NOT NULL, explanation TEXT NOT NULL)"
+            )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def record_quiz(self, user, questions, answers, now=None):
+        """
+        Schedule the answers of a finished quiz: wrong answers create or reset a card,
+        right answers move an existing card further out
+
+        Returns the number of cards created or rescheduled.
+        """
+        now = int(time.time() if now is None else now)
+        user = str(user)
+        conn = self._conn()
+        scheduled = 0
+        with conn:
+            for question, answer in zip(questions, answers):
+                question = Question.from_list(question)
+                correct = answer == question.answer
+                row = conn.execute(
+                    "SELECT ease, interval, repetitions, lapses FROM cards WHERE user = ? AND question_id = ?",
+                    (user, question.id)
+                ).fetchone()
+                if row is None:
+                    if correct:
+                        continue  # Only missed questions are scheduled
+                    row = (INITIAL_EASE, 0, 0, 0)
+                    conn.execute(
+                        "INSERT OR IGNORE INTO questions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (question.id, question.text, *question.options, question.answer, question.explanation)
+                    )
+                ease, interval, repetitions, lapses = row
+                ease, interval, repetitions = sm2(
+                    ease, interval, repetitions, CORRECT_QUALITY if correct else WRONG_QUALITY
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO cards VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (user, question.id, ease, interval, repetitions, lapses + (not correct), now + interval * 86400)
+                )
+                scheduled += 1
+        return scheduled
+
+    def due_count(self, user, now=None):
+        now = int(time.time() if now is None else now)
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM cards WHERE user = ? AND due <= ?", (str(user), now)
+        ).fetchone()[0]
+
+    def next_due(self, user):
+        """
+        Unix time at which the user's next card is due, or None without cards
+        """
+        return self._conn().execute("SELECT MIN(due) FROM cards WHERE user = ?", (str(user),)).fetchone()[0]
+
+    def due_questions(self, user, limit, now=None):
+        """
+        Up to limit due questions, most overdue first
+        """
+        now = int(time.time() if now is None else now)
+        rows = self._conn().execute(
+            "SELECT q.id, q.text, q.option_a, q.option_b, q.option_c, q.option_d, q.answer, q.explanation "
+            "FROM cards c JOIN questions q ON q.id = c.question_id "
+            "WHERE c.user = ? AND c.due <= ? ORDER BY c.due LIMIT ?",
+            (str(user), now, limit)
+        ).fetchall()
+        return [Question(text, options, answer, explanation, id=question_id)
+                for question_id, text, *options, answer, explanation in rows]
+
+    def cards(self, user):
+        """
+        All of a user's cards, soonest due first
+        """
+        rows = self._conn().execute(
+            "SELECT c.question_id, q.text, c.ease, c.interval, c.repetitions, c.lapses, c.due "
+            "FROM cards c JOIN questions q ON q.id = c.question_id WHERE c.user = ? ORDER BY c.due",
+            (str(user),)
+        ).fetchall()
+        columns = ("question_id", "text", "ease", "interval", "repetitions", "lapses", "due")
+        return [dict(zip(columns, row)) for row in rows]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show a user's spaced repetition cards")
+    parser.add_argument("--db", default=REVIEW_DB_PATH, help="path of the review database")
+    parser.add_argument("--user", required=True, help="session id (sid), or api:user:<user_id> for an API user")
+    args = parser.parse_args(argv)
+
+    queue = ReviewQueue(args.db)
+    now = time.time()
+    cards = queue.cards(args.user)
+    print(f"{len(cards)} cards, {queue.due_count(args.user, now)} due now")
+    for card in cards:
+        due = "now" if card["due"] <= now else time.strftime("%Y-%m-%d %H:%M", time.localtime(card["due"]))
+        print(f"  {due:<16} ease {card['ease']:.2f}  every {card['interval']:>3} d  "
+              f"{card['lapses']} lapses  {card['text'][:60]}")
+
+
+if __name__ == "__main__":
+    main()
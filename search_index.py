@@ -0,0 +1,250 @@
+"""
+Full-text search over every generated question, its options, explanation and topic
+
+    python search_index.py recursion base case            # best matches
+    python search_index.py photosynthesis --difficulty Easy --limit 5
+    python search_index.py --benchmark 1000000            # query times at a million questions
+
+Questions are added as they are generated (app, HTTP API and batch generation) to a
+SQLite FTS5 index shared by all worker processes on a host. Search results can be
+turned into a quiz without calling the LLM.
+"""
+import argparse
+import html
+import itertools
+import os
+import random
+import re
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import closing
+
+from questions import Question
+
+SEARCH_DB_PATH = os.getenv("MCQ_SEARCH_DB", "mcq_search.sqlite3")
+# Only the newest matches of a query are ranked by relevance. Ranking scores every
+# match, which takes about a second for a common word at a million questions.
+RANK_WINDOW = 500
+SEARCH_TOPIC_PREFIX = "Search: "
+# Separates the options in the stored row; a separator for the tokenizer as well
+OPTION_SEPARATOR = "\x1f"
+
+
+def search_terms(query):
+    """
+    Lower-cased words of a query; punctuation and FTS5 operators are ignored
+    """
+    return re.findall(r"\w+", query.lower())
+
+
+def match_expression(query, topic=None, difficulty=None):
+    """
+    FTS5 MATCH expression requiring every word of the query, or None for an empty query
+
+    Every word is quoted, so user input never reaches the FTS5 query syntax.
+    """
+    clauses = [f'"{term}"' for term in search_terms(query)]
+    if topic and search_terms(topic):
+        clauses.append('topic : "' + " ".join(search_terms(topic)) + '"')
+    if difficulty:
+        clauses.append(f'difficulty : "{difficulty.lower()}"')
+    return " ".join(clauses) or None
+
+
+def highlight(text, query):
+    """
+    HTML-escaped text with the words of the query (and longer words starting with them) in <mark>
+    """
+    text = html.escape(text)
+    terms = sorted(set(search_terms(query)), key=len, reverse=True)
+    if not terms:
+        return text
+    pattern = re.compile(r"\b(" + "|".join(re.escape(term) for term in terms) + r")\w*", re.IGNORECASE)
+    return pattern.sub(lambda match: f"<mark>{match.group(0)}</mark>", text)
+
+
+def new_search_plan(query, num_questions, difficulty=None):
+    """
+    Plan of a quiz made of search results (plain data, saved with the quiz); its
+    questions are all known up front, so nothing is generated in the background
+    """
+    return {
+        "kind": "search", "topic": SEARCH_TOPIC_PREFIX + query.strip(), "difficulty": difficulty or "Mixed",
+        "target": num_questions, "query": query,
+    }
+
+
+class QuestionIndex:
+    """
+    Generated questions in a SQLite file with an FTS5 index over their text, options,
+    explanation, topic and difficulty
+
+    Each question is stored once by its stable id, with the topic and difficulty it was
+    first generated for. A trigger keeps the index in step with the questions table.
+    """
+
+    def __init__(self, path=SEARCH_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        with closing(sqlite3.connect(path)) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS questions ("
+                "rowid INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, topic TEXT NOT NULL, difficulty TEXT NOT NULL, "
+                "text TEXT NOT NULL, options TEXT NOT NULL, answer TEXT NOT NULL, explanation TEXT NOT NULL, "
+                "created INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS question_search USING fts5("
+                "text, options, explanation, topic, difficulty, "
+                "content='questions', content_rowid='rowid', tokenize='porter unicode61')"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS questions_indexed AFTER INSERT ON questions BEGIN "
+                "INSERT INTO question_search (rowid, text, options, explanation, topic, difficulty) "
+                "VALUES (new.rowid, new.text, new.options, new.explanation, new.topic, new.difficulty); END"
+            )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, questions, topic, difficulty, now=None):
+        """
+        Index generated questions; returns how many were new
+        """
+        now = int(time.time() if now is None else now)
+        rows = []
+        for question in questions:
+            question = Question.from_list(question)
+            rows.append((
+                question.id, topic, difficulty, question.text, OPTION_SEPARATOR.join(question.options),
+                question.answer, question.explanation, now
+            ))
+        conn = self._conn()
+        with conn:
+            # Questions already indexed are skipped; new ones reach the index through the trigger
+            return conn.executemany(
+                "INSERT OR IGNORE INTO questions (id, topic, difficulty, text, options, answer, explanation, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            ).rowcount
+
+    def search(self, query, limit=20, topic=None, difficulty=None):
+        """
+        Up to limit questions matching every word of the query, most relevant first
+
+        Returns dicts with the question, its topic and difficulty and its BM25 score
+        (lower is better). Relevance is ranked among the RANK_WINDOW newest matches.
+        """
+        expression = match_expression(query, topic, difficulty)
+        if expression is None:
+            return []
+        rows = self._conn().execute(
+            "SELECT q.id, q.topic, q.difficulty, q.text, q.options, q.answer, q.explanation, matches.score "
+            "FROM (SELECT rowid, bm25(question_search) AS score FROM question_search "
+            "      WHERE question_search MATCH ? ORDER BY rowid DESC LIMIT ?) AS matches "
+            "JOIN questions q ON q.rowid = matches.rowid ORDER BY matches.score LIMIT ?",
+            (expression, RANK_WINDOW, limit)
+        ).fetchall()
+        return [
+            {
+                "question": Question(text, options.split(OPTION_SEPARATOR), answer, explanation, id=question_id),
+                "topic": question_topic,
+                "difficulty": question_difficulty,
+                "score": score,
+            }
+            for question_id, question_topic, question_difficulty, text, options, answer, explanation, score in rows
+        ]
+
+    def count(self):
+        """
+        Number of indexed questions (rows are never deleted, so the largest rowid)
+        """
+        return self._conn().execute("SELECT COALESCE(MAX(rowid), 0) FROM questions").fetchone()[0]
+
+
+def _synthetic_questions(count, rng, vocabulary_size=20000):
+    """
+    Random questions with a Zipf-like word distribution, for the benchmark
+    """
+    vocabulary = [f"term{i}" for i in range(vocabulary_size)]
+    cumulative_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(vocabulary_size)))
+    for i in range(count):
+        words = rng.choices(vocabulary, cum_weights=cumulative_weights, k=40)
+        yield Question(
+            f"Question {i}: " + " ".join(words[:12]) + "?",
+            [" ".join(words[12 + j * 2:14 + j * 2]) for j in range(4)],
+            "ABCD"[i % 4],
+            " ".join(words[20:]),
+        )
+
+
+def benchmark(count, queries=50, seed=0, log=print):
+    """
+    Index count synthetic questions in a temporary file and time searches for common,
+    medium and rare words; returns {kind: median milliseconds}
+    """
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = QuestionIndex(os.path.join(tmp, "search.sqlite3"))
+        started = time.perf_counter()
+        batch = []
+        for question in _synthetic_questions(count, rng):
+            batch.append(question)
+            if len(batch) == 10000:
+                index.add(batch, rng.choice(["Biology", "History", "Calculus", "Recursion"]), "Medium")
+                batch = []
+        index.add(batch, "Biology", "Medium")
+        log(f"Indexed {index.count():,} questions in {time.perf_counter() - started:.0f} s")
+
+        results = {}
+        for kind, ranks in [("common", (0, 10)), ("medium", (100, 1000)), ("rare", (5000, 20000)),
+                            ("two words", (10, 1000))]:
+            timings = []
+            for _ in range(queries):
+                words = 2 if kind == "two words" else 1
+                query = " ".join(f"term{rng.randrange(*ranks)}" for _ in range(words))
+                started = time.perf_counter()
+                index.search(query)
+                timings.append((time.perf_counter() - started) * 1000)
+            results[kind] = statistics.median(timings)
+            log(f"{kind:<10} median {results[kind]:6.2f} ms   max {max(timings):6.2f} ms")
+        index._conn().close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search generated questions")
+    parser.add_argument("query", nargs="*", help="words that must all appear")
+    parser.add_argument("--db", default=SEARCH_DB_PATH, help="path of the search index")
+    parser.add_argument("--topic", help="only questions generated for this topic")
+    parser.add_argument("--difficulty", help="only questions of this difficulty")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--benchmark", type=int, metavar="N",
+                        help="time queries against N synthetic questions instead of searching")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+        return
+    if not args.query:
+        parser.error("a query is required")
+
+    index = QuestionIndex(args.db)
+    hits = index.search(" ".join(args.query), args.limit, args.topic, args.difficulty)
+    print(f"{len(hits)} of {index.count():,} questions")
+    for hit in hits:
+        question = hit["question"]
+        print(f"  {question.id}  [{hit['topic']} / {hit['difficulty']}]  {question.text[:80]}")
+
+
+if __name__ == "__main__":
+    main()
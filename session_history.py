@@ -0,0 +1,152 @@
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import uuid
+import weakref
+from collections import deque
+from contextlib import closing
+
+# Per-session budget for history kept in memory (older quizzes spill to disk)
+DEFAULT_MEMORY_BUDGET = int(float(os.getenv("MCQ_SESSION_MEMORY_MB", "2")) * 1024 * 1024)
+# Maximum number of recent quizzes kept in memory regardless of their size
+DEFAULT_RECENT_CAPACITY = int(os.getenv("MCQ_HISTORY_RECENT", "20"))
+SPILL_DIR = os.getenv("MCQ_SPILL_DIR", os.path.join(tempfile.gettempdir(), "mcq_spill"))
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class HistoryBuffer:
+    """
+    List-like quiz history that keeps only the most recent records in memory
+
+    Records beyond the recent capacity or the memory budget are spilled to a
+    per-session SQLite file and loaded back only when they are indexed or iterated.
+    Indices are stable: record i is always the i-th quiz appended.
+    """
+
+    def __init__(self, memory_budget=DEFAULT_MEMORY_BUDGET, recent_capacity=DEFAULT_RECENT_CAPACITY,
+                 spill_dir=SPILL_DIR):
+        self.memory_budget = memory_budget
+        self.recent_capacity = recent_capacity
+        self.spill_path = os.path.join(spill_dir, f"{uuid.uuid4().hex}.sqlite")
+        self._spill_dir = spill_dir
+        self._recent = deque()  # (record, approximate size in bytes)
+        self._recent_bytes = 0
+        self._spilled = 0
+        # Remove the spill file when the session's buffer is garbage collected
+        self._finalizer = weakref.finalize(self, _remove_file, self.spill_path)
+
+    def __len__(self):
+        return self._spilled + len(self._recent)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        if self._spilled:
+            with closing(self._connect()) as conn:
+                for (data,) in conn.execute("SELECT data FROM history ORDER BY idx"):
+                    yield json.loads(data)
+        for record, _ in list(self._recent):
+            yield record
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        if index >= self._spilled:
+            return self._recent[index - self._spilled][0]
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT data FROM history WHERE idx = ?", (index,)).fetchone()
+        return json.loads(row[0])
+
+    def _connect(self):
+        os.makedirs(self._spill_dir, exist_ok=True)
+        conn = sqlite3.connect(self.spill_path)
+        conn.execute("CREATE TABLE IF NOT EXISTS history (idx INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+        return conn
+
+    def append(self, record):
+        """
+        Add a record, spilling the oldest in-memory records if over capacity or budget
+        """
+        data = json.dumps(record)
+        self._recent.append((record, len(data)))
+        self._recent_bytes += len(data)
+        self._enforce_budget()
+
+    def _enforce_budget(self):
+        spill = []
+        # Always keep the newest record in memory, it is what the UI shows next
+        while len(self._recent) > 1 and (
+            len(self._recent) > self.recent_capacity or self._recent_bytes > self.memory_budget
+        ):
+            record, size = self._recent.popleft()
+            self._recent_bytes -= size
+            spill.append((self._spilled + len(spill), json.dumps(record)))
+        if spill:
+            with closing(self._connect()) as conn, conn:
+                conn.executemany("INSERT INTO history (idx, data) VALUES (?, ?)", spill)
+            self._spilled += len(spill)
+
+    def recent(self):
+        """
+        Return the records currently held in memory, oldest first
+        """
+        return [record for record, _ in self._recent]
+
+    def memory_usage(self):
+        """
+        Report how much of the history is held in memory and how much is on disk
+        """
+        return {
+            "in_memory_records": len(self._recent),
+            "in_memory_bytes": self._recent_bytes,
+            "spilled_records": self._spilled,
+            "spilled_bytes": os.path.getsize(self.spill_path) if self._spilled else 0,
+            "budget_bytes": self.memory_budget,
+        }
+
+
+def _deep_size(obj, seen=None):
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    nbytes = getattr(obj, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_size(k, seen) + _deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(_deep_size(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += _deep_size(vars(obj), seen)
+    return size
+
+
+def session_memory_usage(session_state):
+    """
+    Approximate the memory held by one session's state, per key, in bytes
+
+    The history buffer reports only its in-memory part; spilled records are on disk.
+    """
+    usage = {}
+    for key in list(session_state.keys()):
+        value = session_state[key]
+        if isinstance(value, HistoryBuffer):
+            usage[key] = value.memory_usage()["in_memory_bytes"]
+        else:
+            usage[key] = _deep_size(value)
+    return usage
@@ -0,0 +1,238 @@
+"""
+Offline learner simulator for comparing difficulty policies, no LLM or network needed
+
+    python simulate.py                                   # every policy, 100,000 learners
+    python simulate.py --learners 1000000 --questions 1 --policy threshold --policy step
+
+Each simulated learner has a latent ability and answers questions according to a
+three-parameter logistic (3PL) model: a question at a level is answered correctly with
+probability GUESS + (1 - GUESS) / (1 + exp(-DISCRIMINATION * (ability - level difficulty))).
+The appropriate level for a learner is the one whose success probability is closest to
+the target accuracy. After every quiz a policy picks the next level from the current
+level and the number of correct answers, exactly like determine_difficulty() does in
+the app. Abilities can grow with practice, so a policy also has to follow a moving target.
+
+Policies are plain functions (current level, correct, total) -> next level. Before a
+run they are tabulated for every possible outcome, so all learners advance with a
+single array lookup per quiz.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from difficulty import DIFFICULTY_LEVELS, determine_difficulty, step_difficulty
+
+# Item difficulty of each level on the ability scale (abilities are standard normal)
+LEVEL_DIFFICULTY = np.array([-1.0, 0.0, 1.0])
+DISCRIMINATION = 1.7
+# Chance of guessing right among four options
+GUESS = 0.25
+# Success rate at which practice is considered appropriately challenging
+TARGET_ACCURACY = 0.7
+# Quizzes in a row at the appropriate level after which a learner counts as converged
+SETTLE_QUIZZES = 3
+# Longest quiz sampled answer by answer rather than with a binomial draw
+BERNOULLI_MAX_QUESTIONS = 10
+
+
+def band_policy(current, correct, total):
+    """
+    Harder at 80% or more, easier below 50%, otherwise stay
+    """
+    accuracy = correct / total if total else 0
+    if accuracy >= 0.8:
+        return step_difficulty(current, 1)
+    if accuracy < 0.5:
+        return step_difficulty(current, -1)
+    return current
+
+
+def step_policy(current, correct, total):
+    """
+    Harder after a majority of right answers, easier otherwise (adaptive mode's rule
+    when every quiz has one question)
+    """
+    return step_difficulty(current, 1 if correct * 2 > total else -1)
+
+
+def fixed_policy(current, correct, total):
+    """
+    Never change the difficulty (baseline)
+    """
+    return current
+
+
+POLICIES = {
+    "threshold": determine_difficulty,
+    "band": band_policy,
+    "step": step_policy,
+    "fixed": fixed_policy,
+}
+
+
+def policy_table(policy, questions):
+    """
+    Next level index for every (level index, number correct) pair of a quiz
+    """
+    return np.array([
+        [DIFFICULTY_LEVELS.index(policy(level, correct, questions)) for correct in range(questions + 1)]
+        for level in DIFFICULTY_LEVELS
+    ], dtype=np.int8)
+
+
+def success_probability(ability, level_difficulty):
+    """
+    3PL probability of a right answer; broadcasts abilities against level difficulties
+    """
+    return GUESS + (1 - GUESS) / (1 + np.exp(-DISCRIMINATION * (ability - level_difficulty)))
+
+
+def level_cuts(target=TARGET_ACCURACY):
+    """
+    Abilities at which the appropriate level moves up one step, found by bisection
+
+    Success probabilities fall as the level rises, so the level closest to the target
+    only ever moves up with ability and learners can be classified with searchsorted.
+    """
+    cuts = []
+    for easier, harder in zip(LEVEL_DIFFICULTY, LEVEL_DIFFICULTY[1:]):
+        low, high = -20.0, 20.0
+        for _ in range(60):
+            middle = (low + high) / 2
+            if abs(success_probability(middle, easier) - target) <= abs(success_probability(middle, harder) - target):
+                low = middle
+            else:
+                high = middle
+        cuts.append(high)
+    return np.array(cuts)
+
+
+def appropriate_levels(abilities, target=TARGET_ACCURACY, cuts=None):
+    """
+    Index of the level whose success probability is closest to the target, per learner
+    """
+    return np.searchsorted(level_cuts(target) if cuts is None else cuts, abilities)
+
+
+def answer_quiz(rng, questions, probability):
+    """
+    Number of right answers of every learner in a quiz of the given length
+    """
+    if questions > BERNOULLI_MAX_QUESTIONS:
+        return rng.binomial(questions, probability)
+    # For short quizzes, one uniform draw per answer is several times faster than
+    # binomial sampling with a different probability per learner
+    correct = np.zeros(len(probability), dtype=np.intp)
+    for _ in range(questions):
+        correct += rng.random(len(probability)) < probability
+    return correct
+
+
+def sample_abilities(learners, rng, mean=0.0, spread=1.0):
+    """
+    Latent abilities of a synthetic learner population
+    """
+    return rng.normal(mean, spread, learners)
+
+
+def simulate(policy, abilities, quizzes=20, questions=5, start="Medium", learning_rate=0.01,
+             target=TARGET_ACCURACY, seed=0):
+    """
+    Replay a population against one policy and summarize how well it tracks each learner
+
+    learning_rate is the ability gained per answered question. Returns the share of
+    quizzes taken at the appropriate level, the share of learners that converged (were
+    at their appropriate level for SETTLE_QUIZZES quizzes in a row), the median number
+    of quizzes taken before converging, the accuracy and the level changes per quiz.
+    """
+    rng = np.random.default_rng(seed)
+    table = policy_table(policy, questions)
+    cuts = level_cuts(target)
+    ability = np.array(abilities, dtype=np.float64)
+    learners = len(ability)
+    levels = np.full(learners, DIFFICULTY_LEVELS.index(start), dtype=np.int8)
+    streak = np.zeros(learners, dtype=np.int32)
+    converged_at = np.full(learners, -1, dtype=np.int32)
+    on_target_quizzes = 0
+    correct_answers = 0
+    level_changes = 0
+
+    for quiz in range(quizzes):
+        on_target = levels == appropriate_levels(ability, cuts=cuts)
+        on_target_quizzes += np.count_nonzero(on_target)
+        streak = np.where(on_target, streak + 1, 0)
+        settled = (streak >= SETTLE_QUIZZES) & (converged_at < 0)
+        converged_at[settled] = quiz + 1 - SETTLE_QUIZZES
+
+        correct = answer_quiz(rng, questions, success_probability(ability, LEVEL_DIFFICULTY[levels]))
+        correct_answers += int(correct.sum())
+        next_levels = table[levels, correct]
+        level_changes += np.count_nonzero(next_levels != levels)
+        levels = next_levels
+        ability += learning_rate * questions
+
+    converged = converged_at >= 0
+    return {
+        "time_at_appropriate": on_target_quizzes / (learners * quizzes),
+        "converged": float(converged.mean()),
+        "median_quizzes_to_converge": float(np.median(converged_at[converged])) if converged.any() else None,
+        "accuracy": correct_answers / (learners * quizzes * questions),
+        "level_changes_per_quiz": level_changes / (learners * quizzes),
+        "final_levels": {
+            level: float(share) for level, share in zip(
+                DIFFICULTY_LEVELS, np.bincount(levels, minlength=len(DIFFICULTY_LEVELS)) / learners
+            )
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare difficulty policies on simulated learners")
+    parser.add_argument("--learners", type=int, default=100_000, help="simulated learners per policy")
+    parser.add_argument("--quizzes", type=int, default=20, help="quizzes taken by every learner")
+    parser.add_argument("--questions", type=int, default=5, help="questions per quiz")
+    parser.add_argument("--start", choices=DIFFICULTY_LEVELS, default="Medium", help="starting difficulty")
+    parser.add_argument("--learning-rate", type=float, default=0.01,
+                        help="ability gained per answered question")
+    parser.add_argument("--target", type=float, default=TARGET_ACCURACY,
+                        help="success rate of the appropriate difficulty")
+    parser.add_argument("--ability-mean", type=float, default=0.0, help="mean ability of the population")
+    parser.add_argument("--ability-spread", type=float, default=1.0, help="standard deviation of the abilities")
+    parser.add_argument("--policy", action="append", choices=sorted(POLICIES), help="policy to run (repeatable)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    abilities = sample_abilities(args.learners, np.random.default_rng(args.seed), args.ability_mean, args.ability_spread)
+    started = time.perf_counter()
+    results = {
+        # The same seed for every policy, so they face the same answers by chance
+        name: simulate(
+            POLICIES[name], abilities, args.quizzes, args.questions, args.start, args.learning_rate,
+            args.target, args.seed
+        )
+        for name in args.policy or POLICIES
+    }
+    elapsed = time.perf_counter() - started
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    initial = np.bincount(appropriate_levels(abilities, args.target), minlength=len(DIFFICULTY_LEVELS)) / args.learners
+    print("Appropriate level at the start: " + ", ".join(
+        f"{level} {share:.0%}" for level, share in zip(DIFFICULTY_LEVELS, initial)
+    ))
+    print(f"\n{'policy':<10} {'at level':>9} {'converged':>10} {'quizzes':>8} {'accuracy':>9} {'changes':>8}")
+    for name, result in results.items():
+        median = result["median_quizzes_to_converge"]
+        print(f"{name:<10} {result['time_at_appropriate']:>9.1%} {result['converged']:>10.1%} "
+              f"{median if median is not None else '-':>8} {result['accuracy']:>9.1%} "
+              f"{result['level_changes_per_quiz']:>8.2f}")
+    answers = args.learners * args.quizzes * args.questions * len(results)
+    print(f"\nSimulated {answers:,} answers in {elapsed:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
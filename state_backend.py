@@ -0,0 +1,507 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from urllib.parse import urlparse
+
+from questions import Question
+from topics import normalize_topic
+
+# Shared by every worker process on this host unless MCQ_STATE_BACKEND points elsewhere
+DEFAULT_BACKEND_URL = "sqlite:///mcq_state.sqlite3"
+
+# How long unfinished quizzes and session histories are kept without activity
+SESSION_TTL = int(os.getenv("MCQ_SESSION_TTL", str(7 * 24 * 3600)))
+# Generated quizzes kept per (topic, difficulty, size) for reuse by other sessions
+QUESTION_POOL_SIZE = int(os.getenv("MCQ_QUESTION_POOL_SIZE", "20"))
+QUESTION_CACHE_TTL = int(os.getenv("MCQ_QUESTION_CACHE_TTL", str(30 * 24 * 3600)))
+# Single unused questions kept per (topic, difficulty) for reuse
+CANDIDATE_POOL_SIZE = 100
+# Questions kept in each process's memory by the question store
+QUESTION_STORE_CACHE_SIZE = int(os.getenv("MCQ_QUESTION_STORE_CACHE", "5000"))
+# Seconds between removals of expired values and lists from local backends
+PURGE_INTERVAL = 3600
+
+
+class StateBackend:
+    """
+    Minimal key-value and list store shared between server processes
+
+    Values are anything JSON-serializable. Lists behave like Redis lists:
+    push appends to the right (extend appends several values in one write) and range
+    uses inclusive, possibly negative, bounds. A push with a ttl (re)sets when the whole
+    list expires; a push without one keeps the list's current expiry.
+    """
+
+    def get(self, key, default=None):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def push(self, key, value, max_length=None, ttl=None):
+        self.extend(key, [value], max_length, ttl)
+
+    def extend(self, key, values, max_length=None, ttl=None):
+        raise NotImplementedError
+
+    def range(self, key, start=0, end=-1):
+        raise NotImplementedError
+
+    def pop(self, key, default=None):
+        """
+        Remove and return the oldest item of a list
+        """
+        raise NotImplementedError
+
+    def purge_expired(self):
+        """
+        Remove expired values and lists; backends that expire keys themselves have nothing to do
+        """
+
+
+class MemoryBackend(StateBackend):
+    """
+    Process-local backend, only suitable for a single worker or tests
+    """
+
+    def __init__(self, purge_interval=PURGE_INTERVAL):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._lists = {}
+        self._list_expires = {}
+        self.purge_interval = purge_interval
+        self._next_purge = time.time() + purge_interval
+
+    def _list(self, key):
+        # Called with the lock held; an expired list is dropped on first access
+        expires = self._list_expires.get(key)
+        if expires is not None and expires < time.time():
+            self._lists.pop(key, None)
+            del self._list_expires[key]
+        return self._lists.get(key)
+
+    def _maybe_purge(self):
+        if time.time() >= self._next_purge:
+            self.purge_expired()
+
+    def get(self, key, default=None):
+        with self._lock:
+            value, expires = self._values.get(key, (None, None))
+            if value is None or (expires is not None and expires < time.time()):
+                return default
+            return json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        self._maybe_purge()
+        with self._lock:
+            self._values[key] = (json.dumps(value), time.time() + ttl if ttl else None)
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+            self._lists.pop(key, None)
+            self._list_expires.pop(key, None)
+
+    def extend(self, key, values, max_length=None, ttl=None):
+        self._maybe_purge()
+        with self._lock:
+            items = self._list(key)
+            if items is None:
+                items = self._lists[key] = []
+            items.extend(json.dumps(value) for value in values)
+            if max_length is not None:
+                del items[:-max_length]
+            if ttl:
+                self._list_expires[key] = time.time() + ttl
+
+    def range(self, key, start=0, end=-1):
+        with self._lock:
+            items = self._list(key) or []
+            return [json.loads(v) for v in items[start:None if end == -1 else end + 1]]
+
+    def pop(self, key, default=None):
+        with self._lock:
+            items = self._list(key)
+            return json.loads(items.pop(0)) if items else default
+
+    def purge_expired(self):
+        with self._lock:
+            now = time.time()
+            self._next_purge = now + self.purge_interval
+            expired_values = [key for key, (_, expires) in self._values.items() if expires is not None and expires < now]
+            for key in expired_values:
+                del self._values[key]
+            expired_lists = [key for key, expires in self._list_expires.items() if expires < now]
+            for key in expired_lists:
+                self._lists.pop(key, None)
+                del self._list_expires[key]
+            return len(expired_values) + len(expired_lists)
+
+
+class SQLiteBackend(StateBackend):
+    """
+    Backend stored in one SQLite file, shared by all worker processes on a host
+
+    WAL mode lets readers proceed while another process writes. Each thread gets its
+    own connection because Streamlit runs sessions on different threads.
+    """
+
+    def __init__(self, path, purge_interval=PURGE_INTERVAL):
+        self.path = path
+        self._local = threading.local()
+        self.purge_interval = purge_interval
+        self._next_purge = time.time()  # Purge once soon after start, then periodically
+        with closing(sqlite3.connect(path)) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS lists ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL, value TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS lists_key ON lists (key, seq)")
+            # When each list with a ttl expires, as a whole like a Redis key
+            conn.execute("CREATE TABLE IF NOT EXISTS list_expiry (key TEXT PRIMARY KEY, expires REAL NOT NULL)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, default=None):
+        row = self._conn().execute("SELECT value, expires FROM kv WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return default
+        return json.loads(row[0])
+
+    def _maybe_purge(self):
+        if time.time() >= self._next_purge:
+            self.purge_expired()
+
+    def set(self, key, value, ttl=None):
+        self._maybe_purge()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl if ttl else None)
+            )
+
+    def delete(self, key):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+            conn.execute("DELETE FROM lists WHERE key = ?", (key,))
+            conn.execute("DELETE FROM list_expiry WHERE key = ?", (key,))
+
+    def _drop_if_expired(self, conn, key, now):
+        # Called inside a transaction: an expired list starts over instead of growing
+        if conn.execute("DELETE FROM list_expiry WHERE key = ? AND expires < ?", (key, now)).rowcount:
+            conn.execute("DELETE FROM lists WHERE key = ?", (key,))
+
+    def extend(self, key, values, max_length=None, ttl=None):
+        self._maybe_purge()
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            self._drop_if_expired(conn, key, now)
+            conn.executemany(
+                "INSERT INTO lists (key, value) VALUES (?, ?)", [(key, json.dumps(value)) for value in values]
+            )
+            if ttl:
+                conn.execute(
+                    "INSERT OR REPLACE INTO list_expiry (key, expires) VALUES (?, ?)", (key, now + ttl)
+                )
+            if max_length is not None:
+                conn.execute(
+                    "DELETE FROM lists WHERE key = ? AND seq NOT IN "
+                    "(SELECT seq FROM lists WHERE key = ? ORDER BY seq DESC LIMIT ?)",
+                    (key, key, max_length)
+                )
+
+    def range(self, key, start=0, end=-1):
+        rows = self._conn().execute(
+            "SELECT value FROM lists WHERE key = ? AND NOT EXISTS "
+            "(SELECT 1 FROM list_expiry WHERE key = ? AND expires < ?) ORDER BY seq",
+            (key, key, time.time())
+        ).fetchall()
+        return [json.loads(v) for (v,) in rows[start:None if end == -1 else end + 1]]
+
+    def pop(self, key, default=None):
+        # A single statement, so two processes can never pop the same item
+        conn = self._conn()
+        with conn:
+            self._drop_if_expired(conn, key, time.time())
+            row = conn.execute(
+                "DELETE FROM lists WHERE seq = (SELECT seq FROM lists WHERE key = ? ORDER BY seq LIMIT 1) "
+                "RETURNING value",
+                (key,)
+            ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def purge_expired(self):
+        """
+        Delete expired values and lists; returns the number of keys removed
+        """
+        now = time.time()
+        self._next_purge = now + self.purge_interval
+        conn = self._conn()
+        with conn:
+            removed = conn.execute("DELETE FROM kv WHERE expires < ?", (now,)).rowcount
+            conn.execute(
+                "DELETE FROM lists WHERE key IN (SELECT key FROM list_expiry WHERE expires < ?)", (now,)
+            )
+            removed += conn.execute("DELETE FROM list_expiry WHERE expires < ?", (now,)).rowcount
+        return removed
+
+
+class RedisBackend(StateBackend):
+    """
+    Backend for any Redis-protocol server (Redis, Valkey, KeyDB), shared across hosts
+    """
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("The redis package is required for a redis:// state backend (pip install redis)") from e
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key, default=None):
+        value = self.client.get(key)
+        return default if value is None else json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, json.dumps(value), ex=ttl)
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def extend(self, key, values, max_length=None, ttl=None):
+        if not values:
+            return
+        pipe = self.client.pipeline()
+        pipe.rpush(key, *(json.dumps(value) for value in values))
+        if max_length is not None:
+            pipe.ltrim(key, -max_length, -1)
+        if ttl:
+            pipe.expire(key, ttl)
+        pipe.execute()
+
+    def range(self, key, start=0, end=-1):
+        return [json.loads(v) for v in self.client.lrange(key, start, end)]
+
+    def pop(self, key, default=None):
+        value = self.client.lpop(key)
+        return default if value is None else json.loads(value)
+
+
+def backend_from_url(url):
+    """
+    Create a backend from a URL: memory://, sqlite:///path/to/file.sqlite3 or redis://host:port/db
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == "memory":
+        return MemoryBackend()
+    if parsed.scheme == "sqlite":
+        path = url[len("sqlite:///"):] if url.startswith("sqlite:///") else parsed.path
+        return SQLiteBackend(path or "mcq_state.sqlite3")
+    if parsed.scheme in ("redis", "rediss", "unix"):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported state backend URL: {url}")
+
+
+def question_cache_key(topic, difficulty, num_questions, source=None):
+    """
+    Cache key shared by every spelling of the same topic (and source document, if any)
+    """
+    key = f"qcache:{normalize_topic(topic)}:{difficulty}:{num_questions}"
+    return f"{key}:{source}" if source else key
+
+
+def quiz_id(questions):
+    """
+    Stable identifier for a set of questions (generated lists or Question records)
+    """
+    ids = " ".join(Question.from_list(q).id for q in questions)
+    return hashlib.sha1(ids.encode("utf-8")).hexdigest()[:16]
+
+
+class QuestionCache:
+    """
+    Pool of generated quizzes per (topic, difficulty, size) shared across sessions
+
+    A session is only ever served quizzes it has not seen yet, so retrying a topic still
+    gives new questions while other sessions reuse what has already been paid for.
+    """
+
+    def __init__(self, backend, pool_size=QUESTION_POOL_SIZE, ttl=QUESTION_CACHE_TTL):
+        self.backend = backend
+        self.pool_size = pool_size
+        self.ttl = ttl
+
+    def get(self, topic, difficulty, num_questions, seen=(), source=None):
+        for entry in reversed(self.backend.range(question_cache_key(topic, difficulty, num_questions, source))):
+            if entry["id"] not in seen:
+                return entry["id"], entry["questions"]
+        return None, None
+
+    def add(self, topic, difficulty, num_questions, questions, source=None):
+        entry = {"id": quiz_id(questions), "questions": questions}
+        self.backend.push(
+            question_cache_key(topic, difficulty, num_questions, source), entry,
+            max_length=self.pool_size, ttl=self.ttl
+        )
+        return entry["id"]
+
+
+class QuestionPool:
+    """
+    Single questions that were generated but never served, shared across sessions
+
+    Taking a question removes it from the pool, so each one is served at most once.
+    """
+
+    # Questions already in the current quiz are skipped, but only this many per take
+    MAX_SKIPPED = 5
+
+    def __init__(self, backend, max_size=CANDIDATE_POOL_SIZE, ttl=QUESTION_CACHE_TTL):
+        self.backend = backend
+        self.max_size = max_size
+        self.ttl = ttl
+
+    def _key(self, topic, difficulty, source=None):
+        key = f"qpool:{normalize_topic(topic)}:{difficulty}"
+        return f"{key}:{source}" if source else key
+
+    def put(self, topic, difficulty, question, source=None):
+        self.backend.push(self._key(topic, difficulty, source), question, max_length=self.max_size, ttl=self.ttl)
+
+    def take(self, topic, difficulty, exclude=(), source=None):
+        """
+        Return a pooled question whose text is not in exclude, or None
+        """
+        key = self._key(topic, difficulty, source)
+        skipped = []
+        question = None
+        while len(skipped) < self.MAX_SKIPPED:
+            candidate = self.backend.pop(key)
+            if candidate is None:
+                break
+            if candidate[0] in exclude:
+                skipped.append(candidate)
+                continue
+            question = candidate
+            break
+        for candidate in skipped:
+            self.backend.push(key, candidate, max_length=self.max_size, ttl=self.ttl)
+        return question
+
+
+class QuestionStore:
+    """
+    Every question served to a session, by stable id, shared across sessions
+
+    Quiz progress and history records only keep question ids, so a question's text,
+    options and explanation are written once here instead of with every save. Recently
+    used questions are also kept in process memory, where sessions taking the same quiz
+    share one copy.
+    """
+
+    def __init__(self, backend, ttl=max(SESSION_TTL, QUESTION_CACHE_TTL), cache_size=QUESTION_STORE_CACHE_SIZE):
+        self.backend = backend
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, question_id):
+        return f"question:{question_id}"
+
+    def _remember(self, question):
+        with self._lock:
+            self._cache[question.id] = question
+            self._cache.move_to_end(question.id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def put(self, questions):
+        """
+        Save questions (refreshing their expiry) and return them as Question records
+        """
+        questions = [Question.from_list(q) for q in questions]
+        for question in questions:
+            self.backend.set(self._key(question.id), question.to_list(), ttl=self.ttl)
+            self._remember(question)
+        return questions
+
+    def get(self, question_id):
+        """
+        Return the question with this id, or None if it is unknown or has expired
+        """
+        with self._lock:
+            question = self._cache.get(question_id)
+        if question is not None:
+            return question
+        stored = self.backend.get(self._key(question_id))
+        if stored is None:
+            return None
+        question = Question.from_list(stored)
+        self._remember(question)
+        return question
+
+    def get_many(self, question_ids):
+        return [self.get(question_id) for question_id in question_ids]
+
+
+class QuizSnapshots:
+    """
+    Quizzes in progress by resume token, so a refreshed or reconnected page continues
+    the quiz instead of generating a new one
+
+    A snapshot has two parts to keep answering cheap: the quiz itself (question ids,
+    plan and settings) is written when it starts or grows, and each answer is appended
+    to a list, which is a single small insert on the answer-click path. A quiz graded
+    at once appends all its answers in one write.
+    """
+
+    def __init__(self, backend, ttl=SESSION_TTL):
+        self.backend = backend
+        self.ttl = ttl
+
+    def _key(self, token):
+        return f"resume:{token}"
+
+    def save(self, token, quiz):
+        self.backend.set(self._key(token), quiz, ttl=self.ttl)
+
+    def record_answer(self, token, answer):
+        self.backend.push(f"{self._key(token)}:answers", answer, ttl=self.ttl)
+
+    def record_answers(self, token, answers):
+        self.backend.extend(f"{self._key(token)}:answers", answers, ttl=self.ttl)
+
+    def load(self, token):
+        """
+        Return (quiz, answers) for a token, or None if there is no such quiz
+        """
+        quiz = self.backend.get(self._key(token))
+        if quiz is None:
+            return None
+        return quiz, self.backend.range(f"{self._key(token)}:answers")
+
+    def delete(self, token):
+        self.backend.delete(self._key(token))
+        self.backend.delete(f"{self._key(token)}:answers")
@@ -0,0 +1,59 @@
+import os
+import re
+import sys
+
+import pytest
+
+# The app's modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generation import FakeLLM  # noqa: E402
+from questions import Question  # noqa: E402
+
+
+def make_question(i, answer=None):
+    """
+    A generated [question, A, B, C, D, answer, explanation] list
+    """
+    return [
+        f"Question {i} about recursion?", f"a{i}", f"b{i}", f"c{i}", f"d{i}", answer or "ABCD"[i % 4], f"Because {i}"
+    ]
+
+
+@pytest.fixture
+def questions():
+    return [Question.from_list(make_question(i)) for i in range(5)]
+
+
+class FakeClock:
+    """
+    Stand-in for the time module whose time only moves when told to
+    """
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class RecordingLLM(FakeLLM):
+    """
+    Fake chat model that remembers the difficulty of every generation request, and
+    fails the requests for the difficulties in fail
+    """
+
+    def __init__(self, fail=()):
+        super().__init__()
+        self.difficulties = []
+        self.fail = set(fail)
+
+    def invoke(self, messages):
+        difficulty = re.search(r"with (\w+) difficulty", messages[-1].content).group(1)
+        self.difficulties.append(difficulty)
+        if difficulty in self.fail:
+            raise RuntimeError("model unavailable")
+        return super().invoke(messages)
@@ -0,0 +1,95 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from adaptive_quiz import LookaheadQuiz, new_adaptive_plan
+from conftest import RecordingLLM, make_question
+from questions import Question
+from state_backend import MemoryBackend, QuestionPool
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        yield executor
+
+
+@pytest.fixture
+def pool():
+    return QuestionPool(MemoryBackend())
+
+
+def first_question():
+    return [Question.from_list(make_question(0))]
+
+
+def test_candidates_either_side_are_prefetched(executor):
+    llm = RecordingLLM()
+    quiz = LookaheadQuiz(new_adaptive_plan("Graphs", "Medium", 3))
+    assert quiz.top_up(executor, llm, first_question(), []) == []
+    index, futures = quiz.candidates
+    assert index == 1
+    assert sorted(futures) == ["Easy", "Hard"]
+
+
+@pytest.mark.parametrize("correct, served", [(True, "Hard"), (False, "Easy")])
+def test_answer_picks_the_candidate(executor, pool, correct, served):
+    llm = RecordingLLM()
+    quiz = LookaheadQuiz(new_adaptive_plan("Graphs", "Medium", 3), pool)
+    questions = first_question()
+    quiz.top_up(executor, llm, questions, [])
+
+    question, = quiz.top_up(executor, llm, questions, [correct], wait=True)
+    assert f"({served})" in question.text
+    assert quiz.plan["difficulty"] == served
+    assert quiz.plan["difficulties"] == ["Medium", served]
+    # Candidates for the third question are on their way
+    assert quiz.candidates[0] == 2
+
+    # The other candidate went to the pool
+    executor.shutdown(wait=True)
+    unused = "Easy" if served == "Hard" else "Hard"
+    assert f"({unused})" in pool.take("Graphs", unused)[0]
+
+
+def test_pooled_candidates_skip_the_llm(executor, pool):
+    for difficulty in ("Easy", "Hard"):
+        pool.put("Graphs", difficulty, make_question(1 if difficulty == "Easy" else 2))
+    llm = RecordingLLM()
+    quiz = LookaheadQuiz(new_adaptive_plan("Graphs", "Medium", 2), pool)
+    questions = first_question()
+    quiz.top_up(executor, llm, questions, [])
+    question, = quiz.top_up(executor, llm, questions, [True], wait=True)
+    assert question.to_list() == make_question(2)
+    assert llm.difficulties == []
+
+
+def test_failed_candidate_falls_back_to_the_other(executor):
+    llm = RecordingLLM(fail=["Hard"])
+    quiz = LookaheadQuiz(new_adaptive_plan("Graphs", "Medium", 3))
+    questions = first_question()
+    quiz.top_up(executor, llm, questions, [])
+    question, = quiz.top_up(executor, llm, questions, [True], wait=True)
+    assert "(Easy)" in question.text
+    assert quiz.failures == 0
+
+
+def test_unanswered_question_serves_nothing(executor):
+    llm = RecordingLLM()
+    quiz = LookaheadQuiz(new_adaptive_plan("Graphs", "Medium", 3))
+    questions = first_question()
+    quiz.top_up(executor, llm, questions, [])
+    candidates = quiz.candidates
+    assert quiz.top_up(executor, llm, questions, [], wait=True) == []
+    assert quiz.candidates is candidates
+
+
+def test_nothing_is_prefetched_past_the_target(executor):
+    llm = RecordingLLM()
+    quiz = LookaheadQuiz(new_adaptive_plan("Graphs", "Medium", 2))
+    questions = first_question()
+    quiz.top_up(executor, llm, questions, [])
+    questions += quiz.top_up(executor, llm, questions, [True], wait=True)
+    assert len(questions) == 2
+    assert quiz.candidates is None
+    assert quiz.top_up(executor, llm, questions, [True, False], wait=True) == []
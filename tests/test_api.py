@@ -0,0 +1,190 @@
+import pytest
+
+pytest.importorskip("httpx")
+
+from starlette.testclient import TestClient  # noqa: E402
+
+from api import create_app  # noqa: E402
+from generation import FakeLLM  # noqa: E402
+from review import ReviewQueue  # noqa: E402
+from search_index import QuestionIndex  # noqa: E402
+from state_backend import MemoryBackend  # noqa: E402
+from usage_ledger import UsageLedger  # noqa: E402
+
+API_KEY = "test-key"
+AUTH = {"Authorization": f"Bearer {API_KEY}"}
+
+
+@pytest.fixture
+def backend():
+    return MemoryBackend()
+
+
+@pytest.fixture
+def review_queue(tmp_path):
+    return ReviewQueue(str(tmp_path / "review.sqlite3"))
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return UsageLedger(str(tmp_path / "usage.sqlite3"))
+
+
+@pytest.fixture
+def client(tmp_path, backend, review_queue, ledger):
+    app = create_app(
+        llm=FakeLLM(), backend=backend, usage_ledger=ledger, review_queue=review_queue,
+        question_index=QuestionIndex(str(tmp_path / "search.sqlite3")), api_key=API_KEY
+    )
+    with TestClient(app) as client:
+        yield client
+
+
+def generate(client, **body):
+    response = client.post("/quizzes", json={"topic": "Binary trees", "num_questions": 4, **body}, headers=AUTH)
+    assert response.status_code == 201, response.json()
+    return response.json()
+
+
+def test_requires_api_key(client):
+    assert client.get("/health").status_code == 200
+    assert client.post("/quizzes", json={"topic": "Trees"}).status_code == 401
+    wrong_key = {"Authorization": "Bearer wrong"}
+    assert client.post("/quizzes", json={"topic": "Trees"}, headers=wrong_key).status_code == 401
+    assert client.get("/users/u1/analytics", headers={"Authorization": API_KEY}).status_code == 401
+
+
+def test_refuses_to_start_without_a_key(monkeypatch, tmp_path, backend, review_queue, ledger):
+    monkeypatch.delenv("MCQ_API_KEY", raising=False)
+    monkeypatch.setattr("api.load_dotenv", lambda: None)
+    app = create_app(
+        llm=FakeLLM(), backend=backend, usage_ledger=ledger, review_queue=review_queue,
+        question_index=QuestionIndex(str(tmp_path / "search.sqlite3"))
+    )
+    with pytest.raises(RuntimeError, match="MCQ_API_KEY"):
+        with TestClient(app):
+            pass
+
+
+def test_generate_hides_answers_unless_asked(client):
+    quiz = generate(client)
+    assert quiz["difficulty"] == "Medium"
+    assert len(quiz["questions"]) == 4
+    assert set(quiz["questions"][0]["options"]) == {"A", "B", "C", "D"}
+    assert "answer" not in quiz["questions"][0]
+    assert "answer" in generate(client, include_answers=True)["questions"][0]
+
+
+@pytest.mark.parametrize("body, message", [
+    ({"topic": ""}, "'topic' is required"),
+    ({"topic": "Trees", "difficulty": "Impossible"}, "'difficulty'"),
+    ({"topic": "Trees", "num_questions": 50}, "between 1 and"),
+    ({"topic": "Trees", "num_questions": "many"}, "must be a number"),
+])
+def test_generate_validates_input(client, body, message):
+    response = client.post("/quizzes", json=body, headers=AUTH)
+    assert response.status_code == 400
+    assert message in response.json()["error"]
+
+
+def test_invalid_json(client):
+    response = client.post("/quizzes", content=b"not json", headers=AUTH)
+    assert response.status_code == 400
+    assert client.post("/quizzes", json=["a list"], headers=AUTH).status_code == 400
+
+
+def test_submit_answers_grades_and_records(client, backend, review_queue):
+    quiz = generate(client, include_answers=True)
+    answers = [question["answer"] for question in quiz["questions"]]
+    answers[0] = None
+    response = client.post(
+        f"/quizzes/{quiz['quiz_id']}/answers", json={"user_id": "u1", "answers": answers}, headers=AUTH
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["score"], result["total"]) == (3, 4)
+    assert result["next_difficulty"] in ("Easy", "Medium", "Hard")
+    assert result["question_details"][1]["explanation"]
+
+    # Results are kept in the API's own namespace, never in an app session
+    assert len(backend.range("api:user:u1:history")) == 1
+    assert backend.range("session:u1:history") == []
+    assert review_queue.due_count("api:user:u1") == 1
+    assert review_queue.due_count("u1") == 0
+
+    analytics = client.get("/users/u1/analytics", headers=AUTH).json()
+    assert analytics["total_quizzes"] == 1
+    assert analytics["by_topic"]["Binary trees"]["score"] == 3
+
+
+@pytest.mark.parametrize("body, status", [
+    ({"answers": ["A", "B", "C", "D"]}, 400),
+    ({"user_id": "u1", "answers": ["A"]}, 400),
+    ({"user_id": "u1", "answers": ["A", "B", "C", "E"]}, 400),
+])
+def test_submit_answers_validates_input(client, body, status):
+    quiz = generate(client)
+    assert client.post(f"/quizzes/{quiz['quiz_id']}/answers", json=body, headers=AUTH).status_code == status
+
+
+def test_unknown_quiz(client):
+    response = client.post("/quizzes/unknown/answers", json={"user_id": "u1", "answers": []}, headers=AUTH)
+    assert response.status_code == 404
+
+
+def test_search_questions_and_quiz(client):
+    generate(client)
+    results = client.get("/questions/search", params={"q": "binary question"}, headers=AUTH).json()["results"]
+    assert len(results) == 4
+    assert "answer" not in results[0]
+    assert client.get("/questions/search", headers=AUTH).status_code == 400
+
+    response = client.post("/quizzes/search", json={"query": "binary", "num_questions": 2}, headers=AUTH)
+    assert response.status_code == 201
+    quiz = response.json()
+    assert quiz["topic"] == "Search: binary"
+    # Search results have no single difficulty to adapt from
+    assert quiz["difficulty"] == "Mixed"
+    assert len(quiz["questions"]) == 2
+    assert client.post("/quizzes/search", json={"query": "nothing matches"}, headers=AUTH).status_code == 404
+
+
+def test_usage_and_quota(tmp_path, backend, review_queue):
+    ledger = UsageLedger(str(tmp_path / "usage.sqlite3"), user_daily_tokens=1)
+    app = create_app(
+        llm=FakeLLM(), backend=backend, usage_ledger=ledger, review_queue=review_queue,
+        question_index=QuestionIndex(str(tmp_path / "search.sqlite3")), api_key=API_KEY
+    )
+    with TestClient(app) as client:
+        generate(client, user_id="u1")
+        response = client.post("/quizzes", json={"topic": "Graphs", "user_id": "u1"}, headers=AUTH)
+        assert response.status_code == 429
+        usage = client.get("/users/u1/usage", headers=AUTH).json()
+        assert usage["llm_calls"] == 1
+        assert usage["daily_limit"] == 1
+        # Another user has their own quota
+        generate(client, user_id="u2")
+
+
+def test_review_quiz_serves_missed_questions(client, review_queue):
+    assert client.post("/users/u1/review", json={}, headers=AUTH).status_code == 404
+    quiz = generate(client, include_answers=True)
+    answers = [question["answer"] for question in quiz["questions"]]
+    missed = quiz["questions"][1]["question"]
+    answers[1] = None
+    client.post(f"/quizzes/{quiz['quiz_id']}/answers", json={"user_id": "u1", "answers": answers}, headers=AUTH)
+
+    response = client.post("/users/u1/review", json={"num_questions": 3}, headers=AUTH)
+    assert response.status_code == 201
+    review = response.json()
+    assert [question["question"] for question in review["questions"]] == [missed]
+    # Another user has no reviews due
+    assert client.post("/users/u2/review", json={}, headers=AUTH).status_code == 404
+
+    # Answering it right reschedules the card
+    review_answer = quiz["questions"][1]["answer"]
+    response = client.post(
+        f"/quizzes/{review['quiz_id']}/answers", json={"user_id": "u1", "answers": [review_answer]}, headers=AUTH
+    )
+    assert response.json()["next_difficulty"] is None
+    assert review_queue.due_count("api:user:u1") == 0
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import generation
+from conftest import make_question
+from state_backend import DEFAULT_BACKEND_URL, QuestionStore, QuizSnapshots, backend_from_url
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # Every test gets its own state files and shared resources, and a fake model
+    monkeypatch.chdir(tmp_path)
+    os.symlink(os.path.join(ROOT, "mcqimage.jpg"), tmp_path / "mcqimage.jpg")
+    monkeypatch.setattr(generation, "LLM_BACKEND", "fake")
+    monkeypatch.setenv("GROQ_API_KEY", "unused")
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    return AppTest.from_file(APP_PATH, default_timeout=60)
+
+
+def test_api_user_ids_are_not_app_sessions(app):
+    app.query_params["sid"] = "api:user:u1"
+    app.run()
+    assert not app.exception
+    assert not app.query_params["sid"].startswith("api:")
+
+
+def test_partially_answered_quiz_is_resumed(app):
+    questions = QuestionStore(backend_from_url(DEFAULT_BACKEND_URL)).put([make_question(i) for i in range(4)])
+    snapshots = QuizSnapshots(backend_from_url(DEFAULT_BACKEND_URL))
+    snapshots.save("token", {
+        "total": 4, "topic": "Recursion", "difficulty_level": "Hard", "num_questions": 4,
+        "question_ids": [q.id for q in questions],
+    })
+    answers = [questions[0].answer, "D" if questions[1].answer != "D" else "A"]
+    snapshots.record_answers("token", answers)
+
+    app.query_params["quiz"] = "token"
+    app.run()
+    assert not app.exception
+    state = app.session_state
+    assert [q.id for q in state.questions] == [q.id for q in questions]
+    assert (state.answers, state.feedback, state.score) == (answers, [True, False], 1)
+    assert (state.current_question, state.done) == (2, False)
+    assert (state.quiz_topic, state.difficulty_level) == ("Recursion", "Hard")
+    assert app.query_params["quiz"] == "token"
+
+
+def test_unknown_resume_token_is_dropped(app):
+    app.query_params["quiz"] = "expired"
+    app.run()
+    assert not app.exception
+    assert "quiz" not in app.query_params
+    assert not app.session_state.questions
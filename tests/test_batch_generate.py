@@ -0,0 +1,130 @@
+import json
+
+import pytest
+
+import generation
+from batch_generate import ManifestError, OutputError, completed_jobs, iter_manifest, job_id, main, run_batch
+
+
+def write_lines(path, lines):
+    path.write_text("".join(line + "\n" for line in lines), encoding="utf-8")
+
+
+def test_completed_jobs_of_missing_output(tmp_path):
+    assert completed_jobs(str(tmp_path / "quizzes.jsonl")) == set()
+
+
+def test_completed_jobs_truncates_a_cut_off_line(tmp_path):
+    output = tmp_path / "quizzes.jsonl"
+    complete = json.dumps({"id": "a", "questions": []}) + "\n" + json.dumps({"id": "b", "questions": []}) + "\n"
+    output.write_bytes(complete.encode() + b'{"id": "c", "quest')
+    assert completed_jobs(str(output)) == {"a", "b"}
+    assert output.read_bytes() == complete.encode()
+
+
+def test_completed_jobs_stops_at_an_invalid_line(tmp_path):
+    output = tmp_path / "quizzes.jsonl"
+    output.write_bytes(b'{"id": "a"}\nnot json\n{"id": "b"}\n')
+    assert completed_jobs(str(output)) == {"a"}
+    assert output.read_bytes() == b'{"id": "a"}\n'
+
+
+@pytest.mark.parametrize("line", ['{"questions": []}', '["a"]'])
+def test_completed_jobs_rejects_a_line_without_id(tmp_path, line):
+    output = tmp_path / "quizzes.jsonl"
+    output.write_text('{"id": "a"}\n' + line + "\n")
+    with pytest.raises(OutputError, match="line 2: not a generated quiz"):
+        completed_jobs(str(output))
+
+
+def test_iter_manifest_jsonl(tmp_path):
+    manifest = tmp_path / "manifest.jsonl"
+    write_lines(manifest, [
+        '{"topic": " Photosynthesis ", "difficulty": "easy", "num_questions": 3}',
+        "",
+        '{"topic": "Graphs", "id": "graphs"}',
+    ])
+    first, second = iter_manifest(str(manifest))
+    assert (first["topic"], first["difficulty"], first["num_questions"]) == ("Photosynthesis", "Easy", 3)
+    assert (second["id"], second["difficulty"], second["num_questions"]) == ("graphs", "Medium", 5)
+
+
+def test_iter_manifest_csv(tmp_path):
+    manifest = tmp_path / "manifest.csv"
+    write_lines(manifest, ["topic,difficulty,num_questions", "Graphs,Hard,2"])
+    job, = iter_manifest(str(manifest))
+    assert (job["topic"], job["difficulty"], job["num_questions"]) == ("Graphs", "Hard", 2)
+
+
+@pytest.mark.parametrize("line, message", [
+    ('{"difficulty": "Easy"}', "Line 1: missing topic"),
+    ('{"topic": "Graphs", "difficulty": "Expert"}', "Line 1: difficulty"),
+    ('{"topic": "Graphs", "num_questions": "x"}', "Line 1: num_questions must be a number"),
+    ('{"topic": "Graphs", "num_questions": -1}', "Line 1: num_questions must be positive"),
+    ("not json", "Line 1: not valid JSON"),
+    ('["Graphs", "Easy"]', "Line 1: expected a JSON object"),
+])
+def test_iter_manifest_rejects_invalid_entries(tmp_path, line, message):
+    manifest = tmp_path / "manifest.jsonl"
+    write_lines(manifest, [line])
+    with pytest.raises(ManifestError, match=message):
+        list(iter_manifest(str(manifest)))
+
+
+def test_job_id_depends_on_the_entry_not_its_line(tmp_path):
+    entry = {"topic": "Graphs", "difficulty": "Easy", "num_questions": 5}
+    assert job_id(entry) == job_id(dict(entry))
+    assert job_id(entry) != job_id({**entry, "num_questions": 6})
+    assert job_id({**entry, "id": 7}) == "7"
+
+    manifest = tmp_path / "manifest.jsonl"
+    graphs = '{"topic": "Graphs", "difficulty": "Easy"}'
+    write_lines(manifest, [graphs, '{"topic": "Sorting"}', graphs])
+    ids = [job["id"] for job in iter_manifest(str(manifest))]
+    # Identical entries are separate jobs
+    assert len(set(ids)) == 3
+    # Editing other lines keeps the ids
+    write_lines(manifest, ['{"topic": "Trees"}', graphs, graphs])
+    edited = [job["id"] for job in iter_manifest(str(manifest))]
+    assert edited[1:] == [ids[0], ids[2]]
+
+
+def test_run_batch_skips_finished_jobs(tmp_path, monkeypatch):
+    # Worker processes create the fake model, whether forked or started afresh
+    monkeypatch.setattr(generation, "LLM_BACKEND", "fake")
+    monkeypatch.setenv("MCQ_LLM_BACKEND", "fake")
+    monkeypatch.chdir(tmp_path)
+    manifest = tmp_path / "manifest.jsonl"
+    output = tmp_path / "quizzes.jsonl"
+    write_lines(manifest, [
+        '{"topic": "Graphs", "id": "graphs", "num_questions": 2}',
+        '{"topic": "Sorting", "id": "sorting", "num_questions": 3}',
+    ])
+    output.write_text(json.dumps({"id": "graphs", "questions": []}) + "\n")
+
+    generated, failed = run_batch(str(manifest), str(output), "unused", workers=1, rate=0, log=lambda message: None)
+    assert (generated, failed) == (1, 0)
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [record["id"] for record in records] == ["graphs", "sorting"]
+    assert len(records[1]["questions"]) == 3
+
+    assert run_batch(str(manifest), str(output), "unused", workers=1, rate=0, log=lambda message: None) == (0, 0)
+
+
+def test_fake_backend_needs_no_api_key(tmp_path, monkeypatch):
+    monkeypatch.setattr(generation, "LLM_BACKEND", "fake")
+    monkeypatch.setenv("MCQ_LLM_BACKEND", "fake")
+    monkeypatch.delenv("GROQ_API_KEY", raising=False)
+    monkeypatch.setattr("batch_generate.load_dotenv", lambda: None)
+    monkeypatch.chdir(tmp_path)
+    write_lines(tmp_path / "manifest.jsonl", ['{"topic": "Graphs", "num_questions": 2}'])
+    assert main(["manifest.jsonl", "-o", "quizzes.jsonl", "--workers", "1", "--rate", "0"]) == 0
+    assert len((tmp_path / "quizzes.jsonl").read_text().splitlines()) == 1
+
+
+def test_real_backend_requires_an_api_key(monkeypatch):
+    monkeypatch.setattr(generation, "LLM_BACKEND", "groq")
+    monkeypatch.delenv("GROQ_API_KEY", raising=False)
+    monkeypatch.setattr("batch_generate.load_dotenv", lambda: None)
+    with pytest.raises(SystemExit):
+        main(["manifest.jsonl"])
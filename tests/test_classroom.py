@@ -0,0 +1,79 @@
+import pytest
+
+import classroom
+from classroom import Classroom, class_summary, new_class_plan, normalize_code
+from conftest import FakeClock
+from state_backend import MemoryBackend, QuestionStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(classroom, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def room():
+    backend = MemoryBackend()
+    return Classroom(backend, QuestionStore(backend))
+
+
+def test_published_quiz_is_served_by_code(room, questions):
+    code = room.publish(questions, "Recursion", "Easy", "teacher")
+    assert len(code) == classroom.JOIN_CODE_LENGTH
+    quiz, served = room.load(f" {code[:3].lower()} {code[3:]} ")
+    assert [q.id for q in served] == [q.id for q in questions]
+    plan = new_class_plan(code, quiz, "s1")
+    assert (plan["topic"], plan["target"], plan["kind"]) == ("Recursion", 5, "class")
+    assert room.load("NOCODE") is None
+
+
+def test_normalize_code():
+    assert normalize_code(" ab c\tde ") == "ABCDE"
+    assert normalize_code(None) == ""
+
+
+def test_class_summary_aggregates_latest_results(room, questions, clock):
+    questions = questions[:2]
+    code = room.publish(questions, "Recursion", "Easy", "teacher")
+    right = [q.answer for q in questions]
+    wrong = ["D" if answer != "D" else "A" for answer in right]
+    for student in ("s1", "s2", "s3"):
+        room.record_join(code, student, student.upper())
+    room.record_result(code, "s1", "S1", [right[0], wrong[1]], 1)
+    clock.advance(10)
+    room.record_result(code, "s2", "S2", right, 2)
+    clock.advance(10)
+    # s1 takes the quiz again; only the latest attempt counts
+    room.record_result(code, "s1", "S1", right, 2)
+
+    summary = class_summary(questions, *room.activity(code))
+    assert (summary["joined"], summary["finished"]) == (3, 2)
+    assert summary["average_accuracy"] == 1.0
+    # Equal scores are listed by who finished first
+    assert [s["student"] for s in summary["students"]] == ["S2", "S1"]
+    first, second = summary["questions"]
+    assert (first["number"], first["correct"], first[f"pct_{right[0]}"]) == (1, 1.0, 1.0)
+    assert second["correct"] == 1.0
+
+
+def test_class_summary_per_question_shares(questions):
+    questions = questions[:2]
+    results = [
+        {"id": "s1", "name": "S1", "answers": [questions[0].answer, None], "score": 1, "time": 1},
+        {"id": "s2", "name": "S2", "answers": ["C", questions[1].answer], "score": 1, "time": 2},
+    ]
+    summary = class_summary(questions, [], results)
+    assert summary["joined"] == 2
+    assert summary["average_accuracy"] == 0.5
+    assert [s["accuracy"] for s in summary["students"]] == [0.5, 0.5]
+    first, second = summary["questions"]
+    assert (first["correct"], first["pct_C"]) == (0.5, 0.5)
+    assert (second["correct"], second[f"pct_{questions[1].answer}"]) == (0.5, 0.5)
+
+
+def test_empty_class_summary(questions):
+    summary = class_summary(questions, [{"id": "s1", "name": "S1"}], [])
+    assert (summary["joined"], summary["finished"], summary["average_accuracy"]) == (1, 0, 0.0)
+    assert summary["questions"][0]["correct"] == 0.0
@@ -0,0 +1,141 @@
+import io
+import json
+import os
+
+import pytest
+
+import data_transfer
+from conftest import make_question
+from data_transfer import (
+    SCHEMA_VERSION, SchemaError, checkpoint_path, detect_format, export_records, import_records, migrate_record,
+    question_to_record, record_to_question
+)
+
+
+def history_record(i):
+    return {
+        "timestamp": f"2024-01-01 00:00:{i % 60:02d}",
+        "topic": "Recursion",
+        "difficulty": "Easy",
+        "score": 1,
+        "total": 2,
+        "accuracy": 0.5,
+        "question_details": [
+            {"question_number": 1, "question_id": "q1", "question_text": "Q1", "correct_answer": "A", "user_answer": "A",
+             "is_correct": True},
+            {"question_number": 2, "question_id": "q2", "question_text": "Q2", "correct_answer": "B", "user_answer": None,
+             "is_correct": False},
+        ],
+    }
+
+
+def export(records, kind, fmt="jsonl", chunk_size=10):
+    fp = io.BytesIO()
+    export_records(records, fp, kind, fmt, chunk_size)
+    fp.seek(0)
+    return fp
+
+
+def collect(fp, kind, fmt="jsonl", **kwargs):
+    records = []
+    count = import_records(fp, kind, records.extend, fmt, **kwargs)
+    assert count == len(records)
+    return records
+
+
+@pytest.fixture(params=["jsonl", "parquet"])
+def fmt(request):
+    if request.param == "parquet":
+        pytest.importorskip("pyarrow")
+    return request.param
+
+
+def test_history_round_trip(fmt):
+    records = [history_record(i) for i in range(25)]
+    assert collect(export(records, "history", fmt), "history", fmt) == records
+
+
+def test_questions_round_trip(fmt):
+    questions = [make_question(i) for i in range(25)]
+    records = [question_to_record(q, "Recursion", "Easy") for q in questions]
+    imported = collect(export(records, "questions", fmt), "questions", fmt)
+    assert imported == records
+    assert [record_to_question(r) for r in imported] == questions
+
+
+def test_wrong_kind_is_rejected(fmt):
+    fp = export([history_record(0)], "history", fmt)
+    with pytest.raises(SchemaError):
+        collect(fp, "questions", fmt)
+
+
+def test_not_an_export_is_rejected():
+    with pytest.raises(SchemaError):
+        collect(io.BytesIO(b'{"hello": "world"}\n'), "history")
+
+
+def test_newer_version_is_rejected():
+    header = {"schema": data_transfer.SCHEMA_NAME, "version": SCHEMA_VERSION + 1, "kind": "history"}
+    with pytest.raises(SchemaError, match="newer"):
+        collect(io.BytesIO((json.dumps(header) + "\n").encode()), "history")
+
+
+def test_migrate_record_current_version_is_unchanged():
+    assert migrate_record({"a": 1}, SCHEMA_VERSION) == {"a": 1}
+
+
+def test_migrate_record_without_migration_is_unsupported():
+    with pytest.raises(SchemaError, match="Unsupported export format version 0"):
+        migrate_record({"a": 1}, 0)
+
+
+def test_migrate_record_applies_migrations_in_order(monkeypatch):
+    monkeypatch.setattr(data_transfer, "SCHEMA_VERSION", 3)
+    monkeypatch.setattr(data_transfer, "MIGRATIONS", {
+        1: lambda record: {**record, "steps": record["steps"] + [2]},
+        2: lambda record: {**record, "steps": record["steps"] + [3]},
+    })
+    assert migrate_record({"steps": [1]}, 1) == {"steps": [1, 2, 3]}
+
+
+def test_interrupted_import_resumes_from_checkpoint(fmt, tmp_path):
+    records = [history_record(i) for i in range(25)]
+    fp = export(records, "history", fmt)
+    checkpoint = checkpoint_path(fp, "session", "history", checkpoint_dir=str(tmp_path))
+    imported = []
+
+    def failing_sink(chunk):
+        if imported:
+            raise RuntimeError("interrupted")
+        imported.extend(chunk)
+
+    with pytest.raises(RuntimeError):
+        import_records(fp, "history", failing_sink, fmt, checkpoint=checkpoint, chunk_size=10)
+    assert os.path.exists(checkpoint)
+
+    # Uploading the same file again gives the same checkpoint and continues after the first chunk
+    assert checkpoint_path(fp, "session", "history", checkpoint_dir=str(tmp_path)) == checkpoint
+    assert import_records(fp, "history", imported.extend, fmt, checkpoint=checkpoint, chunk_size=10) == 15
+    assert imported == records
+    assert not os.path.exists(checkpoint)
+
+
+def test_checkpoint_path_depends_on_scope_and_content(tmp_path):
+    fp = export([history_record(0)], "history")
+    other = export([history_record(1)], "history")
+    path = checkpoint_path(fp, "session", "history", checkpoint_dir=str(tmp_path))
+    assert path != checkpoint_path(fp, "other session", "history", checkpoint_dir=str(tmp_path))
+    assert path != checkpoint_path(other, "session", "history", checkpoint_dir=str(tmp_path))
+
+
+def test_checkpoint_of_another_kind_is_rejected(tmp_path):
+    checkpoint = tmp_path / "checkpoint.json"
+    checkpoint.write_text(json.dumps({"kind": "questions", "format": "jsonl", "position": 0}))
+    with pytest.raises(SchemaError):
+        collect(export([history_record(0)], "history"), "history", checkpoint=str(checkpoint))
+
+
+def test_detect_format():
+    assert detect_format("history.parquet") == "parquet"
+    assert detect_format("history.PQ") == "parquet"
+    assert detect_format("history.jsonl") == "jsonl"
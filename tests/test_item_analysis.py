@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from conftest import make_question
+from item_analysis import AnswerTable, item_statistics
+from questions import Question
+
+pytest.importorskip("pandas")
+
+
+@pytest.fixture
+def table():
+    table = AnswerTable(capacity=2)
+    table.add_quiz("Recursion", ["q1", "q2", "q3"], ["A", "B", "C"], ["A", "C", "C"])
+    table.add_quiz("recursion ", ["q1", "q2", "q3"], ["B", "C", "D"], ["A", "C", "C"])
+    table.add_quiz("Recursion", ["q1", "q2"], ["A", None], ["A", "C"])
+    return table
+
+
+def test_table_grows_and_interns(table):
+    assert len(table) == 8
+    assert table.num_quizzes == 3
+    assert table.question_ids == ["q1", "q2", "q3"]
+    assert table.topics == ["Recursion"]
+    assert table.columns()[5].tolist() == [True, False, True, False, True, False, True, False]
+
+
+def test_same_question_id_under_another_topic_is_another_item(table):
+    table.add_quiz("Sorting", ["q1"], ["A"], ["A"])
+    assert table.question_ids == ["q1", "q2", "q3", "q1"]
+    assert table.topics == ["Recursion", "Sorting"]
+
+
+def test_item_statistics(table):
+    stats = item_statistics(table).set_index("question_id")
+    assert stats["attempts"].tolist() == [3, 3, 2]
+    assert stats["p_value"].tolist() == pytest.approx([2 / 3, 1 / 3, 1 / 2])
+    assert stats["correct_answer"].tolist() == ["A", "C", "C"]
+    assert stats.loc["q1", ["pct_A", "pct_B", "pct_C", "pct_D"]].tolist() == pytest.approx([2 / 3, 1 / 3, 0, 0])
+    # Unanswered questions don't count towards option frequencies
+    assert stats.loc["q2", ["pct_B", "pct_C"]].tolist() == pytest.approx([0.5, 0.5])
+    assert stats["top_distractor"].tolist() == ["B", "B", "D"]
+    assert (stats["topic"] == "Recursion").all()
+
+
+def test_discrimination_is_point_biserial_with_rest_score(table):
+    stats = item_statistics(table).set_index("question_id")
+    # q1 against the accuracy on the rest of each quiz: (0 + 1) / 2, (1 + 0) / 2 and 0 / 1
+    expected = np.corrcoef([1, 0, 1], [0.5, 0.5, 0.0])[0, 1]
+    assert stats.loc["q1", "discrimination"] == pytest.approx(expected)
+
+
+def test_discrimination_undefined_without_variance():
+    table = AnswerTable()
+    table.add_quiz("Recursion", ["q1", "q2"], ["A", "A"], ["A", "B"])
+    table.add_quiz("Recursion", ["q1", "q2"], ["A", "B"], ["A", "B"])
+    stats = item_statistics(table).set_index("question_id")
+    assert np.isnan(stats.loc["q1", "discrimination"])
+    # Nobody picked a wrong option
+    assert stats.loc["q1", "top_distractor"] == ""
+
+
+def test_question_texts():
+    question = Question.from_list(make_question(0))
+    table = AnswerTable()
+    table.add_quiz("Recursion", [question.id, "unknown"], ["A", "A"], [question.answer, "B"])
+    stats = item_statistics(table, [question, None])
+    assert stats["question_text"].tolist() == [question.text, ""]
+
+
+def test_empty_table():
+    stats = item_statistics(AnswerTable())
+    assert stats.empty
+    assert "discrimination" in stats.columns
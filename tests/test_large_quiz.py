@@ -0,0 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import RecordingLLM, make_question
+from large_quiz import MAX_FAILURES, ProgressiveQuiz, new_plan
+from questions import Question
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        yield executor
+
+
+def first_batch(size):
+    return [Question.from_list(make_question(i)) for i in range(size)]
+
+
+@pytest.mark.parametrize("feedback, difficulty", [
+    ([], "Medium"),
+    ([True] * 4, "Hard"),
+    ([True, False, True, False], "Medium"),
+    ([False] * 4, "Easy"),
+    # Only the most recent batch of answers counts
+    ([False] * 4 + [True] * 4, "Hard"),
+])
+def test_difficulty_follows_recent_accuracy(feedback, difficulty):
+    quiz = ProgressiveQuiz(new_plan("Graphs", "Medium", 20, batch_size=4))
+    assert quiz.next_difficulty(feedback) == difficulty
+
+
+def test_batch_is_requested_when_questions_run_low(executor):
+    llm = RecordingLLM()
+    quiz = ProgressiveQuiz(new_plan("Graphs", "Medium", 10, batch_size=3))
+    questions = first_batch(5)
+    # Five unanswered questions: more than a batch is left
+    assert quiz.top_up(executor, llm, questions, []) == []
+    assert quiz.pending is None
+
+    feedback = [True, True, True]
+    assert quiz.top_up(executor, llm, questions, feedback) == []
+    assert quiz.pending is not None
+    new_questions = quiz.top_up(executor, llm, questions, feedback, wait=True)
+    assert len(new_questions) == 3
+    # Every answer so far was right, so the batch is harder
+    assert llm.difficulties == ["Hard"]
+    assert all("(Hard)" in q.text for q in new_questions)
+    assert quiz.plan["batches"] == 1
+
+
+def test_last_batch_stops_at_the_target(executor):
+    llm = RecordingLLM()
+    quiz = ProgressiveQuiz(new_plan("Graphs", "Medium", 7, batch_size=3))
+    questions = first_batch(5)
+    feedback = [False] * 5
+    quiz.top_up(executor, llm, questions, feedback)
+    questions += quiz.top_up(executor, llm, questions, feedback, wait=True)
+    assert len(questions) == 7
+    assert llm.difficulties == ["Easy"]
+    assert quiz.pending is None
+
+
+def test_generation_stops_after_repeated_failures(executor):
+    llm = RecordingLLM(fail=["Medium"])
+    quiz = ProgressiveQuiz(new_plan("Graphs", "Medium", 20, batch_size=3))
+    questions = first_batch(2)
+    for _ in range(MAX_FAILURES + 1):
+        assert quiz.top_up(executor, llm, questions, [], wait=True) == []
+    assert quiz.exhausted
+    assert len(llm.difficulties) == MAX_FAILURES
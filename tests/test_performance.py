@@ -0,0 +1,40 @@
+import io
+
+from conftest import make_question
+from data_transfer import export_records, import_records
+from performance import compact_record, expanded_record, performance_record, question_details
+from questions import Question
+
+
+def test_history_export_and_import_keep_question_ids(questions):
+    record = performance_record("Recursion", 1, 2, "Easy", questions[:2], ["A", "C"])
+    stored = questions[:2]
+    fp = io.BytesIO()
+    export_records([expanded_record(record, stored)], fp, "history")
+    fp.seek(0)
+    imported = []
+    import_records(fp, "history", imported.extend)
+
+    compact = compact_record(imported[0])
+    assert compact["question_ids"] == record["question_ids"]
+    assert (compact["answers"], compact["correct_answers"]) == (record["answers"], record["correct_answers"])
+    # The texts are kept for questions this store does not have
+    assert [d["question_text"] for d in question_details(compact, [None, None])] == [q.text for q in stored]
+
+
+def test_details_without_ids_get_stable_legacy_ids():
+    question = Question.from_list(make_question(1))
+    legacy = {
+        "topic": "Recursion", "difficulty": "Easy", "score": 1, "total": 1, "accuracy": 1.0,
+        "question_details": [{"question_number": 1, "question_text": question.text,
+                              "correct_answer": question.answer, "user_answer": question.answer,
+                              "is_correct": True}],
+    }
+    first, second = compact_record(dict(legacy)), compact_record(dict(legacy))
+    assert first["question_ids"] == second["question_ids"]
+    assert first["question_ids"] != [question.id]
+
+
+def test_compact_record_is_unchanged(questions):
+    record = performance_record("Recursion", 0, 1, "Easy", questions[:1], ["B"])
+    assert compact_record(record) is record
@@ -0,0 +1,81 @@
+import time
+from collections import Counter
+
+import pytest
+
+from profiling import APP_DIR, Profile, StackSampler, profiled
+
+
+def inner():
+    time.sleep(0.1)
+
+
+def outer():
+    inner()
+
+
+def test_sampler_records_the_call_stack():
+    sampler = StackSampler(interval=0.002).start()
+    outer()
+    profile = sampler.stop()
+    assert profile.samples > 0
+    expected = (
+        f"outer (test_profiling.py:{outer.__code__.co_firstlineno});"
+        f"inner (test_profiling.py:{inner.__code__.co_firstlineno})"
+    )
+    # Stacks run from the test runner down to the innermost frame, with a sample count
+    stack, count = profile.folded().splitlines()[0].rsplit(" ", 1)
+    assert stack.endswith(expected)
+    assert int(count) > 0
+    # The sampler's own frames are left out
+    assert "(profiling.py:" not in profile.folded()
+
+
+def test_profiled_reports_also_when_the_block_raises():
+    profiles = []
+    with pytest.raises(RuntimeError):
+        with profiled(profiles.append, label="rerun"):
+            raise RuntimeError("stop")
+    profile, = profiles
+    assert profile.label == "rerun"
+    assert profile.duration >= 0
+
+
+def frame(filename, function, line=1):
+    return (filename, function, line)
+
+
+APP = APP_DIR + "/app.py"
+GENERATION = APP_DIR + "/generation.py"
+STREAMLIT = "/site-packages/streamlit/elements/write.py"
+
+
+@pytest.fixture
+def profile():
+    stacks = Counter({
+        (frame(APP, "main", 10), frame(GENERATION, "parse_mcq_response", 20)): 3,
+        (frame(APP, "main", 10), frame(GENERATION, "request_mcqs", 30)): 5,
+        (frame(APP, "main", 10), frame(STREAMLIT, "write;now", 40)): 2,
+    })
+    return Profile(stacks, duration=1.0, interval=0.1)
+
+
+def test_folded_stacks(profile):
+    assert profile.folded() == (
+        "main (app.py:10);request_mcqs (generation.py:30) 5\n"
+        "main (app.py:10);parse_mcq_response (generation.py:20) 3\n"
+        "main (app.py:10);write,now (write.py:40) 2\n"
+    )
+
+
+def test_categories(profile):
+    assert profile.categories() == pytest.approx({
+        "generation": 0.5, "parsing": 0.3, "analytics": 0.0, "rendering": 0.2, "other": 0.0,
+    })
+
+
+def test_flame_graph_svg(profile):
+    svg = profile.flame_graph_svg()
+    assert svg.startswith("<svg")
+    assert "main (app.py:10): 10 samples, 1000 ms" in svg
+    assert "request_mcqs (generation.py:30): 5 samples, 500 ms, generation" in svg
@@ -0,0 +1,91 @@
+import io
+import os
+import threading
+
+import pytest
+
+from retrieval import build_index, document_hash, index_path, iter_chunks, load_index, load_or_build_index, tokenize
+
+DOCUMENT = " ".join(
+    f"Section {i}. " + ("Recursion needs a base case. " if i % 10 == 0 else "Sorting arranges items in order. ") * 20
+    for i in range(40)
+).encode()
+
+
+def test_tokenize_drops_stopwords_and_single_letters():
+    assert tokenize("The base-case of a Recursion") == ["base-case", "of", "recursion"]
+
+
+def test_chunks_overlap_and_survive_block_boundaries():
+    words = [f"w{i}" for i in range(25)]
+    text = " ".join(words)
+    blocks = [text[i:i + 7] for i in range(0, len(text), 7)]
+    chunks = list(iter_chunks(blocks, chunk_words=10, overlap=4))
+    assert chunks[0].split() == words[:10]
+    assert chunks[1].split() == words[6:16]
+    assert chunks[-1].split()[-1] == "w24"
+    assert all(word in words for chunk in chunks for word in chunk.split())
+
+
+def test_document_hash_rewinds():
+    fp = io.BytesIO(DOCUMENT)
+    assert document_hash(fp) == document_hash(fp)
+    assert fp.tell() == 0
+
+
+@pytest.fixture
+def index(tmp_path):
+    return load_or_build_index(io.BytesIO(DOCUMENT), "notes.txt", str(tmp_path))[1]
+
+
+def test_search_ranks_matching_chunks_first(index):
+    results = index.search("recursion base case", k=2)
+    assert len(results) == 2
+    assert all("Recursion" in chunk for chunk in results)
+
+
+def test_search_offset_gives_other_passages(index):
+    assert index.search("sorting", k=2, offset=2) != index.search("sorting", k=2)
+
+
+def test_search_without_matches_starts_at_the_beginning(index):
+    assert index.search("photosynthesis", k=1)[0].startswith("Section 0.")
+
+
+def test_index_is_built_once_and_shared(tmp_path):
+    doc_hash, index = load_or_build_index(io.BytesIO(DOCUMENT), "notes.txt", str(tmp_path))
+    modified = os.path.getmtime(os.path.join(index_path(doc_hash, str(tmp_path)), "meta.json"))
+    assert load_or_build_index(io.BytesIO(DOCUMENT), "notes.txt", str(tmp_path))[1] is index
+    assert load_index(doc_hash, str(tmp_path)) is index
+    assert os.path.getmtime(os.path.join(index_path(doc_hash, str(tmp_path)), "meta.json")) == modified
+
+
+def test_concurrent_builds_of_the_same_document(tmp_path):
+    path = index_path(document_hash(io.BytesIO(DOCUMENT)), str(tmp_path))
+    errors = []
+
+    def build():
+        try:
+            build_index(io.BytesIO(DOCUMENT), "notes.txt", path)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=build) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    # One published index and no staging directories left behind
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
+    assert load_index(os.path.basename(path), str(tmp_path)).search("recursion")
+
+
+def test_failed_build_leaves_nothing_behind(tmp_path):
+    class Unreadable(io.BytesIO):
+        def read(self, size=-1):
+            raise OSError("read error")
+
+    with pytest.raises(OSError):
+        build_index(Unreadable(), "notes.txt", str(tmp_path / "index"))
+    assert os.listdir(tmp_path) == []
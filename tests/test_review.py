@@ -0,0 +1,70 @@
+import pytest
+
+from review import CORRECT_QUALITY, INITIAL_EASE, MAX_INTERVAL_DAYS, MIN_EASE, WRONG_QUALITY, ReviewQueue, sm2
+
+DAY = 86400
+NOW = 1_700_000_000
+
+
+def test_sm2_intervals_grow_with_each_right_answer():
+    ease, interval, repetitions = INITIAL_EASE, 0, 0
+    intervals = []
+    for _ in range(4):
+        ease, interval, repetitions = sm2(ease, interval, repetitions, CORRECT_QUALITY)
+        intervals.append(interval)
+    assert intervals[:2] == [1, 6]
+    assert intervals[2] == round(6 * ease)
+    assert intervals[3] > intervals[2]
+    assert repetitions == 4
+
+
+def test_sm2_ease_unchanged_at_quality_4_and_lowered_when_wrong():
+    assert sm2(INITIAL_EASE, 0, 0, CORRECT_QUALITY)[0] == pytest.approx(INITIAL_EASE)
+    assert sm2(INITIAL_EASE, 0, 0, 5)[0] == pytest.approx(INITIAL_EASE + 0.1)
+    assert sm2(INITIAL_EASE, 0, 0, WRONG_QUALITY)[0] < INITIAL_EASE
+
+
+def test_sm2_failure_starts_over():
+    assert sm2(2.0, 30, 5, WRONG_QUALITY)[1:] == (0, 0)
+
+
+def test_sm2_bounds():
+    assert sm2(MIN_EASE, 0, 0, 0)[0] == MIN_EASE
+    assert sm2(INITIAL_EASE, MAX_INTERVAL_DAYS, 10, CORRECT_QUALITY)[1] == MAX_INTERVAL_DAYS
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return ReviewQueue(str(tmp_path / "review.sqlite3"))
+
+
+def test_only_missed_questions_are_scheduled(queue, questions):
+    answers = [q.answer for q in questions]
+    answers[1] = "A" if questions[1].answer != "A" else "B"
+    answers[3] = None
+    assert queue.record_quiz("user", questions, answers, now=NOW) == 2
+    assert queue.due_count("user", now=NOW) == 2
+    assert {q.id for q in queue.due_questions("user", 10, now=NOW)} == {questions[1].id, questions[3].id}
+    # Cards are per user
+    assert queue.due_count("other", now=NOW) == 0
+
+
+def test_right_answer_moves_card_out(queue, questions):
+    question = questions[0]
+    queue.record_quiz("user", [question], [None], now=NOW)
+    queue.record_quiz("user", [question], [question.answer], now=NOW)
+    assert queue.due_count("user", now=NOW) == 0
+    assert queue.next_due("user") == NOW + DAY
+    queue.record_quiz("user", [question], [question.answer], now=NOW + DAY)
+    assert queue.next_due("user") == NOW + 7 * DAY
+    card, = queue.cards("user")
+    assert (card["repetitions"], card["lapses"]) == (2, 1)
+
+
+def test_due_questions_are_complete_and_limited(queue, questions):
+    queue.record_quiz("user", questions, [None] * len(questions), now=NOW)
+    due = queue.due_questions("user", 3, now=NOW)
+    assert len(due) == 3
+    stored = {q.id: q.to_list() for q in questions}
+    assert all(question.to_list() == stored[question.id] for question in due)
+    assert queue.next_due("nobody") is None
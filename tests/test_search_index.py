@@ -0,0 +1,95 @@
+import pytest
+
+import search_index
+from search_index import QuestionIndex, highlight, match_expression, search_terms
+
+
+def question(text, explanation="", answer="A"):
+    return [text, "first option", "second option", "third option", "fourth option", answer, explanation]
+
+
+def test_search_terms_drop_punctuation_and_operators():
+    assert search_terms('Base-case AND "recursion"*') == ["base", "case", "and", "recursion"]
+
+
+def test_match_expression_quotes_every_word():
+    assert match_expression("recursion OR NEAR(x") == '"recursion" "or" "near" "x"'
+
+
+def test_match_expression_filters():
+    assert match_expression("tree", topic="Binary trees!", difficulty="Hard") == (
+        '"tree" topic : "binary trees" difficulty : "hard"'
+    )
+    assert match_expression("tree", topic="!!") == '"tree"'
+
+
+def test_match_expression_empty_query():
+    assert match_expression("  ?! ") is None
+
+
+def test_highlight_marks_words_and_prefixes():
+    assert highlight("Recursive recursion, not cursor", "recurs") == (
+        "<mark>Recursive</mark> <mark>recursion</mark>, not cursor"
+    )
+
+
+def test_highlight_escapes_html():
+    assert highlight("<b>tree</b> & graph", "tree") == "&lt;b&gt;<mark>tree</mark>&lt;/b&gt; &amp; graph"
+    assert highlight("<i>", "") == "&lt;i&gt;"
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = QuestionIndex(str(tmp_path / "search.sqlite3"))
+    index.add([
+        question("What is the base case of a recursive function?", "It stops the recursion"),
+        question("Which traversal visits the root of a binary tree first?", "Preorder traversal"),
+    ], "Recursion", "Easy", now=1)
+    index.add([question("How deep can a binary tree get?", "As deep as its nodes")], "Binary trees", "Hard", now=2)
+    return index
+
+
+def test_add_skips_known_questions(index):
+    assert index.add([question("How deep can a binary tree get?", "As deep as its nodes")], "Trees", "Easy") == 0
+    assert index.count() == 3
+
+
+def test_search_requires_every_word(index):
+    hits = index.search("binary tree")
+    assert {hit["question"].text for hit in hits} == {
+        "Which traversal visits the root of a binary tree first?", "How deep can a binary tree get?"
+    }
+    assert index.search("binary cooking") == []
+    # The topic is searched too
+    assert len(index.search("binary recursion")) == 1
+    assert index.search("") == []
+
+
+def test_search_matches_word_forms_and_explanations(index):
+    hit, = index.search("stopping")
+    assert hit["question"].text == "What is the base case of a recursive function?"
+    assert hit["topic"] == "Recursion" and hit["difficulty"] == "Easy"
+
+
+def test_search_returns_complete_questions(index):
+    hit, = index.search("deep")
+    assert hit["question"].to_list() == question("How deep can a binary tree get?", "As deep as its nodes")
+
+
+def test_search_filters(index):
+    assert [hit["difficulty"] for hit in index.search("binary", difficulty="Hard")] == ["Hard"]
+    assert [hit["topic"] for hit in index.search("binary", topic="binary tree")] == ["Binary trees"]
+    assert len(index.search("binary", limit=1)) == 1
+
+
+def test_search_ignores_query_syntax(index):
+    # Operators and unbalanced quotes are plain words ("or", "and"), not FTS5 syntax errors
+    assert index.search('tree" OR (') == []
+    assert index.search("tree AND") == []
+    assert len(index.search('"tree"')) == 2
+
+
+def test_only_newest_matches_are_ranked(index, monkeypatch):
+    monkeypatch.setattr(search_index, "RANK_WINDOW", 1)
+    hit, = index.search("binary")
+    assert hit["question"].text == "How deep can a binary tree get?"
@@ -0,0 +1,62 @@
+import os
+
+from session_history import HistoryBuffer, session_memory_usage
+
+
+def record(i, size=10):
+    return {"topic": f"Topic {i}", "score": i, "padding": "x" * size}
+
+
+def test_recent_records_stay_in_memory(tmp_path):
+    history = HistoryBuffer(recent_capacity=3, spill_dir=str(tmp_path))
+    for i in range(5):
+        history.append(record(i))
+    assert len(history) == 5
+    assert [r["score"] for r in history.recent()] == [2, 3, 4]
+    usage = history.memory_usage()
+    assert (usage["in_memory_records"], usage["spilled_records"]) == (3, 2)
+    assert usage["spilled_bytes"] > 0
+
+
+def test_indices_are_stable_across_the_spill(tmp_path):
+    history = HistoryBuffer(recent_capacity=2, spill_dir=str(tmp_path))
+    for i in range(6):
+        history.append(record(i))
+    assert [r["score"] for r in history] == list(range(6))
+    assert history[0]["score"] == 0
+    assert history[-1]["score"] == 5
+    assert [r["score"] for r in history[1:4]] == [1, 2, 3]
+
+
+def test_memory_budget_spills_large_records(tmp_path):
+    history = HistoryBuffer(memory_budget=1000, recent_capacity=100, spill_dir=str(tmp_path))
+    for i in range(5):
+        history.append(record(i, size=400))
+    usage = history.memory_usage()
+    assert usage["in_memory_bytes"] <= 1000
+    assert usage["in_memory_records"] == 2
+
+
+def test_newest_record_is_kept_even_over_budget(tmp_path):
+    history = HistoryBuffer(memory_budget=10, spill_dir=str(tmp_path))
+    history.append(record(0, size=100))
+    assert history.recent() == [record(0, size=100)]
+
+
+def test_spill_file_is_removed_with_the_buffer(tmp_path):
+    history = HistoryBuffer(recent_capacity=1, spill_dir=str(tmp_path))
+    history.append(record(0))
+    history.append(record(1))
+    path = history.spill_path
+    assert os.path.exists(path)
+    del history
+    assert not os.path.exists(path)
+
+
+def test_session_memory_usage_counts_only_memory_of_the_history(tmp_path):
+    history = HistoryBuffer(recent_capacity=1, spill_dir=str(tmp_path))
+    for i in range(3):
+        history.append(record(i, size=1000))
+    usage = session_memory_usage({"user_data": history, "questions": ["x" * 5000]})
+    assert usage["user_data"] == history.memory_usage()["in_memory_bytes"] < 2000
+    assert usage["questions"] > 5000
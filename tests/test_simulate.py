@@ -0,0 +1,75 @@
+import json
+
+import numpy as np
+import pytest
+
+from difficulty import determine_difficulty
+from simulate import (
+    GUESS, LEVEL_DIFFICULTY, TARGET_ACCURACY, appropriate_levels, fixed_policy, level_cuts, main, policy_table,
+    sample_abilities, simulate, success_probability
+)
+
+
+@pytest.fixture
+def abilities():
+    return sample_abilities(2000, np.random.default_rng(1))
+
+
+def test_success_probability_follows_the_3pl_model():
+    assert success_probability(LEVEL_DIFFICULTY[1], LEVEL_DIFFICULTY[1]) == pytest.approx(GUESS + (1 - GUESS) / 2)
+    assert success_probability(-50.0, 0.0) == pytest.approx(GUESS)
+    assert success_probability(50.0, 0.0) == pytest.approx(1.0)
+
+
+def test_appropriate_level_rises_with_ability():
+    cuts = level_cuts()
+    assert list(cuts) == sorted(cuts)
+    assert list(appropriate_levels(np.array([-3.0, cuts[0] + 0.01, 3.0]))) == [0, 1, 2]
+    # At a cut, both neighbouring levels are as close to the target
+    easier, harder = success_probability(cuts[0], LEVEL_DIFFICULTY[:2])
+    assert abs(easier - TARGET_ACCURACY) == pytest.approx(abs(harder - TARGET_ACCURACY), abs=1e-6)
+
+
+def test_policy_table_matches_the_policy():
+    table = policy_table(determine_difficulty, 5)
+    assert table.shape == (3, 6)
+    assert list(table[1]) == [0, 0, 1, 1, 2, 2]
+
+
+def test_same_seed_gives_the_same_results(abilities):
+    first = simulate(determine_difficulty, abilities, quizzes=10, seed=3)
+    assert simulate(determine_difficulty, abilities, quizzes=10, seed=3) == first
+    assert simulate(determine_difficulty, abilities, quizzes=10, seed=4) != first
+
+
+def test_accuracy_rises_as_abilities_grow(abilities):
+    still = simulate(fixed_policy, abilities, quizzes=10, learning_rate=0.0)
+    learning = simulate(fixed_policy, abilities, quizzes=10, learning_rate=0.05)
+    assert learning["accuracy"] > still["accuracy"]
+    assert still["level_changes_per_quiz"] == 0
+    assert still["final_levels"] == {"Easy": 0.0, "Medium": 1.0, "Hard": 0.0}
+
+
+def test_adaptive_policy_follows_growing_abilities(abilities):
+    result = simulate(determine_difficulty, abilities, quizzes=20, learning_rate=0.05)
+    start = simulate(determine_difficulty, abilities, quizzes=1, learning_rate=0.05)
+    fixed = simulate(fixed_policy, abilities, quizzes=20, learning_rate=0.05)
+    assert result["final_levels"]["Hard"] > start["final_levels"]["Hard"]
+    assert result["time_at_appropriate"] > fixed["time_at_appropriate"]
+
+
+def test_main_prints_deterministic_json(capsys):
+    argv = ["--learners", "500", "--quizzes", "5", "--policy", "threshold", "--policy", "fixed", "--json"]
+    main(argv)
+    first = json.loads(capsys.readouterr().out)
+    main(argv)
+    assert json.loads(capsys.readouterr().out) == first
+    assert sorted(first) == ["fixed", "threshold"]
+
+
+def test_main_prints_a_summary_table(capsys):
+    main(["--learners", "100", "--quizzes", "3", "--policy", "step"])
+    out = capsys.readouterr().out
+    assert out.startswith("Appropriate level at the start: Easy ")
+    assert "\nstep " in out
+    assert "Simulated 1,500 answers" in out
@@ -0,0 +1,189 @@
+import pytest
+
+import state_backend
+from conftest import FakeClock, make_question
+from state_backend import (
+    MemoryBackend, QuestionCache, QuestionPool, QuestionStore, QuizSnapshots, SQLiteBackend, backend_from_url
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(state_backend, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path, clock):
+    if request.param == "memory":
+        return MemoryBackend()
+    return SQLiteBackend(str(tmp_path / "state.sqlite3"))
+
+
+def test_get_set_delete(backend):
+    assert backend.get("missing", "default") == "default"
+    backend.set("key", {"a": [1, 2]})
+    assert backend.get("key") == {"a": [1, 2]}
+    backend.set("key", "replaced")
+    assert backend.get("key") == "replaced"
+    backend.delete("key")
+    assert backend.get("key") is None
+
+
+def test_value_expires(backend, clock):
+    backend.set("key", 1, ttl=10)
+    clock.advance(9)
+    assert backend.get("key") == 1
+    clock.advance(2)
+    assert backend.get("key") is None
+
+
+def test_list_range_uses_inclusive_bounds(backend):
+    for i in range(5):
+        backend.push("list", i)
+    assert backend.range("list") == [0, 1, 2, 3, 4]
+    assert backend.range("list", 1, 2) == [1, 2]
+    assert backend.range("list", -2) == [3, 4]
+    assert backend.range("missing") == []
+
+
+def test_push_max_length_keeps_newest(backend):
+    for i in range(5):
+        backend.push("list", i, max_length=3)
+    assert backend.range("list") == [2, 3, 4]
+
+
+def test_extend_appends_in_order(backend):
+    backend.push("list", 0)
+    backend.extend("list", [1, 2, 3], max_length=3)
+    assert backend.range("list") == [1, 2, 3]
+
+
+def test_pop_removes_oldest(backend):
+    backend.extend("list", ["a", "b"])
+    assert backend.pop("list") == "a"
+    assert backend.pop("list") == "b"
+    assert backend.pop("list", "empty") == "empty"
+
+
+def test_list_expires_as_a_whole(backend, clock):
+    backend.push("list", 1, ttl=10)
+    clock.advance(5)
+    # A push without a ttl keeps the list's expiry
+    backend.push("list", 2)
+    assert backend.range("list") == [1, 2]
+    clock.advance(6)
+    assert backend.range("list") == []
+    assert backend.pop("list") is None
+    # An expired list starts over
+    backend.push("list", 3, ttl=10)
+    assert backend.range("list") == [3]
+
+
+def test_push_with_ttl_extends_expiry(backend, clock):
+    backend.push("list", 1, ttl=10)
+    clock.advance(8)
+    backend.push("list", 2, ttl=10)
+    clock.advance(8)
+    assert backend.range("list") == [1, 2]
+
+
+def test_delete_removes_lists(backend):
+    backend.push("list", 1, ttl=10)
+    backend.delete("list")
+    assert backend.range("list") == []
+
+
+def test_purge_expired(backend, clock):
+    backend.set("old", 1, ttl=10)
+    backend.set("kept", 2)
+    backend.push("old-list", 1, ttl=10)
+    backend.push("kept-list", 2)
+    clock.advance(11)
+    assert backend.purge_expired() == 2
+    assert backend.get("kept") == 2
+    assert backend.range("kept-list") == [2]
+    assert backend.purge_expired() == 0
+
+
+def test_sqlite_shared_between_instances(tmp_path):
+    path = str(tmp_path / "state.sqlite3")
+    SQLiteBackend(path).push("list", "from another process")
+    assert SQLiteBackend(path).range("list") == ["from another process"]
+
+
+def test_backend_from_url(tmp_path):
+    assert isinstance(backend_from_url("memory://"), MemoryBackend)
+    backend = backend_from_url(f"sqlite:///{tmp_path / 'state.sqlite3'}")
+    assert isinstance(backend, SQLiteBackend)
+    assert backend.path == str(tmp_path / "state.sqlite3")
+    with pytest.raises(ValueError):
+        backend_from_url("ftp://example.com")
+
+
+def test_question_cache_serves_unseen_quizzes(backend):
+    cache = QuestionCache(backend)
+    first = cache.add("Recursion", "Easy", 2, [make_question(0), make_question(1)])
+    second = cache.add("Recursion", "Easy", 2, [make_question(2), make_question(3)])
+    # Any spelling of the topic shares the pool
+    assert cache.get("  recursion ", "Easy", 2)[0] == second
+    assert cache.get("Recursion", "Easy", 2, seen={second})[0] == first
+    assert cache.get("Recursion", "Easy", 2, seen={first, second}) == (None, None)
+    assert cache.get("Recursion", "Hard", 2) == (None, None)
+
+
+def test_question_store_round_trip(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "state.sqlite3"))
+    stored = QuestionStore(backend).put([make_question(0), make_question(1)])
+    # A new store (another process) reads them from the backend
+    store = QuestionStore(backend)
+    assert [q.id for q in store.get_many([q.id for q in stored])] == [q.id for q in stored]
+    assert store.get("unknown") is None
+
+
+def test_quiz_snapshots(backend):
+    snapshots = QuizSnapshots(backend)
+    assert snapshots.load("token") is None
+    snapshots.save("token", {"question_ids": ["a", "b", "c"]})
+    snapshots.record_answer("token", "A")
+    snapshots.record_answers("token", [None, "C"])
+    assert snapshots.load("token") == ({"question_ids": ["a", "b", "c"]}, ["A", None, "C"])
+    snapshots.delete("token")
+    assert snapshots.load("token") is None
+
+
+def test_question_pool_serves_each_question_once(backend):
+    pool = QuestionPool(backend)
+    pool.put("Recursion", "Easy", make_question(0))
+    pool.put("recursion", "Easy", make_question(1))
+    assert pool.take("RECURSION", "Easy") == make_question(0)
+    assert pool.take("Recursion", "Easy") == make_question(1)
+    assert pool.take("Recursion", "Easy") is None
+
+
+def test_question_pool_skips_excluded_questions(backend):
+    pool = QuestionPool(backend)
+    for i in range(3):
+        pool.put("Recursion", "Easy", make_question(i))
+    exclude = {make_question(0)[0], make_question(1)[0]}
+    assert pool.take("Recursion", "Easy", exclude=exclude) == make_question(2)
+    # Skipped questions go back into the pool for other quizzes
+    assert pool.take("Recursion", "Easy") == make_question(0)
+    assert pool.take("Recursion", "Easy") == make_question(1)
+
+
+def test_question_pool_skips_a_bounded_number(backend):
+    pool = QuestionPool(backend)
+    for i in range(QuestionPool.MAX_SKIPPED + 1):
+        pool.put("Recursion", "Easy", make_question(i))
+    exclude = {make_question(i)[0] for i in range(QuestionPool.MAX_SKIPPED + 1)}
+    assert pool.take("Recursion", "Easy", exclude=exclude) is None
+    assert len(backend.range("qpool:recursion:Easy")) == QuestionPool.MAX_SKIPPED + 1
+
+
+def test_question_pool_is_per_source(backend):
+    pool = QuestionPool(backend)
+    pool.put("Recursion", "Easy", make_question(0), source="doc")
+    assert pool.take("Recursion", "Easy") is None
+    assert pool.take("Recursion", "Easy", source="doc") == make_question(0)
@@ -0,0 +1,74 @@
+import pytest
+
+from topics import UNTITLED_TOPIC, TopicRegistry, normalize_topic
+
+
+@pytest.mark.parametrize("spelling", ["Python Lists", "python lists ", "Python list", "PYTHON  LISTS!"])
+def test_spellings_share_a_key(spelling):
+    assert normalize_topic(spelling) == "python list"
+
+
+@pytest.mark.parametrize("word, singular", [
+    ("Queries", "query"), ("Classes", "class"), ("Boxes", "box"), ("Physics", "physics"),
+    ("Analysis", "analysis"), ("Bus", "bus"), ("Gas", "gas"),
+])
+def test_plurals_are_folded(word, singular):
+    assert normalize_topic(word) == singular
+
+
+def test_different_languages_stay_apart():
+    assert len({normalize_topic(topic) for topic in ["C", "C++", "C#"]}) == 3
+
+
+def test_accents_and_width_are_folded():
+    assert normalize_topic("Ｃａｆé") == normalize_topic("café")
+
+
+def test_punctuation_only_topic_keeps_its_text():
+    assert normalize_topic("?!") == "?!"
+
+
+def test_register_keeps_the_first_display_name():
+    registry = TopicRegistry()
+    key = registry.register("World War II")
+    assert registry.register("world war ii") == key
+    assert registry.display_name("WORLD WAR II") == "World War II"
+    assert len(registry) == 1
+
+
+def test_typos_resolve_to_the_known_topic():
+    registry = TopicRegistry()
+    key = registry.register("Photosynthesis")
+    assert registry.resolve("Photosynthessis") == key
+    # The spelling is remembered as an alias
+    assert registry.aliases[normalize_topic("Photosynthessis")] == key
+
+
+def test_numbered_topics_stay_apart():
+    registry = TopicRegistry()
+    registry.register("World War I")
+    assert registry.resolve("World War II") is None
+    assert registry.register("World War II") != registry.register("World War I")
+
+
+def test_blank_topic_is_filed_as_untitled():
+    registry = TopicRegistry()
+    assert registry.register("   ") == registry.register(UNTITLED_TOPIC)
+    assert registry.resolve("") is None
+
+
+def test_aliases():
+    registry = TopicRegistry()
+    key = registry.add_alias("WW2", "World War II")
+    assert registry.resolve("ww2") == key
+    assert "WW2" in registry
+    assert registry.display_name("unknown topic") == "unknown topic"
+
+
+def test_history_index():
+    registry = TopicRegistry()
+    registry.add_record("Sorting algorithms", 0)
+    registry.add_record("Recursion", 1)
+    registry.add_record("sorting algorithm", 2)
+    assert registry.history_for("Sorting Algorithms") == [0, 2]
+    assert registry.history_for("Graphs") == []
@@ -0,0 +1,71 @@
+import pytest
+
+import translation
+from generation import FakeLLM
+from state_backend import MemoryBackend
+from translation import (
+    SOURCE_LANGUAGE, TranslationCache, TranslationError, cached_translations, parse_translation_response,
+    translate_questions
+)
+
+
+class CountingLLM(FakeLLM):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        return super().invoke(messages)
+
+
+@pytest.fixture
+def cache():
+    return TranslationCache(MemoryBackend())
+
+
+def test_translation_keeps_ids_and_answers(cache, questions):
+    translated = translate_questions(FakeLLM(), cache, questions, "Spanish")
+    assert [q.id for q in translated] == [q.id for q in questions]
+    assert [q.answer for q in translated] == [q.answer for q in questions]
+    assert translated[0].text == f"[Spanish] {questions[0].text}"
+    assert translated[0].options[1] == f"[Spanish] {questions[0].options[1]}"
+
+
+def test_cached_translations_are_reused(cache, questions):
+    llm = CountingLLM()
+    translate_questions(llm, cache, questions[:3], "French")
+    translate_questions(llm, cache, questions, "French")
+    assert llm.calls == 2
+    translate_questions(llm, cache, questions, "French")
+    assert llm.calls == 2
+
+
+def test_untranslated_questions_are_sent_in_batches(cache, questions, monkeypatch):
+    monkeypatch.setattr(translation, "TRANSLATION_BATCH_SIZE", 2)
+    llm = CountingLLM()
+    assert len(translate_questions(llm, cache, questions, "German")) == 5
+    assert llm.calls == 3
+
+
+def test_source_language_is_not_translated(cache, questions):
+    llm = CountingLLM()
+    assert translate_questions(llm, cache, questions, SOURCE_LANGUAGE) == questions
+    assert llm.calls == 0
+
+
+def test_cached_translations_never_call_the_llm(cache, questions):
+    translate_questions(FakeLLM(), cache, questions[:2], "Italian")
+    result = cached_translations(cache, questions, "Italian")
+    assert [q.text.startswith("[Italian]") for q in result] == [True, True, False, False, False]
+    assert result[2] is questions[2]
+
+
+@pytest.mark.parametrize("content", [
+    "not a list",
+    "[['only one question', 'a', 'b', 'c', 'd', 'e']]",
+    "[['text', 'a', 'b', 'c', 'd', 'e'], ['too', 'few']]",
+])
+def test_mismatched_responses_are_rejected(questions, content):
+    with pytest.raises(TranslationError):
+        parse_translation_response(content, questions[:2])
@@ -0,0 +1,64 @@
+import pytest
+from langchain_core.messages import HumanMessage
+
+from generation import FakeLLM
+from usage_ledger import CACHE_HIT, MeteredLLM, QuotaExceededError, UsageLedger
+
+REQUEST = [HumanMessage(content="Generate 2 multiple-choice questions about Graphs with Easy difficulty")]
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return UsageLedger(str(tmp_path / "usage.sqlite3"))
+
+
+class FailingLLM:
+    def invoke(self, messages):
+        raise RuntimeError("model unavailable")
+
+
+def test_calls_are_recorded(ledger):
+    llm = MeteredLLM(FakeLLM(), ledger, "session-1")
+    llm.invoke(REQUEST)
+    llm.for_purpose("translation").invoke(REQUEST)
+    llm.record_cache_hit()
+
+    totals = ledger.summary(user="session-1")["totals"]
+    assert (totals["requests"], totals["llm_calls"], totals["cache_hits"]) == (3, 2, 1)
+    assert totals["total_tokens"] == ledger.tokens_used("session-1") > 0
+    assert {row["purpose"] for row in ledger.summary()["by_purpose"]} == {"quiz", "translation"}
+    assert ledger.tokens_used("session-2") == 0
+
+
+def test_failed_calls_are_recorded_as_errors(ledger):
+    with pytest.raises(RuntimeError):
+        MeteredLLM(FailingLLM(), ledger, "session-1").invoke(REQUEST)
+    totals = ledger.summary()["totals"]
+    assert (totals["errors"], totals["total_tokens"]) == (1, 0)
+
+
+def test_user_quota_is_checked_before_a_call(ledger):
+    ledger.user_daily_tokens = 100
+    ledger.record("session-1", prompt_tokens=60, completion_tokens=40)
+    with pytest.raises(QuotaExceededError, match="this session"):
+        MeteredLLM(FakeLLM(), ledger, "session-1").invoke(REQUEST)
+    # Each session has its own count
+    MeteredLLM(FakeLLM(), ledger, "session-2").invoke(REQUEST)
+
+
+def test_global_quota(ledger):
+    ledger.global_daily_tokens = 100
+    ledger.record("session-1", prompt_tokens=100)
+    with pytest.raises(QuotaExceededError, match="daily question generation limit"):
+        MeteredLLM(FakeLLM(), ledger, "session-2").invoke(REQUEST)
+
+
+def test_cache_hits_use_no_tokens(ledger):
+    ledger.record("session-1", cache=CACHE_HIT)
+    assert ledger.tokens_used() == 0
+
+
+def test_tokens_used_since(ledger):
+    ledger.record("session-1", prompt_tokens=10)
+    assert ledger.tokens_used("session-1", since=2 ** 40) == 0
+    assert ledger.tokens_used("session-1", since=0) == 10
@@ -0,0 +1,97 @@
+"""
+The app's stylesheet and the HTML snippets styled by it
+
+The theme lives in static/theme.css. With static serving on (.streamlit/config.toml),
+each rerun only sends a short <link> to it, which the browser fetches once and keeps;
+otherwise the stylesheet is sent inline as before. The snippets below carry class names
+instead of inline style attributes and are filled in with str.format.
+"""
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+
+THEME_CSS_PATH = Path(__file__).parent / "static" / "theme.css"
+# Where Streamlit serves the files of static/ when server.enableStaticServing is on
+STATIC_URL = "app/static/"
+
+
+@lru_cache(maxsize=2)
+def theme_html(static_serving):
+    """
+    Markup applying the theme: a link to the stylesheet, versioned by its content so a
+    changed theme is fetched again, or the stylesheet itself without static serving
+    """
+    css = THEME_CSS_PATH.read_bytes()
+    if static_serving:
+        version = hashlib.sha1(css).hexdigest()[:12]
+        return f"<link rel='stylesheet' href='{STATIC_URL}{THEME_CSS_PATH.name}?v={version}'>"
+    return f"<style>\n{css.decode()}</style>"
+
+
+TITLE_HTML = (
+    "<div class='title-container'><h1 class='title-text'>{title}</h1>"
+    "<p class='subtitle-text'>{subtitle}</p></div>"
+)
+SIDEBAR_TITLE_HTML = "<h1 class='sidebar-title'>{title}</h1>"
+HEADING_HTML = "<h3 class='accent'>{title}</h3>"
+SECTION_TITLE_HTML = "<h3 class='section-title'>{title}</h3>"
+SPACER_HTML = {height: f"<div class='spacer-{height}'></div>" for height in (10, 20, 30)}
+HELP_TEXT_HTML = "<div class='help-text'>{text}</div>"
+MUTED_TEXT_HTML = "<div class='muted'>{text}</div>"
+CARD_NOTE_HTML = "<div class='analytics-card'><p class='card-note'>{text}</p></div>"
+INFO_PANEL_HTML = "<div class='info-panel'><h4>{title}</h4>{body}</div>"
+FEEDBACK_PANEL_HTML = "<div class='feedback-panel {kind}'><h4>{title}</h4></div>"
+
+# Analytics
+METRIC_CARD_HTML = (
+    "<div class='metric-card'><div class='metric-label'>{label}</div><div class='metric-value'>{value}</div></div>"
+)
+TOPIC_STATS_HTML = (
+    "<div class='topic-stats {level}'><h4>{topic}</h4><div class='stat-row'>"
+    "<div><strong>Questions Answered:</strong> {total}</div>"
+    "<div><strong>Correct Answers:</strong> {score}</div>"
+    "<div><strong>Accuracy:</strong> {accuracy:.0%}</div></div></div>"
+)
+LATEST_QUIZ_HTML = (
+    "<div class='analytics-card'><h4>Latest Quiz: {topic} ({difficulty})</h4><div class='stat-row'>"
+    "<div class='stat-box'><div class='stat-label'>Score</div><div class='stat-value'>{score} / {total}</div></div>"
+    "<div class='stat-box'><div class='stat-label'>Accuracy</div><div class='stat-value'>{accuracy:.0%}</div></div>"
+    "<div class='stat-box'><div class='stat-label'>Date</div><div class='stat-value small'>{date}</div></div>"
+    "</div><p class='muted'>{note}</p></div>"
+)
+WEAK_TOPIC_HTML = "<h4 class='weak-topic'>{topic}</h4>"
+
+# Quiz and results
+QUIZ_PROGRESS_HTML = "<p class='quiz-progress'>Question {number} of {total}{label}</p>"
+QUESTION_CARD_HTML = "<div class='question-card'><h3>{question}</h3></div>"
+ANSWER_PROMPT_HTML = "<h4 class='answer-prompt'>Select your answer:</h4>"
+OPTION_HTML = "<div class='option-button {style}'><strong>{label}.</strong> {option} {note}</div>"
+EXPLANATION_HTML = "<div class='explanation-box'><h4>Explanation</h4><p>{explanation}</p></div>"
+REVIEW_NOTES = {
+    "selected-correct": "✓ <span class='note-correct'>(Your answer - Correct)</span>",
+    "correct-answer": "✓ <span class='note-correct'>(Correct answer)</span>",
+    "selected-incorrect": "✗ <span class='note-incorrect'>(Your answer - Incorrect)</span>",
+    "": "",
+}
+REVIEW_ITEM_HTML = (
+    "<details class='review-item'><summary>{icon} Question {number}: {preview}...</summary>"
+    "<h4 class='review-question'>{question}</h4>{options}{explanation}</details>"
+)
+SCORE_CARD_HTML = (
+    "<div class='score-card'><h2>Your Score</h2><div class='score-value'>{score} / {total}</div>"
+    "<div class='score-percent'>{percentage:.1f}%</div></div>"
+)
+
+# Search and classes
+SEARCH_HIT_HTML = "<ul class='plain-list'>{options}</ul><div class='muted'><i>💡 {explanation}</i></div>"
+JOIN_CODE_HTML = (
+    "<div class='metric-card'><div class='muted'>Join code</div><div class='join-code'>{code}</div>"
+    "<div class='muted'>{details}</div></div>"
+)
+
+
+def html_list(items):
+    """
+    A <ul> of the given items, leaving out empty ones
+    """
+    return "<ul>" + "".join(f"<li>{item}</li>" for item in items if item) + "</ul>"
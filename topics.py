@@ -0,0 +1,146 @@
+import difflib
+import re
+import unicodedata
+
+# "+" and "#" are kept so that "C", "C++" and "C#" stay different topics
+_PUNCTUATION_RE = re.compile(r"[^\w\s+#]+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Words ending in "s" that are not plurals
+_SINGULAR_S_ENDINGS = ("ss", "us", "is", "os", "ics")
+
+# Minimum similarity for a spelling to be treated as an existing topic
+FUZZY_CUTOFF = 0.88
+# Topic that records without any topic text are filed under
+UNTITLED_TOPIC = "Untitled"
+
+
+def _singularize(word):
+    if len(word) <= 3 or word.isdigit():
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("sses", "xes", "ches", "shes", "zes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(_SINGULAR_S_ENDINGS):
+        return word[:-1]
+    return word
+
+
+def _is_typo_variant(key, candidate):
+    """
+    Only accept fuzzy matches that differ by typos in longer words, so that
+    "World War I" and "World War II" stay separate topics
+    """
+    words, candidate_words = key.split(), candidate.split()
+    if len(words) != len(candidate_words):
+        return False
+    return all(
+        a == b or (min(len(a), len(b)) >= 4 and not (a.isdigit() or b.isdigit()))
+        for a, b in zip(words, candidate_words)
+    )
+
+
+def normalize_topic(topic):
+    """
+    Reduce a topic to a canonical key: case, accents, punctuation, whitespace and plurals
+    are all folded, so "Python Lists", "python lists " and "Python list" share one key
+    """
+    text = unicodedata.normalize("NFKC", topic).casefold()
+    words = _WHITESPACE_RE.split(_PUNCTUATION_RE.sub(" ", text).strip())
+    key = " ".join(_singularize(word) for word in words if word)
+    # Topics made only of punctuation keep it rather than collapsing to an empty key
+    return key or " ".join(text.split())
+
+
+class TopicRegistry:
+    """
+    Registry of known topics with aliases and a topic -> history index
+
+    Every spelling that has been seen is remembered as an alias, so repeated lookups
+    are a dict hit; only a never-seen spelling pays for a fuzzy match against the
+    known topics.
+    """
+
+    def __init__(self, cutoff=FUZZY_CUTOFF):
+        self.cutoff = cutoff
+        self.names = {}     # canonical key -> display name
+        self.aliases = {}   # normalized spelling -> canonical key
+        self.history = {}   # canonical key -> indices into the history list
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, topic):
+        return self.resolve(topic) is not None
+
+    def resolve(self, topic):
+        """
+        Return the canonical key for a topic, or None if it is not known
+        """
+        key = normalize_topic(topic)
+        if not key:
+            return None
+        canonical = self.aliases.get(key)
+        if canonical is not None:
+            return canonical
+        for match in difflib.get_close_matches(key, self.names.keys(), n=3, cutoff=self.cutoff):
+            if _is_typo_variant(key, match):
+                # Remember the spelling so the next lookup is a dict hit
+                self.aliases[key] = match
+                return match
+        return None
+
+    def register(self, topic):
+        """
+        Return the canonical key for a topic, adding it as a new topic if needed
+
+        Records are never rejected here: a topic without any text (e.g. from an old or
+        imported record) is filed under UNTITLED_TOPIC. Input is validated where it is typed.
+        """
+        if not topic.strip():
+            topic = UNTITLED_TOPIC
+        canonical = self.resolve(topic)
+        if canonical is None:
+            canonical = normalize_topic(topic)
+            self.names[canonical] = " ".join(topic.split())
+            self.aliases[canonical] = canonical
+            self.history[canonical] = []
+        return canonical
+
+    def add_alias(self, alias, topic):
+        """
+        Make an alternative name (e.g. "WW2") resolve to an existing or new topic
+        """
+        canonical = self.register(topic)
+        self.aliases[normalize_topic(alias)] = canonical
+        return canonical
+
+    def display_name(self, topic):
+        """
+        Return the name a topic was first entered with, or the topic itself if unknown
+        """
+        canonical = self.resolve(topic)
+        return self.names[canonical] if canonical is not None else topic
+
+    def add_record(self, topic, index):
+        """
+        Index a history record under its topic and return the canonical key
+        """
+        canonical = self.register(topic)
+        self.history[canonical].append(index)
+        return canonical
+
+    def history_for(self, topic):
+        """
+        Return the history indices recorded for a topic, oldest first
+        """
+        canonical = self.resolve(topic)
+        return self.history.get(canonical, []) if canonical is not None else []
+
+    def latest(self, topic):
+        """
+        Return the history index of the most recent quiz on a topic, or None
+        """
+        indices = self.history_for(topic)
+        return indices[-1] if indices else None
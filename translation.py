@@ -0,0 +1,150 @@
+"""
+Quizzes in other languages by translating questions that were already generated
+
+All the questions of a quiz that are not translated yet go to the LLM in one request.
+Translations are cached per (question id, language) in the shared state backend. A
+translated question keeps the id, answer letter and option order of the original,
+so answers, history and analytics are the same in every language.
+"""
+import ast
+import os
+
+from generation import MCQGenerationError
+from questions import Question
+from state_backend import QUESTION_CACHE_TTL, SESSION_TTL
+
+# Language the questions are generated in
+SOURCE_LANGUAGE = "English"
+LANGUAGES = [
+    SOURCE_LANGUAGE, "Spanish", "French", "German", "Portuguese", "Italian", "Hindi", "Chinese", "Japanese", "Arabic"
+]
+# Questions sent in one translation request; longer quizzes take several
+TRANSLATION_BATCH_SIZE = int(os.getenv("MCQ_TRANSLATION_BATCH", "25"))
+
+
+class TranslationError(MCQGenerationError):
+    """
+    Raised when a translation response does not match the questions it was asked for
+    """
+
+
+# Function to build the chat messages for a translation request
+def build_translation_messages(questions, language):
+    """
+    Ask for the text, options and explanation of each question in the target language;
+    the answer letters are not sent, so the model cannot change them
+    """
+    # Imported here so that loading this module stays cheap
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    items = [[q.text, *q.options, q.explanation] for q in questions]
+    system_prompt = f"""
+    You are a professional translator of educational assessments.
+
+    Translate each multiple-choice question below from {SOURCE_LANGUAGE} into {language}.
+    Each item is [question_text, option_A, option_B, option_C, option_D, explanation].
+
+    Follow these requirements strictly:
+    1. Keep the items and the four options of each item in exactly the same order
+    2. Translate the meaning faithfully; do not add, drop, merge or reorder options
+    3. Keep names, formulas, code and numbers unchanged
+    4. If the explanation refers to an option by its letter, keep the letter
+
+    Return a valid Python list of {len(items)} lists of 6 strings ONLY, in the same format.
+    The output MUST be parseable with ast.literal_eval() - nothing else.
+    """
+    return [
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=f"Translate into {language}:\n{items!r}")
+    ]
+
+
+# Function to parse a translation response into translated questions
+def parse_translation_response(content, questions):
+    """
+    Turn the translated lists back into questions with the originals' ids and answers
+    """
+    content = content.strip()
+    start_idx, end_idx = content.find("["), content.rfind("]")
+    if start_idx != -1 and end_idx != -1:
+        content = content[start_idx:end_idx + 1]
+    try:
+        items = ast.literal_eval(content)
+    except (ValueError, SyntaxError) as e:
+        raise TranslationError(str(e)) from e
+
+    if not isinstance(items, list) or len(items) != len(questions):
+        raise TranslationError(f"Expected {len(questions)} translated questions")
+    translated = []
+    for question, item in zip(questions, items):
+        if not isinstance(item, (list, tuple)) or len(item) != 6:
+            raise TranslationError(f"Translated question format is incorrect: {item}")
+        text, *options, explanation = (str(field) for field in item)
+        translated.append(Question(text, options, question.answer, explanation, id=question.id))
+    return translated
+
+
+# Function to translate questions with a given chat model
+def request_translation(llm, questions, language):
+    """
+    Translate questions with one LLM call
+    """
+    response = llm.invoke(build_translation_messages(questions, language))
+    return parse_translation_response(response.content, questions)
+
+
+class TranslationCache:
+    """
+    Translated questions by (question id, language), shared by all sessions and workers
+    """
+
+    def __init__(self, backend, ttl=max(SESSION_TTL, QUESTION_CACHE_TTL)):
+        self.backend = backend
+        self.ttl = ttl
+
+    def _key(self, question_id, language):
+        return f"translation:{language}:{question_id}"
+
+    def get(self, question, language):
+        """
+        The translation of a question, or None if it has not been translated yet
+        """
+        fields = self.backend.get(self._key(question.id, language))
+        if fields is None:
+            return None
+        text, *options, explanation = fields
+        return Question(text, options, question.answer, explanation, id=question.id)
+
+    def put(self, questions, language):
+        for question in questions:
+            self.backend.set(
+                self._key(question.id, language), [question.text, *question.options, question.explanation],
+                ttl=self.ttl
+            )
+
+
+def cached_translations(cache, questions, language):
+    """
+    The questions in the given language where a translation is cached and the originals
+    otherwise; never calls the LLM
+    """
+    if language == SOURCE_LANGUAGE:
+        return list(questions)
+    return [cache.get(question, language) or question for question in questions]
+
+
+def translate_questions(llm, cache, questions, language):
+    """
+    The questions in the given language: cached translations are reused and the rest
+    are translated together, TRANSLATION_BATCH_SIZE questions per LLM call
+    """
+    if language == SOURCE_LANGUAGE or not questions:
+        return list(questions)
+    translated = [cache.get(question, language) for question in questions]
+    missing = [question for question, translation in zip(questions, translated) if translation is None]
+    new_translations = {}
+    for start in range(0, len(missing), TRANSLATION_BATCH_SIZE):
+        batch = request_translation(llm, missing[start:start + TRANSLATION_BATCH_SIZE], language)
+        cache.put(batch, language)
+        new_translations.update((question.id, question) for question in batch)
+    return [translation or new_translations[question.id] for question, translation in zip(questions, translated)]
@@ -0,0 +1,254 @@
+"""
+Append-only ledger of LLM calls with token counts, and per-user / global daily quotas
+
+    python usage_ledger.py            # today's usage by user, model and purpose
+    python usage_ledger.py --days 7
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+LEDGER_PATH = os.getenv("MCQ_USAGE_LEDGER", "mcq_usage.sqlite3")
+# Daily token limits, 0 for no limit. Only the global limit bounds the cost. The per-user
+# limit is a fair share per caller-chosen id (an app session, an API user): a visitor gets a
+# new one with a new session, so it only keeps a single session from using up the day.
+USER_DAILY_TOKENS = int(os.getenv("MCQ_USER_DAILY_TOKENS", "0"))
+GLOBAL_DAILY_TOKENS = int(os.getenv("MCQ_GLOBAL_DAILY_TOKENS", "0"))
+
+# Outcome of a request for questions
+CACHE_MISS = "miss"    # the LLM was called
+CACHE_HIT = "hit"      # served from a cache or pool, no tokens used
+CALL_ERROR = "error"   # the LLM call failed
+
+
+class QuotaExceededError(Exception):
+    """
+    Raised before an LLM call when the user's or the global daily token quota is used up
+    """
+
+
+def start_of_day(now=None):
+    """
+    Unix time of the most recent local midnight
+    """
+    now = time.time() if now is None else now
+    local = time.localtime(now)
+    return int(now) - (local.tm_hour * 3600 + local.tm_min * 60 + local.tm_sec)
+
+
+def usage_from_response(response):
+    """
+    Return (prompt tokens, completion tokens, model name) reported with a chat response
+    """
+    usage = getattr(response, "usage_metadata", None) or {}
+    metadata = getattr(response, "response_metadata", None) or {}
+    if usage:
+        prompt_tokens, completion_tokens = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    else:
+        # Older integrations only report the provider's raw token usage
+        token_usage = metadata.get("token_usage") or {}
+        prompt_tokens, completion_tokens = token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0)
+    return prompt_tokens, completion_tokens, metadata.get("model_name")
+
+
+class UsageLedger:
+    """
+    One row per LLM call (or cache hit) in a SQLite file shared by all worker processes
+
+    Rows are never updated, so concurrent writers only ever append. Totals for quota
+    checks are range sums over the (user, ts) and ts indexes.
+    """
+
+    def __init__(self, path=LEDGER_PATH, user_daily_tokens=USER_DAILY_TOKENS, global_daily_tokens=GLOBAL_DAILY_TOKENS):
+        self.path = path
+        self.user_daily_tokens = user_daily_tokens
+        self.global_daily_tokens = global_daily_tokens
+        self._local = threading.local()
+        with closing(sqlite3.connect(path)) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS usage ("
+                "ts INTEGER NOT NULL, user TEXT NOT NULL, model TEXT NOT NULL, purpose TEXT NOT NULL, "
+                "cache TEXT NOT NULL, prompt_tokens INTEGER NOT NULL, completion_tokens INTEGER NOT NULL, "
+                "latency_ms INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS usage_user_ts ON usage (user, ts)")
+            conn.execute("CREATE INDEX IF NOT EXISTS usage_ts ON usage (ts)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def record(self, user, model="", purpose="", cache=CACHE_MISS, prompt_tokens=0, completion_tokens=0,
+               latency_ms=0):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO usage VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (int(time.time()), str(user), model or "", purpose, cache,
+                 int(prompt_tokens), int(completion_tokens), int(latency_ms))
+            )
+
+    def tokens_used(self, user=None, since=None):
+        """
+        Prompt plus completion tokens since a Unix time (default: today), for one user or everyone
+        """
+        since = start_of_day() if since is None else since
+        if user is None:
+            row = self._conn().execute(
+                "SELECT SUM(prompt_tokens + completion_tokens) FROM usage WHERE ts >= ?", (since,)
+            ).fetchone()
+        else:
+            row = self._conn().execute(
+                "SELECT SUM(prompt_tokens + completion_tokens) FROM usage WHERE user = ? AND ts >= ?",
+                (str(user), since)
+            ).fetchone()
+        return row[0] or 0
+
+    def check_quota(self, user):
+        """
+        Raise QuotaExceededError if the user or the whole deployment has used its tokens for today
+
+        The check runs before a call, so the call that crosses a limit still completes.
+        """
+        if self.user_daily_tokens and self.tokens_used(user) >= self.user_daily_tokens:
+            raise QuotaExceededError(
+                f"Daily limit of {self.user_daily_tokens:,} tokens reached for this session. Please try again tomorrow."
+            )
+        if self.global_daily_tokens and self.tokens_used() >= self.global_daily_tokens:
+            raise QuotaExceededError("The daily question generation limit has been reached. Please try again tomorrow.")
+
+    def summary(self, since=None, user=None):
+        """
+        Aggregate calls, tokens, latency and cache hits since a Unix time (default: today)
+        """
+        since = start_of_day() if since is None else since
+        where, params = "WHERE ts >= ?", [since]
+        if user is not None:
+            where += " AND user = ?"
+            params.append(str(user))
+        columns = (
+            "COUNT(*), SUM(cache = 'miss'), SUM(cache = 'hit'), SUM(cache = 'error'), "
+            "COALESCE(SUM(prompt_tokens), 0), COALESCE(SUM(completion_tokens), 0), "
+            "AVG(CASE WHEN cache = 'miss' THEN latency_ms END)"
+        )
+        conn = self._conn()
+
+        def rows(group_by):
+            return [
+                {group_by: key, **_totals(values)}
+                for key, *values in conn.execute(
+                    f"SELECT {group_by}, {columns} FROM usage {where} GROUP BY {group_by} "
+                    "ORDER BY SUM(prompt_tokens + completion_tokens) DESC",
+                    params
+                )
+            ]
+
+        return {
+            "since": since,
+            "totals": _totals(conn.execute(f"SELECT {columns} FROM usage {where}", params).fetchone()),
+            "by_user": rows("user"),
+            "by_model": rows("model"),
+            "by_purpose": rows("purpose"),
+        }
+
+
+def _totals(values):
+    requests, calls, hits, errors, prompt_tokens, completion_tokens, latency = values
+    return {
+        "requests": requests or 0,
+        "llm_calls": calls or 0,
+        "cache_hits": hits or 0,
+        "errors": errors or 0,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "avg_latency_ms": round(latency) if latency is not None else None,
+    }
+
+
+class MeteredLLM:
+    """
+    Wraps a chat model so every call is checked against the quotas and written to the ledger
+    """
+
+    def __init__(self, llm, ledger, user, purpose="quiz"):
+        self.llm = llm
+        self.ledger = ledger
+        self.user = user
+        self.purpose = purpose
+
+    def for_purpose(self, purpose):
+        return MeteredLLM(self.llm, self.ledger, self.user, purpose)
+
+    def _model_name(self):
+        return getattr(self.llm, "model_name", None) or type(self.llm).__name__
+
+    def _record(self, response, started):
+        latency_ms = (time.perf_counter() - started) * 1000
+        if response is None:
+            self.ledger.record(self.user, self._model_name(), self.purpose, CALL_ERROR, latency_ms=latency_ms)
+            return
+        prompt_tokens, completion_tokens, model = usage_from_response(response)
+        self.ledger.record(
+            self.user, model or self._model_name(), self.purpose, CACHE_MISS,
+            prompt_tokens, completion_tokens, latency_ms
+        )
+
+    def record_cache_hit(self):
+        """
+        Record a request served without calling the LLM
+        """
+        self.ledger.record(self.user, self._model_name(), self.purpose, CACHE_HIT)
+
+    def invoke(self, messages):
+        self.ledger.check_quota(self.user)
+        started = time.perf_counter()
+        response = None
+        try:
+            response = self.llm.invoke(messages)
+        finally:
+            self._record(response, started)
+        return response
+
+    async def ainvoke(self, messages):
+        await asyncio.to_thread(self.ledger.check_quota, self.user)
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await self.llm.ainvoke(messages)
+        finally:
+            await asyncio.to_thread(self._record, response, started)
+        return response
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize LLM token usage")
+    parser.add_argument("--ledger", default=LEDGER_PATH, help="path of the usage ledger")
+    parser.add_argument("--days", type=int, default=1, help="number of days to include, 1 for today")
+    parser.add_argument("--user", help="only include this user or session id")
+    args = parser.parse_args(argv)
+
+    ledger = UsageLedger(args.ledger)
+    summary = ledger.summary(since=start_of_day() - (args.days - 1) * 86400, user=args.user)
+    totals = summary["totals"]
+    print(f"{totals['requests']} requests, {totals['llm_calls']} LLM calls, {totals['cache_hits']} cache hits, "
+          f"{totals['errors']} errors, {totals['total_tokens']:,} tokens "
+          f"({totals['prompt_tokens']:,} prompt / {totals['completion_tokens']:,} completion)")
+    for group in ("user", "model", "purpose"):
+        print(f"\nBy {group}:")
+        for row in summary[f"by_{group}"]:
+            print(f"  {row[group] or '-':<34} {row['total_tokens']:>12,} tokens {row['llm_calls']:>7} calls "
+                  f"{row['cache_hits']:>7} hits")
+
+
+if __name__ == "__main__":
+    main()